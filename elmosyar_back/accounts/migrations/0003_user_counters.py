@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserFollow = apps.get_model('social', 'UserFollow')
+    Post = apps.get_model('posts', 'Post')
+    User.objects.update(
+        followers_count=_count(UserFollow.objects.all(), 'following'),
+        following_count=_count(UserFollow.objects.all(), 'follower'),
+        posts_count=_count(Post.objects.all(), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_attributes'),
+        ('social', '0001_initial'),
+        ('accounts', '0002_user_followers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -9,7 +9,9 @@ from django.utils import timezone
 from django.contrib.auth.hashers import make_password
 from django.apps import apps
 
-class User(AbstractUser):
+from core.counters import CounterFieldsMixin
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True)
     student_id = models.CharField(max_length=20, blank=True, null=True)
     bio = models.TextField(max_length=500, blank=True, null=True)
@@ -27,6 +29,12 @@ class User(AbstractUser):
     info = models.CharField(max_length=255, blank=True, null=True, verbose_name='info')
     phone_number = models.CharField(max_length=15, blank=True, null=True, verbose_name='phone_number')
 
+    # شمارنده‌های denormalize شده (social/signals.py و posts/signals.py)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+    counter_fields = ('followers_count', 'following_count', 'posts_count')
+
     
     followers = models.ManyToManyField(
         'self', 
@@ -50,20 +58,20 @@ class User(AbstractUser):
     def generate_email_verification_token(self):
         self.email_verification_token = str(uuid.uuid4())
         self.email_verification_sent_at = timezone.now()
-        self.save()
+        self.save(update_fields=['email_verification_token', 'email_verification_sent_at'])
         return self.email_verification_token
 
     def generate_password_reset_token(self):
         self.password_reset_token = str(uuid.uuid4())
         self.password_reset_sent_at = timezone.now()
-        self.save()
+        self.save(update_fields=['password_reset_token', 'password_reset_sent_at'])
         return self.password_reset_token
 
     def verify_email(self):
         self.is_email_verified = True
         self.email_verification_token = None
         self.email_verification_sent_at = None
-        self.save()
+        self.save(update_fields=['is_email_verified', 'email_verification_token', 'email_verification_sent_at'])
         return True
 
     def is_password_reset_token_valid(self):
@@ -92,21 +100,6 @@ class User(AbstractUser):
         except UserFollow.DoesNotExist:
             return False
 
-    @property
-    def followers_count(self):
-        UserFollow = self._get_user_follow_model()
-        return UserFollow.objects.filter(following=self).count()
-
-    @property
-    def following_count(self):
-        UserFollow = self._get_user_follow_model()
-        return UserFollow.objects.filter(follower=self).count()
-    
-    @property
-    def posts_count(self):
-        """تعداد پست‌های کاربر"""
-        return self.posts.count()
-
     @property
     def is_verified(self):
         return self.is_email_verified
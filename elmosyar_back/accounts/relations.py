@@ -0,0 +1,73 @@
+from social.models import UserFollow
+
+
+# اگر کاربر جاری کمتر از این تعداد را دنبال کند کل مجموعه با یک کوئری خوانده می‌شود
+FOLLOW_SET_LIMIT = 5000
+
+_REQUEST_ATTR = '_user_relations'
+
+
+class RequestRelations:
+    """
+    identity map یک درخواست برای UserSerializer
+
+    - وضعیت is_following کاربر جاری نسبت به هر کاربر فقط یک بار از دیتابیس خوانده می‌شود:
+      اگر following_count کاربر جاری کوچک باشد کل مجموعه با یک کوئری،
+      وگرنه به صورت دسته‌ای برای idهای همان پاسخ (prime)
+    - خروجی سریالایز شده‌ی هر کاربر یک بار ساخته می‌شود (نویسنده‌ی چند پست، mentionها و ...)
+    - شمارنده‌ها (followers_count و ...) ستون‌های خود User هستند و کوئری جدا ندارند
+    """
+
+    def __init__(self, viewer):
+        self.viewer = viewer if viewer is not None and viewer.is_authenticated else None
+        self._following = {}
+        self._complete = False
+        self._representations = {}
+
+    def prime(self, user_ids):
+        """بارگذاری دسته‌ای وضعیت follow برای idهایی که هنوز معلوم نیستند (حداکثر یک کوئری)"""
+        if self.viewer is None or self._complete:
+            return
+        if self.viewer.following_count <= FOLLOW_SET_LIMIT:
+            followed = UserFollow.objects.filter(follower=self.viewer).values_list('following_id', flat=True)
+            self._following = dict.fromkeys(followed, True)
+            self._complete = True
+            return
+
+        missing = {user_id for user_id in user_ids if user_id is not None and user_id not in self._following}
+        if not missing:
+            return
+        followed = set(
+            UserFollow.objects.filter(follower=self.viewer, following_id__in=missing)
+            .values_list('following_id', flat=True)
+        )
+        for user_id in missing:
+            self._following[user_id] = user_id in followed
+
+    def is_following(self, user_id):
+        if self.viewer is None:
+            return False
+        if not self._complete and user_id not in self._following:
+            self.prime([user_id])
+        return self._following.get(user_id, False)
+
+    def representation(self, key):
+        return self._representations.get(key)
+
+    def remember(self, key, data):
+        self._representations[key] = data
+
+    def forget(self, key):
+        """خروجی کش شده‌ی یک کاربر بعد از تغییر در همان درخواست (مثلا ویرایش پروفایل)"""
+        self._representations.pop(key, None)
+
+
+def get_request_relations(request):
+    """RequestRelations متصل به request (None بدون request)"""
+    if request is None:
+        return None
+    relations = getattr(request, _REQUEST_ATTR, None)
+    if relations is None:
+        relations = RequestRelations(getattr(request, 'user', None))
+        setattr(request, _REQUEST_ATTR, relations)
+    return relations
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from .models import User
+from .relations import get_request_relations
 
 
 class ResendVerificationSerializer(serializers.Serializer):
@@ -16,7 +17,69 @@ class ResendVerificationSerializer(serializers.Serializer):
             raise serializers.ValidationError("User with this email does not exist.")
         return value
 
+class CompactUserSerializer(serializers.BaseSerializer):
+    """
+    نمایش سبک کاربر برای فیلدهای تو در تو (نویسنده‌ی پست، فرستنده‌ی پیام و ...):
+    id, username, display_name, avatar
+
+    اگر context['user_map'] وجود داشته باشد (?users=map) به جای دیکشنری فقط id برمی‌گردد
+    و خود کاربر یک بار در user_map ثبت می‌شود تا در users سطح بالای پاسخ بیاید.
+    """
+
+    def to_representation(self, user):
+        return compact_user_ref(user, self.context.get('user_map'))
+
+
+def compact_user_ref(user, user_map=None):
+    """خروجی CompactUserSerializer: دیکشنری کاربر، یا در حالت map فقط id (و ثبت کاربر در map)"""
+    if user_map is not None:
+        if user.pk not in user_map:
+            user_map[user.pk] = compact_user(user)
+        return user.pk
+    return compact_user(user)
+
+
+def compact_user(user):
+    return {
+        'id': user.pk,
+        'username': user.username,
+        'display_name': user.get_full_name() or user.username,
+        'avatar': user.profile_picture.url if user.profile_picture else None,
+    }
+
+
+def serializer_context(request):
+    """context سریالایزرها؛ با ?users=map کاربران تو در تو فقط یک بار در users پاسخ می‌آیند"""
+    context = {'request': request}
+    if request.GET.get('users') == 'map':
+        context['user_map'] = {}
+    return context
+
+
+def user_map_payload(context):
+    """{'users': {...}} برای اضافه شدن به پاسخ؛ خالی اگر حالت map فعال نباشد"""
+    user_map = context.get('user_map')
+    return {} if user_map is None else {'users': user_map}
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """وضعیت follow همه‌ی کاربران لیست قبل از سریالایز با یک کوئری"""
+
+    def to_representation(self, data):
+        relations = get_request_relations(self.context.get('request'))
+        if relations is not None:
+            users = data.all() if hasattr(data, 'all') else data
+            users = list(users)
+            relations.prime([user.pk for user in users])
+            data = users
+        return super().to_representation(data)
+
+
 class UserSerializer(serializers.ModelSerializer):
+    """
+    کاربر در پاسخ‌ها؛ داخل یک درخواست هر کاربر فقط یک بار سریالایز می‌شود
+    و is_following از identity map درخواست (accounts/relations.py) می‌آید
+    """
 
     followers_count = serializers.ReadOnlyField()
     following_count = serializers.ReadOnlyField()
@@ -36,14 +99,32 @@ class UserSerializer(serializers.ModelSerializer):
             'email': {'required': True},
             'password': {'write_only': True}
         }
+        list_serializer_class = UserListSerializer
+
+    def to_representation(self, instance):
+        relations = get_request_relations(self.context.get('request'))
+        if relations is None or instance.pk is None:
+            return super().to_representation(instance)
+        key = (type(self), instance.pk)
+        cached = relations.representation(key)
+        if cached is None:
+            cached = super().to_representation(instance)
+            relations.remember(key, cached)
+        return dict(cached)
 
     def get_is_following(self, obj):
-        from social.models import UserFollow
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return UserFollow.objects.filter(follower=request.user, following=obj).exists()
+        relations = get_request_relations(self.context.get('request'))
+        if relations is not None:
+            return relations.is_following(obj.pk)
         return False
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        relations = get_request_relations(self.context.get('request'))
+        if relations is not None:
+            relations.forget((type(self), instance.pk))
+        return instance
+
     def get_is_me(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from posts.models import Post
+from social.models import UserFollow
+from . import relations
+from .serializers import UserSerializer
+
+
+User = get_user_model()
+
+class RequestRelationsTest(TestCase):
+
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="1234")
+        self.authors = [
+            User.objects.create_user(username=f"author{i}", email=f"author{i}@example.com", password="1234")
+            for i in range(4)
+        ]
+        UserFollow.objects.create(follower=self.viewer, following=self.authors[0])
+        UserFollow.objects.create(follower=self.viewer, following=self.authors[1])
+        self.viewer.refresh_from_db()
+
+        for i in range(12):
+            post = Post.objects.create(author=self.authors[i % 4], content=f"post {i}")
+            post.mentions.add(*self.authors[:2])
+
+    def make_request(self):
+        request = RequestFactory().get('/api/posts/')
+        request.user = self.viewer
+        return request
+
+    def test_follow_state_resolved_once_per_request(self):
+        posts = list(Post.objects.for_listing(self.viewer))
+        # هر نویسنده و mention چند بار تکرار شده است
+        users = [post.author for post in posts] + [user for post in posts for user in post.mentions.all()]
+        request = self.make_request()
+
+        # فقط یک کوئری برای مجموعه‌ی follow کاربر جاری، نه یکی برای هر کاربر
+        with self.assertNumQueries(1):
+            data = UserSerializer(users, many=True, context={'request': request}).data
+
+        following = {user['username']: user['is_following'] for user in data}
+        self.assertEqual(following, {'author0': True, 'author1': True, 'author2': False, 'author3': False})
+
+    def test_large_follow_sets_are_batched_per_list(self):
+        request = self.make_request()
+
+        with mock.patch.object(relations, 'FOLLOW_SET_LIMIT', 0), self.assertNumQueries(1):
+            data = UserSerializer(self.authors, many=True, context={'request': request}).data
+
+        self.assertEqual([user['is_following'] for user in data], [True, True, False, False])
+
+
+class CompactUserTest(TestCase):
+
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="1234")
+        self.author = User.objects.create_user(
+            username="author", email="author@example.com", password="1234", first_name="Sara", last_name="Ahmadi"
+        )
+        for i in range(3):
+            post = Post.objects.create(author=self.author, content=f"post {i}")
+            post.mentions.add(self.viewer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_nested_users_are_compact(self):
+        response = self.client.get('/api/posts/')
+        author_info = response.data['posts'][0]['author_info']
+        self.assertEqual(author_info, {'id': self.author.id, 'username': 'author', 'display_name': 'Sara Ahmadi', 'avatar': None})
+        self.assertEqual(response.data['posts'][0]['mentions'][0]['username'], 'viewer')
+        self.assertNotIn('users', response.data)
+
+    def test_user_map_deduplicates_users(self):
+        response = self.client.get('/api/posts/', {'users': 'map'})
+        posts = response.data['posts']
+        self.assertEqual([post['author_info'] for post in posts], [self.author.id] * 3)
+        self.assertEqual(posts[0]['mentions'], [self.viewer.id])
+        self.assertEqual(set(response.data['users']), {self.author.id, self.viewer.id})
+        self.assertEqual(response.data['users'][self.author.id]['display_name'], 'Sara Ahmadi')
@@ -12,13 +12,14 @@ from django.conf import settings
 from django.db.models import Q
 from django.contrib.auth.hashers import make_password
 from datetime import timedelta
-import os
 
 from .models import User
 from .serializers import UserSerializer, SignUpSerializer, LoginSerializer, ResendVerificationSerializer
 
 # جایگزین کردن لاگر قدیمی
 from log_manager.log_config import log_info, log_error, log_warning, log_security, log_audit
+from uploads.files import UploadError, claim_uploads
+from uploads.models import Upload
 
 MAX_PROFILE_PICTURE_SIZE = 1024 * 1024
 
@@ -508,15 +509,26 @@ def update_profile(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_profile_picture(request):
-    """Update profile picture"""
-    if 'profile_picture' not in request.FILES:
+    """Update profile picture (multipart file or upload_id of a finished chunked upload)"""
+    upload_id = request.data.get('upload_id')
+    if 'profile_picture' not in request.FILES and not upload_id:
         log_warning("Profile picture update without file", request)
         return Response({
             'success': False,
             'message': 'No image file provided'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    profile_picture = request.FILES['profile_picture']
+    if 'profile_picture' in request.FILES:
+        profile_picture = request.FILES['profile_picture']
+    else:
+        try:
+            profile_picture = claim_uploads(request.user, [upload_id], Upload.PURPOSE_PROFILE_PICTURE)[0]
+        except UploadError as e:
+            log_warning(f"Profile picture update with invalid upload: {str(e)}", request, {'upload_id': upload_id})
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
     user = request.user
 
     # Validate file type
@@ -537,15 +549,10 @@ def update_profile_picture(request):
 
     try:
         with transaction.atomic():
-            old_picture_path = user.profile_picture.path if user.profile_picture else None
-            
+            # ارجاع عکس قبلی با سیگنال‌های uploads.blobs کم می‌شود (عکس مشترک حذف نمی‌شود)
             user.profile_picture = profile_picture
             user.save()
             
-            # Delete old picture file
-            if old_picture_path and os.path.isfile(old_picture_path):
-                os.remove(old_picture_path)
-            
             log_info(f"User updated profile picture", request, {
                 'file_size': profile_picture.size,
                 'content_type': profile_picture.content_type
@@ -580,7 +587,6 @@ def delete_profile_picture(request):
 
     try:
         with transaction.atomic():
-            user.profile_picture.delete(save=False)
             user.profile_picture = None
             user.save()
 
@@ -2,4 +2,15 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# بعد از get_asgi_application (django.setup) import شود
+from messaging.websocket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """HTTP به Django و WebSocket (/ws/messaging/) به messaging.websocket"""
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,115 @@
+"""
+بنچمارک فید خانه: fan-out-on-write در برابر fan-out-on-read
+
+- write: هزینه‌ی ساخت یک پست (نوشتن در تایم‌لاین همه‌ی دنبال‌کننده‌ها)
+- read:  صفحه‌ی اول فید (20 پست) برای کاربران تصادفی
+
+    python -m benchmarks.bench_feed --users 5000 --follows 200 --posts 20
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import setup_django, benchmark_database, measure, print_table
+
+setup_django()
+
+from django.db.models import Count  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from social.models import UserFollow  # noqa: E402
+from posts.models import Post, TimelineEntry  # noqa: E402
+from posts.feed import backfill_timeline, fanout_post, home_feed_queryset  # noqa: E402
+
+PAGE_SIZE = 20
+BATCH_SIZE = 5000
+
+
+def populate(users, follows, posts_per_user, rng):
+    User.objects.bulk_create(
+        [User(username=f'bench{i}', email=f'bench{i}@example.com') for i in range(users)],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+    # توزیع نامتوازن: بعضی نویسنده‌ها دنبال‌کننده‌ی خیلی بیشتری دارند
+    weights = [1 / (rank + 1) for rank in range(len(user_ids))]
+    relations = []
+    for follower_id in user_ids:
+        followees = set(rng.choices(user_ids, weights=weights, k=follows))
+        followees.discard(follower_id)
+        relations.extend(UserFollow(follower_id=follower_id, following_id=f) for f in followees)
+    UserFollow.objects.bulk_create(relations, batch_size=BATCH_SIZE)
+
+    for row in UserFollow.objects.values('following_id').annotate(n=Count('id')):
+        User.objects.filter(id=row['following_id']).update(followers_count=row['n'])
+
+    # ترتیب تصادفی تا پست‌های هر نویسنده در طول زمان پخش شوند (created_at از auto_now_add)
+    posts = [
+        Post(author_id=author_id, content='bench', category='general')
+        for author_id in user_ids for _ in range(posts_per_user)
+    ]
+    rng.shuffle(posts)
+    Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+    return user_ids
+
+
+def fanout_on_read_queryset(user):
+    followees = UserFollow.objects.filter(follower=user).values('following_id')
+    return Post.objects.filter(author__in=followees, parent=None) | Post.objects.filter(author=user, parent=None)
+
+
+def first_page(queryset):
+    return list(queryset.order_by('-created_at', '-id').values_list('id', flat=True)[:PAGE_SIZE])
+
+
+def run(args):
+    rng = random.Random(7)
+    user_ids = populate(args.users, args.follows, args.posts, rng)
+    readers = [User.objects.get(id=user_id) for user_id in rng.sample(user_ids, min(50, len(user_ids)))]
+
+    start = time.perf_counter()
+    for user in User.objects.iterator():
+        backfill_timeline(user, limit=args.backfill_limit)
+    backfill_ms = (time.perf_counter() - start) * 1000
+
+    rows = [('backfill all timelines', f'{backfill_ms:.0f}', f'{TimelineEntry.objects.count()} entries')]
+
+    # هزینه‌ی نوشتن: یک پست جدید از پرمخاطب‌ترین و یک نویسنده‌ی معمولی
+    for label, author in (
+        ('write: top author', User.objects.order_by('-followers_count').first()),
+        ('write: median author', User.objects.order_by('-followers_count')[len(user_ids) // 2]),
+    ):
+        def create_and_fanout():
+            post = Post.objects.create(author=author, content='new', category='general')
+            fanout_post(post)
+
+        _, write_ms = measure(create_and_fanout, args.repeat)
+        rows.append((label, f'{write_ms:.2f}', f'{author.followers_count} followers'))
+
+    for label, build in (
+        ('read: fan-out-on-write', home_feed_queryset),
+        ('read: fan-out-on-read', fanout_on_read_queryset),
+    ):
+        timings = [measure(lambda: first_page(build(user)), args.repeat)[1] for user in readers]
+        timings.sort()
+        rows.append((label, f'{timings[len(timings) // 2]:.2f}', f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms'))
+
+    print_table(['operation', 'median ms', 'notes'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--follows', type=int, default=200, help='Followees per user')
+    parser.add_argument('--posts', type=int, default=20, help='Posts per user')
+    parser.add_argument('--backfill-limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+بنچمارک کدگذاری JSON: JSONRenderer در برابر FastJSONRenderer روی پاسخ‌های واقعی
+(صفحه‌ی پست‌ها و اعلان‌ها، پاسخ read_logs) و خط‌های JsonLineFormatter با json / orjson
+
+    python -m benchmarks.bench_json --page 100
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+
+from benchmarks.utils import setup_django, benchmark_database, measure, print_table
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from benchmarks.bench_list_rendering import populate, context_for  # noqa: E402
+from core import fastjson  # noqa: E402
+from core.renderers import FastJSONRenderer  # noqa: E402
+from log_manager.jsonlog import JsonLineFormatter  # noqa: E402
+from notifications.models import Notification  # noqa: E402
+from notifications.rendering import render_notifications  # noqa: E402
+from posts.models import Post  # noqa: E402
+from posts.rendering import render_posts  # noqa: E402
+
+
+def log_records(count):
+    records = []
+    for i in range(count):
+        record = logging.LogRecord('app', logging.INFO, 'views.py', i, 'درخواست %s انجام شد', (i,), None)
+        record.user = f'user{i % 50}'
+        record.user_id = i % 50
+        record.ip = '127.0.0.1'
+        record.path = '/api/posts/'
+        records.append(record)
+    return records
+
+
+def read_logs_response(count):
+    now = timezone.now()
+    return {
+        'success': True,
+        'logs': [{
+            'timestamp': f'{now:%Y-%m-%d %H:%M:%S}', 'level': 'INFO', 'user': f'user{i}', 'user_id': i,
+            'ip': '127.0.0.1', 'location': 'views:42', 'path': '/api/posts/', 'message': 'درخواست انجام شد',
+        } for i in range(count)],
+        'pagination': {'page': 1, 'per_page': count, 'has_next': True, 'has_previous': False},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp()
+    rows = []
+    try:
+        with override_settings(MEDIA_ROOT=media_root), benchmark_database():
+            viewer = populate(args.page)
+            posts = list(Post.objects.for_listing(viewer)[:args.page])
+            notifications = list(Notification.objects.filter(recipient=viewer).select_related('sender')[:args.page])
+
+            payloads = (
+                ('posts page', {'success': True, 'posts': render_posts(posts, context_for(viewer))}),
+                ('notifications page', {'success': True, 'notifications': render_notifications(notifications, context_for(viewer))}),
+                ('read_logs page', read_logs_response(args.page)),
+            )
+            slow_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+            for name, data in payloads:
+                assert slow_renderer.render(data) == fast_renderer.render(data)
+                slow_best, slow_median = measure(lambda: slow_renderer.render(data), repeat=args.repeat)
+                fast_best, fast_median = measure(lambda: fast_renderer.render(data), repeat=args.repeat)
+                rows.append((name, f'{slow_median:.3f}', f'{fast_median:.3f}', f'{slow_median / fast_median:.1f}x'))
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    # همان دیکشنری‌ای که JsonLineFormatter می‌سازد، با کدگذار قبلی و فعلی
+    entries = [json.loads(line) for line in map(JsonLineFormatter().format, log_records(1000))]
+    slow_best, slow_median = measure(
+        lambda: [json.dumps(entry, ensure_ascii=False, default=str) for entry in entries], repeat=args.repeat)
+    fast_best, fast_median = measure(lambda: [fastjson.dumps(entry, default=str) for entry in entries], repeat=args.repeat)
+    rows.append(('1000 log lines', f'{slow_median:.3f}', f'{fast_median:.3f}', f'{slow_median / fast_median:.1f}x'))
+
+    print_table(['payload', 'json ms', 'orjson ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+بنچمارک سریالایز صفحه‌های لیست: PostSerializer / NotificationSerializer در برابر
+render_posts / render_notifications (زمان CPU برای هر صفحه‌ی ۱۰۰ تایی، بدون کوئری)
+
+    python -m benchmarks.bench_list_rendering --page 100
+"""
+import argparse
+import shutil
+import tempfile
+
+from benchmarks.utils import setup_django, benchmark_database, measure, print_table
+
+setup_django()
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from accounts.serializers import serializer_context  # noqa: E402
+from interactions.models import Reaction  # noqa: E402
+from notifications.models import Notification  # noqa: E402
+from notifications.rendering import render_notifications  # noqa: E402
+from notifications.serializers import NotificationSerializer  # noqa: E402
+from posts.models import Post, PostMedia  # noqa: E402
+from posts.rendering import render_posts  # noqa: E402
+from posts.serializers import PostSerializer  # noqa: E402
+
+AUTHORS = 10
+
+
+def populate(page):
+    viewer = User.objects.create_user(username='viewer', email='viewer@example.com', password='x')
+    authors = [User(username=f'author{i}', email=f'author{i}@example.com', first_name='Bench') for i in range(AUTHORS)]
+    User.objects.bulk_create(authors)
+    authors = list(User.objects.exclude(id=viewer.id))
+
+    for i in range(page):
+        post = Post.objects.create(
+            author=authors[i % AUTHORS], content='benchmark post ' * 10, tags='a,b,c',
+            category='general', attributes={'price': i, 'title': 'Bench'},
+        )
+        post.mentions.add(authors[(i + 1) % AUTHORS], authors[(i + 2) % AUTHORS])
+        if i % 3 == 0:
+            PostMedia.objects.create(post=post, file=SimpleUploadedFile(f'{i}.jpg', b'x' * 100), media_type='image')
+        if i % 2 == 0:
+            Reaction.objects.create(user=viewer, post=post, reaction='like')
+        Notification.objects.create(recipient=viewer, sender=authors[i % AUTHORS], notif_type='like', post=post)
+    return viewer
+
+
+def context_for(viewer, query=''):
+    request = Request(RequestFactory().get(f'/?{query}'))
+    request.user = viewer
+    return serializer_context(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp()
+    rows = []
+    try:
+        with override_settings(MEDIA_ROOT=media_root), benchmark_database():
+            viewer = populate(args.page)
+            posts = list(Post.objects.for_listing(viewer)[:args.page])
+            notifications = list(Notification.objects.filter(recipient=viewer).select_related('sender')[:args.page])
+
+            cases = (
+                ('posts', lambda: PostSerializer(posts, many=True, context=context_for(viewer)).data,
+                 lambda: render_posts(posts, context_for(viewer))),
+                ('posts users=map', lambda: PostSerializer(posts, many=True, context=context_for(viewer, 'users=map')).data,
+                 lambda: render_posts(posts, context_for(viewer, 'users=map'))),
+                ('notifications', lambda: NotificationSerializer(notifications, many=True, context=context_for(viewer)).data,
+                 lambda: render_notifications(notifications, context_for(viewer))),
+            )
+            for name, slow, fast in cases:
+                slow_best, slow_median = measure(slow, repeat=args.repeat)
+                fast_best, fast_median = measure(fast, repeat=args.repeat)
+                rows.append((
+                    name, len(posts), f'{slow_median:.2f}', f'{fast_median:.2f}', f'{slow_median / fast_median:.1f}x'
+                ))
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    print_table(['list', 'items', 'DRF ms', 'fast ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
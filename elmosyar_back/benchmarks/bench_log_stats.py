@@ -0,0 +1,89 @@
+"""
+بنچمارک get_log_statistics: پارس کامل application.log در هر درخواست (روش قدیمی)
+در برابر LogStatsStore که فقط خط‌های اضافه شده را پارس می‌کند
+
+    python -m benchmarks.bench_log_stats --lines 100000,500000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.utils import setup_django, parse_sizes, print_table
+
+setup_django()
+
+from log_manager.reader import parse_log_line  # noqa: E402
+from log_manager.stats import LogStatsStore  # noqa: E402
+
+APPEND_LINES = 1000
+LEVELS = ['INFO'] * 90 + ['WARNING'] * 9 + ['ERROR']
+
+
+def write_lines(path, count, start, rng):
+    with open(path, 'a', encoding='utf-8') as f:
+        for i in range(count):
+            timestamp = (start + timedelta(seconds=i * 5)).strftime('%Y-%m-%d %H:%M:%S')
+            f.write(
+                f"📅 {timestamp} | 📊 {rng.choice(LEVELS)} | 👤 user{rng.randint(1, 5000)} | "
+                f"🌐 10.0.0.1 | 📁 views:42 | 📝 request {i} handled\n"
+            )
+
+
+def legacy_statistics(path):
+    user_activities = {}
+    hourly_activity = {str(h).zfill(2): 0 for h in range(24)}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = parse_log_line(line.strip())
+            user = entry.get('user', 'anonymous')
+            user_activities[user] = user_activities.get(user, 0) + 1
+            timestamp = entry.get('timestamp')
+            if timestamp:
+                hour = timestamp.split()[1].split(':')[0]
+                hourly_activity[hour] = hourly_activity.get(hour, 0) + 1
+    return dict(sorted(user_activities.items(), key=lambda x: x[1], reverse=True)[:10]), hourly_activity
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return f'{(time.perf_counter() - start) * 1000:.0f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=parse_sizes, default=parse_sizes('100000,500000'))
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    rows = []
+    for lines in args.lines:
+        log_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(log_dir, 'application.log')
+            start = datetime(2024, 1, 1)
+            write_lines(path, lines, start, rng)
+            store = LogStatsStore(log_dir)
+
+            legacy_ms = timed(lambda: legacy_statistics(path))
+            first_ms = timed(store.update)
+            write_lines(path, APPEND_LINES, start + timedelta(seconds=lines * 5), rng)
+            incremental_ms = timed(lambda: (store.update(), store.summary()))
+            idle_ms = timed(lambda: (store.update(), store.summary()))
+            db_kb = os.path.getsize(store.db_path) / 1024
+            rows.append((lines, legacy_ms, first_ms, incremental_ms, idle_ms, f'{db_kb:.0f}'))
+        finally:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    print_table(
+        ['lines', 'legacy ms', 'first ingest ms', f'+{APPEND_LINES} lines ms', 'no new lines ms', 'store KB'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+بنچمارک هزینه‌ی لاگ روی مسیر درخواست
+
+سه حالت: بدون لاگ، لاگ همزمان (RotatingFileHandler روی thread درخواست)
+و pipeline غیرهمزمان (LOG_ASYNC). هر حالت:
+- فراخوانی مستقیم log_info (میکروبنچمارک)
+- درخواست GET /api/posts/category/<cat>/ با تعداد thread مختلف
+
+    python -m benchmarks.bench_logging --requests 500 --threads 1,8
+"""
+import argparse
+import logging
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import setup_django, benchmark_database, parse_sizes, print_table
+
+setup_django()
+
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from posts.models import Post  # noqa: E402
+from log_manager import log_config  # noqa: E402
+
+CATEGORY = 'bench-logging'
+
+
+def configure(mode, log_dir):
+    """جایگزینی logger سراسری log_config با حالت خواسته شده"""
+    logging.disable(logging.NOTSET)
+    if log_config.logger.pipeline:
+        log_config.logger.pipeline.stop()
+    with override_settings(LOG_DIR=log_dir, LOG_ASYNC=(mode == 'async'), DEBUG=False):
+        log_config.logger = log_config.AdvancedLogger()
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+
+
+def log_calls(count):
+    start = time.perf_counter()
+    for i in range(count):
+        log_config.log_info('benchmark message', None, {'i': i, 'category': CATEGORY})
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def request_latencies(url, requests, threads):
+    latencies = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker():
+        client = Client()
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            response = client.get(url)
+            local.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], len(latencies) / elapsed
+
+
+def run(args, log_dir):
+    author = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    Post.objects.bulk_create(
+        [Post(author=author, content=f'post {i}', category=CATEGORY) for i in range(20)]
+    )
+    url = f'/api/posts/category/{CATEGORY}/'
+
+    rows = []
+    for mode in ('off', 'sync', 'async'):
+        configure(mode, log_dir)
+        call_us = log_calls(args.calls)
+        for threads in args.threads:
+            median, p99, throughput = request_latencies(url, args.requests, threads)
+            rows.append((mode, threads, f'{call_us:.1f}', f'{median:.2f}', f'{p99:.2f}', f'{throughput:.0f}'))
+        if log_config.logger.pipeline:
+            log_config.logger.pipeline.stop()
+            stats = log_config.logger.pipeline.stats()
+            print(f"async pipeline: written={sum(stats['written'].values())} dropped={stats['dropped_total']}")
+
+    logging.disable(logging.NOTSET)
+    print_table(['logging', 'threads', 'log_info µs', 'median ms', 'p99 ms', 'req/s'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', type=parse_sizes, default=parse_sizes('1,8'))
+    parser.add_argument('--calls', type=int, default=20000, help='Direct log_info calls per mode')
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp()
+    try:
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['*']):
+            run(args, log_dir)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
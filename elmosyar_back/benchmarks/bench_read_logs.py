@@ -0,0 +1,126 @@
+"""
+بنچمارک read_logs: روش قدیمی (خواندن کل فایل + فیلتر + reverse) در برابر
+خواندن معکوس با ایندکس کناری (LOG_FORMAT='json')
+
+    python -m benchmarks.bench_read_logs --lines 100000,1000000
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.utils import setup_django, parse_sizes, print_table
+
+setup_django()
+
+from log_manager.jsonlog import JsonLineFormatter, IndexedRotatingFileHandler  # noqa: E402
+from log_manager.reader import field_needles, iter_lines_newest_first, parse_log_line  # noqa: E402
+from log_manager.views import _highlight_log_line  # noqa: E402
+
+PAGE_SIZE = 100
+LEVELS = [logging.INFO] * 90 + [logging.WARNING] * 9 + [logging.ERROR]
+
+
+def write_log(path, lines, rng):
+    handler = IndexedRotatingFileHandler(path, encoding='utf-8')
+    handler.setFormatter(JsonLineFormatter())
+    created = time.time() - lines * 0.05
+    batch = []
+    for i in range(lines):
+        record = logging.LogRecord('app', rng.choice(LEVELS), __file__, 1, f'request {i} handled', None, None)
+        record.created = created + i * 0.05
+        user_id = rng.randint(1, 5000)
+        record.user, record.user_id, record.ip = f'user{user_id}', user_id, '10.0.0.1'
+        batch.append(record)
+        if len(batch) == 1000:
+            handler.emit_batch(batch)
+            batch = []
+    handler.emit_batch(batch)
+    handler.close()
+
+
+def legacy_read(path, level=None, user=None):
+    logs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            entry = parse_log_line(line)
+            if level and entry.get('level') != level:
+                continue
+            if user and user not in entry.get('user', ''):
+                continue
+            logs.append({'raw': line, 'parsed': entry, 'highlight': _highlight_log_line(line)})
+    logs.reverse()
+    return logs[:PAGE_SIZE]
+
+
+def indexed_read(path, level=None, user_id=None):
+    def segment_filter(segment):
+        if level and not segment['lv'].get(level):
+            return False
+        return not user_id or user_id in segment['u']
+
+    needles = []
+    if level:
+        needles.append(field_needles('level', level))
+    if user_id:
+        needles.append(field_needles('user_id', int(user_id)))
+
+    page = []
+    for line in iter_lines_newest_first(path, segment_filter):
+        if not all(any(needle in line for needle in alternatives) for alternatives in needles):
+            continue
+        entry = parse_log_line(line)
+        if level and entry.get('level') != level:
+            continue
+        if user_id and str(entry.get('user_id')) != user_id:
+            continue
+        page.append(line)
+        if len(page) == PAGE_SIZE:
+            break
+    return page
+
+
+def profile(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f'{elapsed:.0f}', f'{peak / 1024 / 1024:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=parse_sizes, default=parse_sizes('100000,1000000'))
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    log_dir = tempfile.mkdtemp()
+    rows = []
+    try:
+        for lines in args.lines:
+            path = os.path.join(log_dir, f'application-{lines}.log')
+            write_log(path, lines, rng)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for name, legacy, indexed in (
+                ('newest page', lambda: legacy_read(path), lambda: indexed_read(path)),
+                ('level=ERROR', lambda: legacy_read(path, 'ERROR'), lambda: indexed_read(path, 'ERROR')),
+                ('one user', lambda: legacy_read(path, user='user42'), lambda: indexed_read(path, user_id='42')),
+            ):
+                legacy_ms, legacy_mb = profile(legacy)
+                indexed_ms, indexed_mb = profile(indexed)
+                rows.append((lines, f'{size_mb:.0f}', name, legacy_ms, legacy_mb, indexed_ms, indexed_mb))
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    print_table(['lines', 'file MB', 'query', 'legacy ms', 'legacy peak MB', 'indexed ms', 'indexed peak MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
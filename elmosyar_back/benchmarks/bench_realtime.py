@@ -0,0 +1,121 @@
+"""
+بنچمارک WebSocket پیام‌رسانی: تعداد اتصال نگه داشته شده در یک worker و تأخیر fan-out
+
+اتصال‌ها مستقیم روی ASGI application (asgi.py) با صف‌های حافظه‌ای ساخته می‌شوند (بدون سوکت
+و سرور)؛ پس حافظه و تأخیر خود لایه‌ی realtime اندازه گرفته می‌شود، نه شبکه و uvicorn.
+publish از یک thread دیگر انجام می‌شود، مثل ویویی که بعد از commit رویداد می‌فرستد.
+
+    python -m benchmarks.bench_realtime --connections 1000,5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.utils import setup_django, benchmark_database, parse_sizes, print_table
+
+setup_django()
+
+from asgiref.sync import async_to_sync  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from asgi import application  # noqa: E402
+from core import fastjson  # noqa: E402
+from messaging.realtime import get_broker, reset_broker  # noqa: E402
+
+FANOUT_ROUNDS = 5
+
+
+class BenchConnection:
+
+    def __init__(self, token):
+        self.incoming = asyncio.Queue()
+        self.user_id = None
+        self.expected = None
+        self.started = 0.0
+        self.latency = None
+        self.ready = asyncio.Event()
+        self.done = None
+        scope = {'type': 'websocket', 'path': '/ws/messaging/', 'headers': [],
+                 'query_string': f'token={token}'.encode()}
+        self.task = asyncio.ensure_future(application(scope, self.incoming.get, self.send))
+
+    async def send(self, message):
+        if message['type'] != 'websocket.send':
+            return
+        if not self.ready.is_set():
+            self.user_id = fastjson.loads(message['text'])['data']['user_id']
+            self.ready.set()
+        elif message['text'] == self.expected and not self.done.done():
+            self.latency = time.perf_counter() - self.started
+            self.done.set_result(None)
+
+
+def create_users(count):
+    User = get_user_model()
+    User.objects.bulk_create([
+        User(username=f'ws{i}', email=f'ws{i}@example.com', password='!') for i in range(count)
+    ], batch_size=1000)
+    return [str(AccessToken.for_user(user)) for user in User.objects.filter(username__startswith='ws')]
+
+
+async def run(tokens):
+    reset_broker()
+    broker = get_broker()
+    loop = asyncio.get_running_loop()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    connections = [BenchConnection(token) for token in tokens]
+    for connection in connections:
+        await connection.incoming.put({'type': 'websocket.connect'})
+    await asyncio.gather(*(connection.ready.wait() for connection in connections))
+    connect_seconds = time.perf_counter() - start
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / len(connections)
+    tracemalloc.stop()
+
+    user_ids = [connection.user_id for connection in connections]
+    p50s, p99s, maxima = [], [], []
+    for i in range(FANOUT_ROUNDS):
+        text = fastjson.dumps({'type': 'bench', 'data': i})
+        for connection in connections:
+            connection.expected = text
+            connection.latency = None
+            connection.done = loop.create_future()
+        started = time.perf_counter()
+        for connection in connections:
+            connection.started = started
+        await loop.run_in_executor(None, broker.publish, user_ids, text)
+        await asyncio.gather(*(connection.done for connection in connections))
+        latencies = sorted(connection.latency * 1000 for connection in connections)
+        p50s.append(latencies[len(latencies) // 2])
+        p99s.append(latencies[int(len(latencies) * 0.99) - 1])
+        maxima.append(latencies[-1])
+
+    held = broker.connection_count()
+    for connection in connections:
+        await connection.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+    await asyncio.gather(*(connection.task for connection in connections))
+    return (held, f'{connect_seconds:.2f}', f'{per_connection / 1024:.1f}',
+            f'{statistics.median(p50s):.1f}', f'{statistics.median(p99s):.1f}', f'{statistics.median(maxima):.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=parse_sizes, default=parse_sizes('1000,5000'))
+    args = parser.parse_args()
+
+    rows = []
+    with benchmark_database():
+        tokens = create_users(max(args.connections))
+        for count in args.connections:
+            rows.append(async_to_sync(run)(tokens[:count]))
+
+    print_table(['connections', 'connect s', 'KB/conn', 'fan-out p50 ms', 'p99 ms', 'max ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+ابزار مشترک بنچمارک‌ها
+
+اجرا از پوشه elmosyar_back:
+    python -m benchmarks.<name> [options]
+
+هر بنچمارک روی یک دیتابیس تست موقت (مثل manage.py test) اجرا می‌شود
+و به دیتابیس اصلی دست نمی‌زند.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """ساخت دیتابیس تست موقت و حذف آن بعد از اجرا"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=5, warmup=1):
+    """اجرای چندباره‌ی func و برگرداندن (بهترین، میانه) به میلی‌ثانیه"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def parse_sizes(value):
+    return [int(size.replace('_', '')) for size in value.split(',') if size.strip()]
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    line = '  '.join(f'{{:>{width}}}' for width in widths)
+    print(line.format(*headers))
+    print(line.format(*['-' * width for width in widths]))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,42 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def adjust_counter(model, pk, field, delta=1):
+    """
+    افزایش/کاهش اتمیک یک ستون شمارنده با F()
+    مقدار هیچ‌وقت منفی نمی‌شود تا drift باعث خطای دیتابیس نشود
+    """
+    if pk is None or not delta:
+        return 0
+    return model.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+class CounterFieldsMixin:
+    """
+    ستون‌های شمارنده‌ی counter_fields فقط با adjust_counter (F()) نوشته می‌شوند
+    save معمولی یک ردیف موجود (بدون update_fields) آن‌ها را از مقدار قدیمی نمونه بازنویسی نمی‌کند،
+    تا افزایش‌های همزمان سیگنال‌ها بین load و save از دست نروند.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def count_subquery(queryset, field):
+    """زیرکوئری شمارش ردیف‌های مرتبط با OuterRef('pk') (بدون ضرب شدن ردیف‌ها در JOIN)"""
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
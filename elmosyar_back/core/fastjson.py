@@ -0,0 +1,45 @@
+"""
+کدگذاری/خواندن JSON با orjson (در صورت نصب بودن) و fallback به json استاندارد
+
+خروجی dumps همیشه str با کاراکترهای غیر ASCII (فارسی) بدون escape است.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - بدون orjson همه‌چیز با json استاندارد کار می‌کند
+    orjson = None
+
+
+HAS_ORJSON = orjson is not None
+
+if HAS_ORJSON:
+    # datetimeها به default سپرده می‌شوند تا فرمتشان با encoder فعلی (مثلا DRF) یکی بماند
+    DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+    DUMPS_OPTIONS = 0
+    JSONDecodeError = json.JSONDecodeError
+
+
+def dumps_bytes(obj, default=None):
+    """JSON فشرده به صورت bytes (UTF-8)"""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(obj, default=default, option=DUMPS_OPTIONS)
+        except TypeError:
+            # اعداد خارج از بازه‌ی 64 بیتی و موارد نادر دیگر
+            pass
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj, default=None):
+    """JSON فشرده به صورت str"""
+    return dumps_bytes(obj, default).decode('utf-8')
+
+
+def loads(data):
+    """خواندن JSON از str یا bytes"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
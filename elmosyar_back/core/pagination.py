@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import APIException
+
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+MAX_PER_PAGE = 100
+
+
+class PaginationError(APIException):
+    """پارامتر صفحه‌بندی نامعتبر؛ پاسخ 400 با همان ساختار success/message بقیه‌ی API"""
+    status_code = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.detail = {'success': False, 'message': message}
+
+
+# ════════════════════════════════════════════════════════════
+# 🔑 Cursor Encoding
+# ════════════════════════════════════════════════════════════
+
+def encode_cursor(values, direction):
+    """
+    cursor مات (opaque) برای کلاینت: مقادیر کلید مرتب‌سازی + جهت
+    direction: 'n' (صفحه‌ی بعد) یا 'p' (صفحه‌ی قبل)
+    """
+    payload = json.dumps({'v': values, 'd': direction}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields, model):
+    """تبدیل cursor به (مقادیر تایپ شده، جهت)؛ برای cursor نامعتبر ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError('Invalid cursor')
+
+    try:
+        values = [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+    except DjangoValidationError:
+        raise ValueError('Invalid cursor')
+    if any(value is None for value in values):
+        raise ValueError('Invalid cursor')
+    return values, direction
+
+
+# ════════════════════════════════════════════════════════════
+# 📄 Keyset Pagination
+# ════════════════════════════════════════════════════════════
+
+def _keyset_condition(fields, values, lookup):
+    """
+    شرط (f1, f2, ...) < (v1, v2, ...) به صورت OR از AND ها
+    تا با ایندکس ترکیبی روی همان ستون‌ها اجرا شود
+    """
+    condition = Q()
+    for index, field in enumerate(fields):
+        term = Q(**{f'{field}__{lookup}': values[index]})
+        for previous_field, previous_value in zip(fields[:index], values[:index]):
+            term &= Q(**{previous_field: previous_value})
+        condition |= term
+    return condition
+
+
+def _item_values(item, fields):
+    return [getattr(item, field) for field in fields]
+
+
+def cursor_paginate(queryset, cursor=None, per_page=20, ordering=DEFAULT_ORDERING, with_count=False):
+    """
+    صفحه‌بندی keyset بدون OFFSET و COUNT(*)
+    همه‌ی فیلدهای ordering باید هم‌جهت باشند و آخرینشان یکتا (معمولاً id)
+    خروجی: (لیست آیتم‌ها، دیکشنری pagination)
+    """
+    descending = ordering[0].startswith('-')
+    fields = [field.lstrip('-') for field in ordering]
+    if any(field.startswith('-') != descending for field in ordering):
+        raise ValueError('Cursor pagination needs all ordering fields in the same direction')
+
+    reverse_ordering = [field if descending else f'-{field}' for field in fields]
+    direction = 'n'
+    page_queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values, direction = decode_cursor(cursor, fields, queryset.model)
+        # برای صفحه‌ی بعد در ترتیب نزولی دنبال مقادیر کوچکتر هستیم و برعکس
+        forward_lookup = 'lt' if descending else 'gt'
+        backward_lookup = 'gt' if descending else 'lt'
+        if direction == 'n':
+            page_queryset = page_queryset.filter(_keyset_condition(fields, values, forward_lookup))
+        else:
+            page_queryset = (
+                queryset.order_by(*reverse_ordering)
+                .filter(_keyset_condition(fields, values, backward_lookup))
+            )
+
+    items = list(page_queryset[:per_page + 1])
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if direction == 'p':
+        items.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(cursor)
+
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': encode_cursor(_item_values(items[-1], fields), 'n') if has_next and items else None,
+        'prev_cursor': encode_cursor(_item_values(items[0], fields), 'p') if has_previous and items else None,
+        'has_next': has_next and bool(items),
+        'has_previous': has_previous and bool(items),
+    }
+    if with_count:
+        pagination['total_count'] = queryset.order_by().count()
+    return items, pagination
+
+
+def page_paginate(queryset, page=1, per_page=20, ordering=DEFAULT_ORDERING):
+    """صفحه‌بندی قدیمی با شماره‌ی صفحه (OFFSET + COUNT) برای سازگاری با کلاینت‌های فعلی"""
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    try:
+        current_page = paginator.page(page)
+    except Exception:
+        current_page = paginator.page(1)
+
+    return list(current_page), {
+        'page': page,
+        'per_page': per_page,
+        'total_pages': paginator.num_pages,
+        'total_count': paginator.count,
+        'has_next': current_page.has_next(),
+        'has_previous': current_page.has_previous(),
+    }
+
+
+def paginate(request, queryset, default_per_page=20, ordering=DEFAULT_ORDERING):
+    """
+    صفحه‌بندی مشترک همه‌ی endpointهای لیست
+
+    ?cursor=...      صفحه‌بندی keyset (پیش‌فرض)
+    ?with_count=1    اضافه شدن total_count در حالت cursor
+    ?page=N          حالت قدیمی شماره‌ی صفحه (با total_pages و total_count)
+    """
+    params = request.GET
+    try:
+        per_page = min(int(params.get('per_page', default_per_page)), MAX_PER_PAGE)
+        page = int(params['page']) if 'page' in params else None
+    except ValueError:
+        raise PaginationError('Invalid pagination parameters')
+    per_page = max(per_page, 1)
+
+    if page is not None:
+        return page_paginate(queryset, page, per_page, ordering)
+
+    try:
+        return cursor_paginate(
+            queryset,
+            cursor=params.get('cursor'),
+            per_page=per_page,
+            ordering=ordering,
+            with_count=params.get('with_count') in ('1', 'true', 'True'),
+        )
+    except ValueError as e:
+        raise PaginationError(str(e))
@@ -0,0 +1,65 @@
+import io
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from . import fastjson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer با orjson؛ خروجی همان JSON رندر شده با JSONRenderer است
+    (datetime/Decimal/lazy string با همان encoder خود DRF، escape کردن \\u2028 و \\u2029)
+    به جز فرمت اعداد اعشاری: orjson کوتاه‌ترین نمایش را می‌نویسد (1e16 به جای 1e+16، 1.5e-7 به جای 1.5e-07)
+    که همان مقدار را می‌دهد.
+
+    حالت‌های نادر (indent، JSON غیر فشرده، نبود orjson) به JSONRenderer اصلی سپرده می‌شوند؛
+    Decimal نامتناهی هم، تا مثل DRF در حالت STRICT_JSON خطای ValueError بدهد. float نامتناهی
+    بدون بررسی به orjson می‌رسد و null نوشته می‌شود؛ ورودی‌ها (parser سخت‌گیر) و فیلدهای float
+    مدل‌ها چنین مقداری ندارند و بررسی کل داده برای آن از خود رندر کندتر است.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not fastjson.HAS_ORJSON or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+
+        def default(obj):
+            if isinstance(obj, Decimal) and not obj.is_finite():
+                raise TypeError('non-finite Decimal')
+            return encoder.default(obj)
+
+        try:
+            ret = fastjson.orjson.dumps(data, default=default, option=fastjson.DUMPS_OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser با orjson؛ ورودی‌هایی که orjson قبول نمی‌کند (مثل NaN) با json استاندارد خوانده می‌شوند"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not fastjson.HAS_ORJSON or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        data = stream.read()
+        try:
+            return fastjson.orjson.loads(data)
+        except fastjson.JSONDecodeError:
+            pass
+        return super().parse(io.BytesIO(data), media_type, parser_context)
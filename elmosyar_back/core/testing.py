@@ -0,0 +1,22 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TempMediaRootMixin:
+    """
+    MEDIA_ROOT موقت و خالی برای هر تست (و پوشه‌ی آپلودهای تکه‌تکه داخل همان)
+    تا فایل‌های تست در media واقعی نمانند؛ قبل از TestCase در لیست پایه‌ها بیاید.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'partial')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
@@ -0,0 +1,66 @@
+import datetime
+import decimal
+import json
+from io import BytesIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .renderers import FastJSONParser, FastJSONRenderer
+
+
+User = get_user_model()
+
+class FastJSONRendererTest(TestCase):
+
+    def test_output_matches_json_renderer(self):
+        data = {
+            'message': 'سلام\u2028دنیا',
+            'created_at': timezone.now(),
+            'date': datetime.date(2024, 1, 2),
+            'price': decimal.Decimal('10.50'),
+            'counts': {1: 2, 'x': None},
+            'items': [1.5, True, ('a', 'b')],
+            'lazy': gettext_lazy('hello'),
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_float_format_and_non_finite(self):
+        # کوتاه‌ترین نمایش orjson؛ همان مقدارها با نمایش متفاوت از json استاندارد
+        data = {'big': 1e16, 'small': 1.5e-7, 'plain': 0.1}
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(rendered, b'{"big":1e16,"small":1.5e-7,"plain":0.1}')
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+
+        with self.assertRaisesMessage(ValueError, 'Out of range float values are not JSON compliant'):
+            FastJSONRenderer().render({'items': [{'value': decimal.Decimal('-Infinity')}]})
+        # float نامتناهی بدون پیمایش داده به orjson سپرده می‌شود
+        self.assertEqual(FastJSONRenderer().render({'value': float('nan')}), b'{"value":null}')
+
+    def test_indent_falls_back_to_json_renderer(self):
+        data = {'a': [1, 2]}
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        body = json.dumps({'content': 'متن', 'n': [1, 2]}, ensure_ascii=False).encode('utf-8')
+        self.assertEqual(parser.parse(BytesIO(body)), {'content': 'متن', 'n': [1, 2]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"content": '))
+
+    def test_api_roundtrip(self):
+        user = User.objects.create_user(username="writer", email="writer@example.com", password="1234")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/posts/', {'content': 'پست تازه', 'category': 'general'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['post']['content'], 'پست تازه')
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Comment = apps.get_model('interactions', 'Comment')
+    CommentLike = Comment._meta.get_field('likes').remote_field.through
+    CommentDislike = Comment._meta.get_field('dislikes').remote_field.through
+    Comment.objects.update(
+        likes_count=_count(CommentLike.objects.all(), 'comment'),
+        dislikes_count=_count(CommentDislike.objects.all(), 'comment'),
+        replies_count=_count(Comment.objects.all(), 'parent'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
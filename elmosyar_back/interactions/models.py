@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+
+from core.counters import CounterFieldsMixin
 from posts.models import Post
 
 
@@ -24,7 +26,7 @@ class Reaction(models.Model):
         return f"{self.user.username} {self.reaction} on {self.post_id}"
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField(max_length=1000)
@@ -34,21 +36,15 @@ class Comment(models.Model):
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_comments', blank=True)
     dislikes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='disliked_comments', blank=True)
 
+    # شمارنده‌های denormalize شده (interactions/signals.py)
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    replies_count = models.PositiveIntegerField(default=0)
+    counter_fields = ('likes_count', 'dislikes_count', 'replies_count')
+
     class Meta:
         ordering = ['-created_at']
         db_table = 'comment'
 
     def __str__(self):
         return f"Comment by {self.user} on {self.post_id}"
-
-    @property
-    def likes_count(self):
-        return self.likes.count()
-
-    @property
-    def dislikes_count(self):
-        return self.dislikes.count()
-
-    @property
-    def replies_count(self):
-        return self.replies.count()
\ No newline at end of file
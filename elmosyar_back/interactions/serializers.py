@@ -1,12 +1,10 @@
 from rest_framework import serializers
-from accounts.serializers import UserSerializer
+from accounts.serializers import CompactUserSerializer
 from .models import Comment
 
 
 class CommentSerializer(serializers.ModelSerializer):
-    user_info = UserSerializer(source='user', read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    replies_count = serializers.SerializerMethodField()
+    user_info = CompactUserSerializer(source='user', read_only=True)
     is_liked = serializers.SerializerMethodField()
     is_disliked = serializers.SerializerMethodField()
 
@@ -17,16 +15,7 @@ class CommentSerializer(serializers.ModelSerializer):
             'parent', 'likes_count', 'is_liked',
             'dislikes_count', 'is_disliked', 'replies_count'
         ]
-        read_only_fields = ['user', 'created_at']
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-
-    def get_dislikes_count(self, obj):
-        return obj.dislikes.count()
-
-    def get_replies_count(self, obj):
-        return Comment.objects.filter(parent=obj).count()
+        read_only_fields = ['user', 'created_at', 'likes_count', 'dislikes_count', 'replies_count']
 
     def get_is_liked(self, obj):
         request = self.context.get('request')
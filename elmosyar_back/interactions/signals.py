@@ -0,0 +1,60 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.counters import adjust_counter, count_subquery
+from posts.models import Post
+from .models import Reaction, Comment
+
+
+# ─── Post reactions ───
+
+def _reaction_field(reaction):
+    return 'likes_count' if reaction.reaction == 'like' else 'dislikes_count'
+
+
+@receiver(post_save, sender=Reaction)
+def reaction_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Post, instance.post_id, _reaction_field(instance), 1)
+
+
+@receiver(post_delete, sender=Reaction)
+def reaction_deleted(sender, instance, **kwargs):
+    adjust_counter(Post, instance.post_id, _reaction_field(instance), -1)
+
+
+# ─── Comments ───
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Post, instance.post_id, 'comments_count', 1)
+        adjust_counter(Comment, instance.parent_id, 'replies_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    adjust_counter(Post, instance.post_id, 'comments_count', -1)
+    adjust_counter(Comment, instance.parent_id, 'replies_count', -1)
+
+
+# ─── Comment likes / dislikes (M2M) ───
+# remove() برای کاربری که واکنشی نداشته هم سیگنال می‌فرستد، پس به جای +1/-1
+# شمارنده‌ی کامنت‌های درگیر در همان UPDATE از جدول واسط دوباره شمرده می‌شود
+
+def _sync_comment_reaction_counts(comment_ids):
+    Comment.objects.filter(pk__in=comment_ids).update(
+        likes_count=count_subquery(Comment.likes.through.objects.all(), 'comment'),
+        dislikes_count=count_subquery(Comment.dislikes.through.objects.all(), 'comment'),
+    )
+
+
+@receiver(m2m_changed, sender=Comment.likes.through)
+@receiver(m2m_changed, sender=Comment.dislikes.through)
+def comment_reactions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        _sync_comment_reaction_counts([instance.pk])
+    elif pk_set:
+        _sync_comment_reaction_counts(pk_set)
@@ -65,15 +65,14 @@ def _handle_post_reaction(request, post_id, reaction_type):
                     'post_author': post.author.username
                 })
             
-            # Get updated counts
-            likes_count = post.reactions.filter(reaction='like').count()
-            dislikes_count = post.reactions.filter(reaction='dislike').count()
+            # Get updated counts (maintained by interactions/signals.py)
+            post.refresh_from_db(fields=['likes_count', 'dislikes_count'])
             
             return {
                 'success': True,
                 'message': action.capitalize(),
-                'likes_count': likes_count,
-                'dislikes_count': dislikes_count,
+                'likes_count': post.likes_count,
+                'dislikes_count': post.dislikes_count,
                 'user_reaction': user_reaction
             }, status.HTTP_200_OK
             
@@ -170,11 +169,12 @@ def post_comment(request, post_id):
             })
             
             serializer = CommentSerializer(comment, context={'request': request})
+            post.refresh_from_db(fields=['comments_count'])
             
             return Response({
                 'success': True,
                 'comment': serializer.data,
-                'comments_count': post.comments.count()
+                'comments_count': post.comments_count
             }, status=status.HTTP_201_CREATED)
     except Exception as e:
         log_error(f"Comment creation failed: {str(e)}", request, {'post_id': post_id})
@@ -231,15 +231,14 @@ def _handle_comment_reaction(request, comment_id, reaction_type):
                     'comment_author': comment.user.username
                 })
             
-            # Get updated counts
-            likes_count = comment.likes.count()
-            dislikes_count = comment.dislikes.count()
+            # Get updated counts (maintained by interactions/signals.py)
+            comment.refresh_from_db(fields=['likes_count', 'dislikes_count'])
             
             return {
                 'success': True,
                 'message': action.capitalize(),
-                'likes_count': likes_count,
-                'dislikes_count': dislikes_count,
+                'likes_count': comment.likes_count,
+                'dislikes_count': comment.dislikes_count,
                 'is_liked': comment.likes.filter(id=request.user.id).exists(),
                 'is_disliked': comment.dislikes.filter(id=request.user.id).exists()
             }, status.HTTP_200_OK
@@ -0,0 +1,217 @@
+import os
+import shutil
+import struct
+
+from .reader import iter_lines_newest_first, iter_region_reverse, iter_rotated_lines_newest_first, parse_log_line
+
+
+ACTIVITY_SUFFIX = '.activity'
+GENERATION_FILE = 'generation'
+START_FILE = 'start'
+
+# هر ورودی: (نسل فایل، آفست بایتی، طول خط)؛ ۱۶ بایت ثابت تا با یک seek به هر ورودی رسید
+ENTRY = struct.Struct('<IQI')
+
+
+def activity_dir(log_path):
+    return log_path + ACTIVITY_SUFFIX
+
+
+def read_generation(directory):
+    try:
+        with open(os.path.join(directory, GENERATION_FILE), encoding='ascii') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def read_start(directory):
+    """نقطه‌ی شروع ایندکس (نسل، آفست)؛ None اگر ثبت نشده باشد"""
+    try:
+        with open(os.path.join(directory, START_FILE), encoding='ascii') as f:
+            generation, offset = f.read().split()
+            return int(generation), int(offset)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def reset_activity_index(log_path):
+    """حذف ایندکس فعالیت (بعد از پاک شدن فایل لاگ آفست‌ها دیگر معتبر نیستند)"""
+    shutil.rmtree(activity_dir(log_path), ignore_errors=True)
+
+
+class UserActivityIndex:
+    """
+    ایندکس append-only فعالیت هر کاربر کنار فایل لاگ:
+    <log>.activity/<user_id>.idx  دنباله‌ی ورودی‌های ENTRY (قدیمی به جدید)
+    <log>.activity/generation     شمارنده‌ی چرخش فایل
+    <log>.activity/start          (نسل، آفست) جایی که ایندکس شروع شده؛ خط‌های قبل از آن ایندکس ندارند
+
+    نسل g در زمان خواندن به فایل (generation فعلی - g) نگاشت می‌شود:
+    0 یعنی فایل اصلی، 1 یعنی .1 و ...؛ پس چرخش فایل فقط یک عدد را عوض می‌کند.
+
+    با چند پروسه‌ی نویسنده (چند worker): add و rotated زیر قفل فایل لاگ (BatchRotatingFileHandler)
+    صدا زده می‌شوند، آفست از خود فایل می‌آید و generation بعد از چرخش به دست پروسه‌ی دیگر (reload)
+    و پیش از هر چرخش از فایل generation خوانده می‌شود.
+    """
+
+    def __init__(self, log_path):
+        self.directory = activity_dir(log_path)
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation = read_generation(self.directory)
+        self._mark_start(os.path.getsize(log_path) if os.path.exists(log_path) else 0)
+
+    def add(self, formatted, position, encoding='utf-8'):
+        """ثبت آفست خط‌های یک دسته‌ی نوشته شده؛ برای هر کاربر یک write"""
+        start = position
+        entries = {}
+        for record, line in formatted:
+            size = len(line.encode(encoding))
+            user_id = str(getattr(record, 'user_id', ''))
+            if user_id.isdigit():
+                entries.setdefault(user_id, []).append(ENTRY.pack(self.generation, position, size))
+            position += size
+
+        if entries and not os.path.isdir(self.directory):
+            # پوشه بعد از clear_log_file حذف شده
+            os.makedirs(self.directory, exist_ok=True)
+            self.generation = 0
+            self._write_generation()
+            self._mark_start(start)
+        for user_id, packed in entries.items():
+            with open(os.path.join(self.directory, f'{user_id}.idx'), 'ab') as f:
+                f.write(b''.join(packed))
+
+    def rotated(self):
+        # شاید پروسه‌ی دیگری هم قبلا چرخانده باشد
+        self.generation = read_generation(self.directory) + 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_generation()
+
+    def reload(self):
+        """فایل لاگ را پروسه‌ی دیگری چرخانده"""
+        self.generation = read_generation(self.directory)
+
+    def _mark_start(self, offset):
+        # فقط اولین بار؛ بعد از آن همه‌ی خط‌ها ایندکس دارند
+        try:
+            with open(os.path.join(self.directory, START_FILE), 'x', encoding='ascii') as f:
+                f.write(f'{self.generation} {offset}')
+        except FileExistsError:
+            pass
+
+    def _write_generation(self):
+        temp_path = os.path.join(self.directory, GENERATION_FILE + '.tmp')
+        with open(temp_path, 'w', encoding='ascii') as f:
+            f.write(str(self.generation))
+        os.replace(temp_path, os.path.join(self.directory, GENERATION_FILE))
+
+
+def belongs_to(line, user_id, username):
+    """
+    خط لاگ مال همین کاربر است؟ خط‌های JSON با user_id و خط‌های متنی (بدون user_id) با نام کاربری
+    """
+    entry = parse_log_line(line)
+    if entry.get('user_id') is not None:
+        return str(entry['user_id']) == str(user_id)
+    return entry.get('user') == username
+
+
+def _log_file(log_path, age):
+    return log_path if age == 0 else f'{log_path}.{age}'
+
+
+def _read_entries(index_path, start, end):
+    with open(index_path, 'rb') as f:
+        f.seek(start * ENTRY.size)
+        data = f.read((end - start) * ENTRY.size)
+    return [ENTRY.unpack_from(data, i * ENTRY.size) for i in range(len(data) // ENTRY.size)]
+
+
+def _iter_lines_before(log_path, boundary):
+    """
+    خط‌های قدیمی‌تر از boundary=(age، آفست) از جدید به قدیم؛ boundary=None یعنی همه‌ی خط‌ها
+    (بخش فایل قبل از اولین ورودی ایندکس و بکاپ‌های قدیمی‌تر)
+    """
+    if boundary is None:
+        yield from iter_rotated_lines_newest_first(log_path)
+        return
+    age, offset = boundary
+    path = _log_file(log_path, age)
+    if offset and os.path.exists(path):
+        with open(path, 'rb') as f:
+            yield from iter_region_reverse(f, 0, offset)
+    age += 1
+    while os.path.exists(_log_file(log_path, age)):
+        yield from iter_lines_newest_first(_log_file(log_path, age))
+        age += 1
+
+
+def read_user_activity(log_path, user_id, username, skip=0, limit=50):
+    """
+    خط‌های لاگ یک کاربر از جدید به قدیم: (لیست خط‌ها، has_next)
+
+    تا جایی که ایندکس کاربر هست فقط ورودی‌های همین صفحه خوانده می‌شوند (یک seek در ایندکس و یکی
+    برای هر خط)؛ فقط تاریخچه‌ی قبل از نقطه‌ی شروع ایندکس (یا همه‌چیز، اگر ایندکسی نباشد) با اسکن
+    معکوس فایل و بکاپ‌ها پیدا می‌شود. هر خطی که از ایندکس خوانده می‌شود دوباره با belongs_to چک می‌شود؛
+    ورودی‌ای که به خط کاربر دیگری اشاره کند یعنی ایندکس از این‌جا به بعد قابل اعتماد نیست و صفحه همان‌جا تمام می‌شود.
+    """
+    directory = activity_dir(log_path)
+    index_path = os.path.join(directory, f'{int(user_id)}.idx')
+    generation = read_generation(directory)
+    index_start = read_start(directory)
+    lines = []
+    boundary = None
+
+    if os.path.exists(index_path):
+        count = os.path.getsize(index_path) // ENTRY.size
+        end = count - skip
+        if end > 0:
+            start = max(end - limit - 1, 0)  # یک ورودی اضافه برای has_next
+            entries = _read_entries(index_path, start, end)
+            entries.reverse()
+            handles = {}
+            try:
+                for entry_generation, offset, size in entries:
+                    age = generation - entry_generation
+                    path = _log_file(log_path, age)
+                    if age < 0 or not os.path.exists(path):
+                        # بکاپ‌های قدیمی‌تر حذف شده‌اند؛ ورودی‌های بعدی هم قدیمی‌ترند
+                        return lines, False
+                    if path not in handles:
+                        handles[path] = open(path, 'rb')
+                    handle = handles[path]
+                    handle.seek(offset)
+                    line = handle.read(size).decode('utf-8', errors='replace').strip()
+                    if not line or not belongs_to(line, user_id, username):
+                        return lines, False
+                    if len(lines) == limit:
+                        return lines, True
+                    lines.append(line)
+            finally:
+                for handle in handles.values():
+                    handle.close()
+            if start > 0:
+                return lines, False
+        skip = max(skip - count, 0)
+        if index_start is None and count:
+            # ایندکس بدون نقطه‌ی شروع؛ تاریخچه قبل از اولین ورودی همین کاربر
+            entry_generation, offset, _ = _read_entries(index_path, 0, 1)[0]
+            index_start = (entry_generation, offset)
+
+    if index_start is not None:
+        boundary = (generation - index_start[0], index_start[1])
+        if boundary[0] < 0:
+            return lines, False
+
+    # تاریخچه‌ی قبل از ساخته شدن ایندکس
+    matched = 0
+    for line in _iter_lines_before(log_path, boundary):
+        if username not in line or not belongs_to(line, user_id, username):
+            continue
+        if matched >= skip:
+            if len(lines) == limit:
+                return lines, True
+            lines.append(line)
+        matched += 1
+    return lines, False
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from core import fastjson
+
+from .pipeline import BatchRotatingFileHandler
+
+
+INDEX_SUFFIX = '.idx'
+SEGMENT_SECONDS = 60
+SEGMENT_MAX_RECORDS = 2000
+SEGMENT_MAX_BYTES = 1024 * 1024
+
+# فیلدهای استاندارد LogRecord؛ بقیه‌ی ویژگی‌ها از extra (کانتکست AdvancedLogger) آمده‌اند
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    هر رکورد در یک خط JSON:
+    {"ts", "level", "logger", "user", "user_id", "ip", "module", "line", "message", ...extra}
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'user': getattr(record, 'user', 'anonymous'),
+            'user_id': getattr(record, 'user_id', None),
+            'ip': getattr(record, 'ip', 'unknown'),
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        elif record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return fastjson.dumps(entry, default=str)
+
+
+class IndexedRotatingFileHandler(BatchRotatingFileHandler):
+    """
+    فایل لاگ JSON-lines به همراه ایندکس کنار آن (<file>.idx)
+
+    هر خط ایندکس یک «سگمنت» پشت سر هم از فایل لاگ است:
+    {"o": شروع, "e": پایان, "t0": اولین زمان, "t1": آخرین زمان, "n": تعداد,
+     "lv": {سطح: تعداد}, "u": {user_id: تعداد}}
+    سگمنت با عوض شدن بازه‌ی زمانی (SEGMENT_SECONDS) یا رسیدن به سقف رکورد/حجم بسته می‌شود؛
+    انتهای فایل که هنوز سگمنت بسته شده ندارد هنگام خواندن مستقیم اسکن می‌شود.
+
+    با چند پروسه‌ی نویسنده: آفست‌ها زیر قفل انحصاری فایل از خود فایل گرفته می‌شوند و سگمنت با هر
+    نوشتن پروسه‌ی دیگر بسته می‌شود، پس هر سگمنت فقط خط‌های خودش را دارد و خط‌های بقیه در فاصله‌ها
+    (که همیشه اسکن می‌شوند) می‌مانند؛ سگمنت‌های بی‌ترتیب هم فقط باعث اسکن بیشتر می‌شوند نه از دست رفتن خط.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self.index_path = self.baseFilename + INDEX_SUFFIX
+        self._segment = None
+
+    def batch_written(self, formatted, position):
+        super().batch_written(formatted, position)
+        if self._segment and position < self._segment['e']:
+            # فایل از بیرون کوتاه شده (clear_log_file)؛ ایندکس قبلی دیگر معتبر نیست
+            self._segment = None
+            self._reset_index()
+        elif self._segment and position > self._segment['e']:
+            # پروسه‌ی دیگری بعد از دسته‌ی قبلی نوشته؛ سگمنت فقط خط‌های پشت سر هم همین پروسه را می‌پوشاند
+            # و فاصله‌ی بین سگمنت‌ها هنگام خواندن اسکن می‌شود
+            self._write_segment()
+
+        for record, line in formatted:
+            size = len(line.encode(self.encoding or 'utf-8'))
+            bucket = int(record.created // SEGMENT_SECONDS)
+            segment = self._segment
+            if segment is not None and (
+                segment['bucket'] != bucket
+                or segment['n'] >= SEGMENT_MAX_RECORDS
+                or segment['e'] - segment['o'] >= SEGMENT_MAX_BYTES
+            ):
+                self._write_segment()
+                segment = None
+            if segment is None:
+                segment = self._segment = {
+                    'bucket': bucket, 'o': position, 'e': position,
+                    't0': record.created, 't1': record.created, 'n': 0, 'lv': {}, 'u': {},
+                }
+
+            segment['e'] = position + size
+            segment['t1'] = record.created
+            segment['n'] += 1
+            segment['lv'][record.levelname] = segment['lv'].get(record.levelname, 0) + 1
+            user_id = getattr(record, 'user_id', None)
+            if user_id is not None:
+                key = str(user_id)
+                segment['u'][key] = segment['u'].get(key, 0) + 1
+            position += size
+
+    def stream_reopened(self):
+        # پروسه‌ی دیگری فایل (و ایندکس آن) را چرخانده؛ سگمنت باز مال فایل قبلی است
+        super().stream_reopened()
+        self._segment = None
+
+    def _write_segment(self):
+        segment = self._segment
+        self._segment = None
+        if not segment or not segment['n']:
+            return
+        data = {key: value for key, value in segment.items() if key != 'bucket'}
+        data['t0'] = round(data['t0'], 3)
+        data['t1'] = round(data['t1'], 3)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(data, separators=(',', ':')) + '\n')
+
+    def _reset_index(self):
+        with open(self.index_path, 'w', encoding='utf-8'):
+            pass
+
+    def doRollover(self):
+        self._write_segment()
+        super().doRollover()
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 0, -1):
+                source = f"{self.baseFilename}.{i}{INDEX_SUFFIX}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.baseFilename}.{i + 1}{INDEX_SUFFIX}")
+            if os.path.exists(self.index_path):
+                os.replace(self.index_path, f"{self.baseFilename}.1{INDEX_SUFFIX}")
+        else:
+            self._reset_index()
+
+    def close(self):
+        self.acquire()
+        try:
+            self._write_segment()
+        finally:
+            self.release()
+        super().close()
@@ -6,6 +6,21 @@ from datetime import datetime
 from django.conf import settings
 from django.utils import timezone
 
+from core import fastjson
+
+from .pipeline import LogPipeline, PipelineQueueHandler, BatchRotatingFileHandler
+from .jsonlog import JsonLineFormatter, IndexedRotatingFileHandler
+from .activity import UserActivityIndex, reset_activity_index
+
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+
 class AdvancedLogger:
     """
     سیستم لاگینگ پیشرفته
@@ -13,7 +28,32 @@ class AdvancedLogger:
     
     def __init__(self):
         self.log_dir = self._get_log_directory()
+        # 'text' (پیش‌فرض) یا 'json' (JSON-lines به همراه ایندکس .idx برای read_logs)
+        self.log_format = getattr(settings, 'LOG_FORMAT', 'text')
+        self.pipeline = self._create_pipeline()
         self.setup_loggers()
+        if self.pipeline:
+            self.pipeline.start()
+
+    def _create_pipeline(self):
+        """pipeline غیرهمزمان (LOG_ASYNC)؛ با False همه‌چیز مثل قبل روی thread درخواست نوشته می‌شود"""
+        if not getattr(settings, 'LOG_ASYNC', True):
+            return None
+        return LogPipeline(
+            max_queue=getattr(settings, 'LOG_ASYNC_QUEUE_SIZE', 10000),
+            batch_size=getattr(settings, 'LOG_ASYNC_BATCH_SIZE', 500),
+            flush_interval=getattr(settings, 'LOG_ASYNC_FLUSH_INTERVAL', 0.5),
+            block_timeout=getattr(settings, 'LOG_ASYNC_BLOCK_TIMEOUT', 0.05),
+        )
+
+    def flush(self, timeout=5.0):
+        """نوشتن رکوردهای در صف مانده (قبل از خواندن فایل‌های لاگ)"""
+        if self.pipeline:
+            return self.pipeline.flush(timeout)
+        return True
+
+    def pipeline_stats(self):
+        return self.pipeline.stats() if self.pipeline else None
     
     def _get_log_directory(self):
         log_dir = getattr(settings, 'LOG_DIR', None)
@@ -40,7 +80,8 @@ class AdvancedLogger:
             level=logging.DEBUG if settings.DEBUG else logging.INFO,
             formatter=detailed_formatter,
             max_bytes=10 * 1024 * 1024,
-            backup_count=10
+            backup_count=10,
+            activity_index=True
         )
         
         # لاگر API
@@ -83,8 +124,8 @@ class AdvancedLogger:
             backup_count=30
         )
     
-    def _setup_logger(self, name, filename, level, formatter, max_bytes, backup_count):
-        """تنظیم یک لاگر خاص"""
+    def _setup_logger(self, name, filename, level, formatter, max_bytes, backup_count, activity_index=False):
+        """تنظیم یک لاگر خاص؛ activity_index: ایندکس آفست خط‌های هر کاربر برای my-activity"""
         logger = logging.getLogger(name)
         logger.setLevel(level)
         logger.propagate = False
@@ -93,25 +134,46 @@ class AdvancedLogger:
             logger.handlers.clear()
         
         file_path = os.path.join(self.log_dir, filename)
-        file_handler = logging.handlers.RotatingFileHandler(
+        handler_class = IndexedRotatingFileHandler if self.log_format == 'json' else BatchRotatingFileHandler
+        file_handler = handler_class(
             filename=file_path,
             maxBytes=max_bytes,
             backupCount=backup_count,
             encoding='utf-8'
         )
+        if activity_index and getattr(settings, 'LOG_ACTIVITY_INDEX', True):
+            file_handler.activity_index = UserActivityIndex(file_path)
+        elif activity_index:
+            # ایندکسی که دیگر به‌روز نمی‌شود خط‌های جدید را ندارد
+            reset_activity_index(file_path)
         file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(JsonLineFormatter() if self.log_format == 'json' else formatter)
+        handlers = [file_handler]
         
         if settings.DEBUG:
             console_handler = logging.StreamHandler()
             console_handler.setLevel(level)
             console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
+
+        if self.pipeline:
+            # روی thread درخواست فقط QueueHandler؛ handlerهای واقعی در thread نویسنده
+            self.pipeline.clear_targets(name)
+            for handler in handlers:
+                self.pipeline.add_target(name, handler)
+            logger.addHandler(PipelineQueueHandler(self.pipeline, name))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
     
     def log(self, logger_name, level, message, request=None, extra_data=None):
         """ثبت لاگ با کانتکست کامل"""
         logger = logging.getLogger(logger_name)
+        levelno = LOG_LEVELS.get(level.lower(), logging.INFO)
+        
+        # ساخت کانتکست برای سطح‌های غیرفعال (مثلا debug در production) بی‌فایده است
+        if not logger.isEnabledFor(levelno):
+            return
         
         log_context = {
             'user': 'anonymous',
@@ -145,21 +207,13 @@ class AdvancedLogger:
                 log_context['extra'] = str(extra_data)
         
         if isinstance(message, dict):
-            message_str = json.dumps(message, ensure_ascii=False)
+            message_str = fastjson.dumps(message, default=str)
         else:
             message_str = str(message)
         
         full_message = f"{message_str}"
         
-        log_method = {
-            'debug': logger.debug,
-            'info': logger.info,
-            'warning': logger.warning,
-            'error': logger.error,
-            'critical': logger.critical
-        }.get(level.lower(), logger.info)
-        
-        log_method(full_message, extra=log_context)
+        logger.log(levelno, full_message, extra=log_context)
 
 
 # ایجاد نمونه اصلی
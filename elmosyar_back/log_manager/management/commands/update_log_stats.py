@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from log_manager.log_config import logger
+from log_manager.stats import LogStatsStore
+
+
+class Command(BaseCommand):
+    help = 'Parse newly appended log lines into the incremental statistics store (suitable for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', action='append',
+            help='Log file name inside LOG_DIR (can be repeated, default: application.log)'
+        )
+
+    def handle(self, *args, **options):
+        log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()
+        store = LogStatsStore(log_dir)
+
+        for file_name in options['file'] or ['application.log']:
+            count = store.update(file_name)
+            self.stdout.write(f"{file_name}: {count} new line(s) processed")
+
+        self.stdout.write(self.style.SUCCESS('Log statistics are up to date'))
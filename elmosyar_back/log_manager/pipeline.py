@@ -0,0 +1,310 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import Counter
+
+from django.core.files import locks
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler که یک دسته رکورد را با یک write و یک flush می‌نویسد
+    (به جای stat + seek + write + flush برای هر رکورد)
+
+    activity_index (اختیاری): ایندکس فعالیت کاربران (activity.UserActivityIndex)
+    که آفست خط‌های هر user_id را نگه می‌دارد
+    """
+
+    activity_index = None
+
+    def emit(self, record):
+        # حالت همزمان (LOG_ASYNC=False): هر رکورد یک دسته‌ی یک‌تایی است
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        formatted = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                formatted.append((record, self.format(record) + self.terminator))
+            except Exception:
+                self.handleError(record)
+        if not formatted:
+            return
+
+        chunk = ''.join(line for _, line in formatted)
+        size = len(chunk.encode(self.encoding or 'utf-8'))
+        self.acquire()
+        try:
+            # قفل انحصاری فایل تا چند پروسه (چند worker) روی هم ننویسند و position واقعاً آفست همین دسته باشد
+            self._lock_stream()
+            try:
+                # یک seek برای هر دسته؛ فایل ممکن است بیرون از handler پاک شده باشد (clear_log_file)
+                self.stream.seek(0, 2)
+                position = self.stream.tell()
+                if self.maxBytes > 0 and position and position + size >= self.maxBytes:
+                    self.doRollover()
+                    self._lock_stream()
+                    self.stream.seek(0, 2)
+                    position = self.stream.tell()
+                self.stream.write(chunk)
+                self.stream.flush()
+                self.batch_written(formatted, position)
+            finally:
+                if self.stream is not None:
+                    locks.unlock(self.stream)
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def _lock_stream(self):
+        """
+        قفل انحصاری فایل فعلی؛ اگر پروسه‌ی دیگری در این فاصله فایل را چرخانده باشد
+        (نام فایل به inode دیگری اشاره کند) فایل جدید باز و قفل می‌شود
+        """
+        while True:
+            if self.stream is None:
+                self.stream = self._open()
+            locks.lock(self.stream, locks.LOCK_EX)
+            try:
+                current = os.stat(self.baseFilename).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(self.stream.fileno()).st_ino:
+                return
+            locks.unlock(self.stream)
+            self.stream.close()
+            self.stream = None
+            self.stream_reopened()
+
+    def stream_reopened(self):
+        """hook وقتی فایل را پروسه‌ی دیگری چرخانده و handler فایل جدید را باز کرده است"""
+        if self.activity_index is not None:
+            self.activity_index.reload()
+
+    def batch_written(self, formatted, position):
+        """hook بعد از نوشتن دسته؛ formatted: [(record, line)]، position: آفست بایتی شروع دسته"""
+        if self.activity_index is not None:
+            self.activity_index.add(formatted, position, self.encoding or 'utf-8')
+
+    def doRollover(self):
+        super().doRollover()
+        if self.activity_index is not None:
+            self.activity_index.rotated()
+
+
+class PipelineQueueHandler(logging.handlers.QueueHandler):
+    """
+    سمت ورودی pipeline روی thread درخواست:
+    فقط رکورد را در صف می‌گذارد؛ فرمت و نوشتن روی thread نویسنده انجام می‌شود
+    """
+
+    def __init__(self, pipeline, logger_name):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.logger_name = logger_name
+
+    def handle(self, record):
+        # queue خودش thread-safe است؛ قفل handler روی مسیر درخواست لازم نیست
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+    def prepare(self, record):
+        # پیام و traceback همین‌جا ثابت می‌شوند تا thread نویسنده به اشیای درخواست وابسته نباشد
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self.pipeline.submit(self.logger_name, record)
+
+
+class LogPipeline:
+    """
+    pipeline غیرهمزمان لاگ‌ها
+
+    - صف محدود (max_queue) تا حافظه در بار زیاد رشد نکند
+    - رکوردهای WARNING به بالا تا block_timeout صبر می‌کنند، بقیه اگر صف پر باشد دور ریخته می‌شوند
+    - thread نویسنده رکوردها را تا batch_size یا flush_interval جمع می‌کند و یکجا می‌نویسد
+    - هنگام خروج پروسه (atexit) صف تخلیه و فایل‌ها flush می‌شوند
+    - بعد از fork (مثلا gunicorn --preload) thread نویسنده در پروسه‌ی فرزند نیست؛ صف و قفل فرزند
+      از نو ساخته می‌شوند و thread با اولین submit دوباره راه می‌افتد
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=0.5,
+                 block_timeout=0.05, block_level=logging.WARNING):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.block_level = block_level
+
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.written = Counter()
+        self.dropped = Counter()
+        if hasattr(os, 'register_at_fork'):
+            pipeline = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: pipeline() and pipeline()._after_fork())
+
+    # ─── Setup ─────────────────────────────────────────────
+
+    def add_target(self, logger_name, handler):
+        """handler واقعی (فایل/کنسول) که رکوردهای این لاگر در thread نویسنده به آن می‌رسند"""
+        with self._lock:
+            self._targets.setdefault(logger_name, []).append(handler)
+
+    def clear_targets(self, logger_name):
+        with self._lock:
+            handlers = self._targets.pop(logger_name, [])
+        for handler in handlers:
+            handler.close()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='log-pipeline', daemon=True)
+            self._thread.start()
+            first_start, self._running = not self._running, True
+        if first_start:
+            atexit.register(self.stop)
+
+    def _after_fork(self):
+        # رکوردهای صف مال پروسه‌ی والد است و قفل‌ها ممکن است در لحظه‌ی fork گرفته شده باشند
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = Counter()
+        self.dropped = Counter()
+
+    # ─── Producer side ─────────────────────────────────────
+
+    def submit(self, logger_name, record):
+        thread = self._thread
+        if self._running and (thread is None or not thread.is_alive()):
+            # پروسه‌ی فرزند بعد از fork، یا thread نویسنده‌ای که از کار افتاده
+            self.start()
+        item = (logger_name, record)
+        try:
+            if record.levelno >= self.block_level and self.block_timeout:
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            # Counter روی GIL اتمیک نیست؛ قفل فقط در مسیر نادر drop گرفته می‌شود
+            with self._lock:
+                self.dropped[logger_name] += 1
+
+    def flush(self, timeout=5.0):
+        """صبر تا رکوردهای فعلی صف نوشته شوند (برای خواندن لاگ‌ها یا تست‌ها)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        done = threading.Event()
+        try:
+            self.queue.put((None, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self._drain()
+            return
+        try:
+            self.queue.put((None, self._STOP), timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._drain()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self.queue.qsize(),
+                'capacity': self.queue.maxsize,
+                'written': dict(self.written),
+                'dropped': dict(self.dropped),
+                'dropped_total': sum(self.dropped.values()),
+            }
+
+    # ─── Writer thread ─────────────────────────────────────
+
+    def _run(self):
+        while True:
+            batch = []
+            markers = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    logger_name, record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if logger_name is None:
+                    if record is self._STOP:
+                        stop = True
+                        break
+                    markers.append(record)
+                    break
+                batch.append((logger_name, record))
+
+            self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _drain(self):
+        """نوشتن هرچه در صف مانده (بعد از توقف thread)"""
+        batch = []
+        while True:
+            try:
+                logger_name, record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if logger_name is None:
+                if isinstance(record, threading.Event):
+                    record.set()
+                continue
+            batch.append((logger_name, record))
+        self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        grouped = {}
+        for logger_name, record in batch:
+            grouped.setdefault(logger_name, []).append(record)
+
+        for logger_name, records in grouped.items():
+            for handler in self._targets.get(logger_name, ()):
+                if isinstance(handler, BatchRotatingFileHandler):
+                    handler.emit_batch(records)
+                else:
+                    for record in records:
+                        if record.levelno >= handler.level:
+                            handler.handle(record)
+            self.written[logger_name] += len(records)
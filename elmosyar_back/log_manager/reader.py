@@ -0,0 +1,205 @@
+import json
+import os
+import re
+
+from core import fastjson
+
+from .jsonlog import INDEX_SUFFIX
+
+
+BLOCK_SIZE = 64 * 1024
+
+
+def read_index(log_path):
+    """سگمنت‌های ایندکس یک فایل لاگ (قدیمی به جدید)"""
+    return list(reversed(list(iter_index_reverse(log_path))))
+
+
+def iter_index_reverse(log_path, size=None):
+    """
+    سگمنت‌های ایندکس از جدید به قدیم؛ فایل ایندکس هم از آخر خوانده می‌شود
+    تا فقط سگمنت‌هایی که واقعاً لازم‌اند پارس شوند
+    سگمنت‌های ناسازگار با فایل فعلی (مثلا بعد از پاک شدن فایل) کنار گذاشته می‌شوند
+    """
+    index_path = log_path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return
+    if size is None:
+        size = os.path.getsize(log_path)
+
+    with open(index_path, 'rb') as f:
+        f.seek(0, 2)
+        newer = None
+        for line in iter_region_reverse(f, 0, f.tell()):
+            try:
+                segment = fastjson.loads(line)
+            except ValueError:
+                continue
+            if segment.get('e', size + 1) > size or segment.get('o', -1) < 0:
+                # سگمنت‌های بعد از کوتاه شدن فایل؛ بقیه (قدیمی‌ترها) ممکن است هنوز معتبر باشند
+                newer = None
+                continue
+            if newer is not None and segment['e'] > newer['o']:
+                # ترتیب به هم ریخته: فقط سگمنت‌های جدیدتر قابل اعتمادند
+                break
+            newer = segment
+            yield segment
+
+
+def iter_region_reverse(f, start, end, block_size=BLOCK_SIZE):
+    """
+    خط‌های بازه‌ی [start, end) یک فایل باینری از آخر به اول
+    حافظه‌ی مصرفی مستقل از حجم بازه است (یک بلاک + یک خط ناقص)
+    """
+    position = end
+    remainder = b''
+    while position > start:
+        read_size = min(block_size, position - start)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        lines = block.split(b'\n')
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            if line.strip():
+                yield line.decode('utf-8', errors='replace').rstrip('\r')
+    if remainder.strip():
+        yield remainder.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def iter_lines_newest_first(log_path, segment_filter=None):
+    """
+    خط‌های فایل لاگ از جدید به قدیم
+
+    اگر ایندکس وجود داشته باشد سگمنت‌هایی که segment_filter آن‌ها را رد کند اصلاً خوانده نمی‌شوند؛
+    بخش‌هایی از فایل که در ایندکس نیامده‌اند (انتهای فایل، فاصله‌ها) همیشه اسکن می‌شوند.
+    """
+    with open(log_path, 'rb') as f:
+        f.seek(0, 2)
+        position = f.tell()
+
+        for segment in iter_index_reverse(log_path, position):
+            if segment['e'] < position:
+                yield from iter_region_reverse(f, segment['e'], position)
+            if segment_filter is None or segment_filter(segment):
+                yield from iter_region_reverse(f, segment['o'], segment['e'])
+            position = segment['o']
+        if position > 0:
+            yield from iter_region_reverse(f, 0, position)
+
+
+def rotated_paths(log_path):
+    """فایل فعلی و بکاپ‌های چرخیده‌ی آن (log، log.1، log.2، ...) از جدید به قدیم"""
+    directory, base_name = os.path.split(log_path)
+    backups = []
+    if os.path.isdir(directory):
+        for file_name in os.listdir(directory):
+            suffix = file_name[len(base_name) + 1:]
+            if file_name.startswith(base_name + '.') and suffix.isdigit():
+                backups.append((int(suffix), os.path.join(directory, file_name)))
+    paths = [log_path] if os.path.exists(log_path) else []
+    return paths + [path for _, path in sorted(backups)]
+
+
+def iter_rotated_lines_newest_first(log_path, segment_filter=None):
+    """
+    مثل iter_lines_newest_first ولی بعد از فایل فعلی به ترتیب سراغ بکاپ‌ها می‌رود
+    بکاپ‌ها فقط وقتی باز می‌شوند که خط‌های فایل‌های جدیدتر تمام شده باشد
+    """
+    seen = set()
+    for path in rotated_paths(log_path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        # اگر وسط خواندن rollover شود همان فایل با نام .1 دوباره دیده می‌شود
+        key = (stat.st_dev, stat.st_ino)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield from iter_lines_newest_first(path, segment_filter)
+
+
+def field_needles(key, value):
+    """
+    زیررشته‌هایی که اگر هیچ‌کدام در یک خط JSON نباشد، آن خط key=value ندارد
+    (فرمت فشرده‌ی فعلی و فرمت قدیمی json.dumps با فاصله)؛ برای رد کردن خط‌ها قبل از پارس
+    """
+    encoded = json.dumps(value, ensure_ascii=False)
+    if not isinstance(value, str):
+        # عدد 42 نباید با 421 جور شود؛ این فیلدها هیچ‌وقت آخرین کلید خط نیستند
+        encoded += ','
+    return (f'"{key}":{encoded}', f'"{key}": {encoded}')
+
+
+def parse_log_line(line):
+    """پارس کردن یک خط لاگ به اجزای تشکیل دهنده"""
+    if line.startswith('{'):
+        return _parse_json_log_line(line)
+    try:
+        # فرمت: 📅 2024-01-01 12:00:00 | 📊 INFO | 👤 admin | 🌐 127.0.0.1 | 📁 module:42 | 📝 message
+        pattern = r'📅 (.+?) \| 📊 (.+?) \| 👤 (.+?) \| 🌐 (.+?) \| 📁 (.+?) \| 📝 (.+)'
+        match = re.match(pattern, line)
+        
+        if match:
+            return {
+                'timestamp': match.group(1),
+                'level': match.group(2),
+                'user': match.group(3),
+                'ip': match.group(4),
+                'location': match.group(5),
+                'message': match.group(6)
+            }
+        
+        # فرمت قدیمی‌تر
+        patterns = [
+            r'\[(.+?)\] \[(.+?)\] \[(.+?)\] \[(.+?):(\d+)\] \[User:(.+?)\] \[IP:(.+?)\] - (.+)',
+            r'\[(.+?)\] \[(.+?)\] \[(.+?)\] - (.+)'
+        ]
+        
+        for pattern in patterns:
+            match = re.match(pattern, line)
+            if match:
+                if len(match.groups()) == 8:
+                    return {
+                        'timestamp': match.group(1),
+                        'level': match.group(2),
+                        'logger': match.group(3),
+                        'module': match.group(4),
+                        'line': match.group(5),
+                        'user': match.group(6),
+                        'ip': match.group(7),
+                        'message': match.group(8)
+                    }
+                elif len(match.groups()) == 4:
+                    return {
+                        'timestamp': match.group(1),
+                        'level': match.group(2),
+                        'logger': match.group(3),
+                        'message': match.group(4)
+                    }
+    except:
+        pass
+    
+    # اگر نتوانستیم پارس کنیم
+    return {'raw': line}
+
+
+def _parse_json_log_line(line):
+    """خط JSON (LOG_FORMAT='json') با همان کلیدهای فرمت متنی"""
+    try:
+        data = fastjson.loads(line)
+    except ValueError:
+        return {'raw': line}
+    if not isinstance(data, dict):
+        return {'raw': line}
+    return {
+        'timestamp': data.get('ts', ''),
+        'level': data.get('level', 'UNKNOWN'),
+        'user': str(data.get('user', 'anonymous')),
+        'user_id': data.get('user_id'),
+        'ip': str(data.get('ip', 'unknown')),
+        'location': f"{data.get('module', '')}:{data.get('line', '')}",
+        'path': data.get('path'),
+        'message': data.get('message', '')
+    }
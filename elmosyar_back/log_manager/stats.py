@@ -0,0 +1,285 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+
+from .reader import rotated_paths, parse_log_line
+
+
+STATS_DB_NAME = '.log_stats.sqlite3'
+READ_CHUNK_SIZE = 1024 * 1024
+RECENT_ERRORS_KEEP = 100
+
+_HOUR_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hourly_levels (
+    hour TEXT NOT NULL, level TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (hour, level)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_users (
+    day TEXT NOT NULL, user TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (day, user)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_paths (
+    day TEXT NOT NULL, path TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (day, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_totals (
+    user TEXT PRIMARY KEY, n INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS path_totals (
+    path TEXT PRIMARY KEY, n INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recent_errors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hour TEXT NOT NULL,
+    entry TEXT NOT NULL
+);
+"""
+
+# (جدول، ستون‌های کلید)؛ سطح‌ها ساعتی، کاربر/مسیر روزانه (بازه‌ها روزی‌اند) + جمع کل برای حالت بدون بازه
+_COUNTER_TABLES = (
+    ('hourly_levels', ('hour', 'level')),
+    ('daily_users', ('day', 'user')),
+    ('daily_paths', ('day', 'path')),
+    ('user_totals', ('user',)),
+    ('path_totals', ('path',)),
+)
+
+
+class LogStatsStore:
+    """
+    آمار تجمعی لاگ‌ها در یک فایل sqlite کنار لاگ‌ها (LOG_DIR/.log_stats.sqlite3)
+
+    برای هر فایل آفست بایتی و inode آخرین خواندن ذخیره می‌شود و هر بار فقط خط‌های
+    اضافه شده پارس می‌شوند. شمارنده‌ها ساعتی (سطح) و روزانه (کاربر / مسیر درخواست)
+    نگه داشته می‌شوند تا هر بازه‌ی تاریخی با یک SUM جواب داده شود.
+
+    چرخش فایل: اگر inode فایل عوض شده باشد، باقی‌مانده‌ی فایل قبلی از بین بکاپ‌ها
+    (با همان inode)، بکاپ‌های جدیدتر از آن و فایل جدید از صفر خوانده می‌شوند.
+
+    آمار مسیر درخواست (top_paths) فقط با LOG_FORMAT='json' پر می‌شود؛ فرمت متنی مسیر را ندارد.
+    """
+
+    def __init__(self, log_dir, db_path=None):
+        self.log_dir = log_dir
+        self.db_path = db_path or os.path.join(log_dir, STATS_DB_NAME)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        connection.executescript(_SCHEMA)
+        return connection
+
+    # ─── Ingest ────────────────────────────────────────────
+
+    def update(self, file_name='application.log'):
+        """خواندن خط‌های جدید فایل و به‌روزرسانی شمارنده‌ها؛ خروجی: تعداد خط‌های پردازش شده"""
+        path = os.path.join(self.log_dir, file_name)
+        if not os.path.exists(path):
+            return 0
+
+        connection = self._connect()
+        try:
+            # قفل نوشتن از اول تراکنش تا دو درخواست همزمان یک بازه را دو بار نشمارند
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT inode, offset FROM files WHERE name = ?', (file_name,)
+            ).fetchone()
+            stat = os.stat(path)
+            offset = 0
+            batch = _Batch()
+
+            if row is not None:
+                inode, offset = row
+                if inode != stat.st_ino:
+                    # فایل چرخیده (شاید چند بار)؛ ادامه‌ی فایل قبلی و همه‌ی بکاپ‌های جدیدتر از آن
+                    for backup, backup_offset in self._rotated_since(path, inode, offset):
+                        self._ingest(backup, backup_offset, batch)
+                    offset = 0
+                elif stat.st_size < offset:
+                    # فایل کوتاه شده (clear_log_file)
+                    offset = 0
+
+            offset = self._ingest(path, offset, batch)
+            batch.save(connection)
+            connection.execute(
+                'INSERT INTO files (name, inode, offset, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET inode = excluded.inode, offset = excluded.offset, '
+                'updated_at = excluded.updated_at',
+                (file_name, stat.st_ino, offset, time.time())
+            )
+            connection.execute('COMMIT')
+            return batch.lines
+        except Exception:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+    def forget(self, file_name):
+        """فایل از بیرون پاک شده؛ دفعه‌ی بعد از ابتدای فایل خوانده شود (شمارنده‌های قبلی می‌مانند)"""
+        connection = self._connect()
+        try:
+            connection.execute('UPDATE files SET offset = 0 WHERE name = ?', (file_name,))
+        finally:
+            connection.close()
+
+    def _rotated_since(self, path, inode, offset):
+        """
+        بکاپ‌هایی که از آخرین خواندن خوانده نشده‌اند، از قدیم به جدید: [(مسیر، آفست شروع)]
+        فایل قبلی (با همان inode) از offset و بکاپ‌های جدیدتر از آن از ابتدا؛
+        اگر فایل قبلی دیگر در بکاپ‌ها نیست همه‌ی بکاپ‌ها جدیدترند
+        """
+        pending = []
+        for candidate in rotated_paths(path)[1:]:
+            try:
+                if os.stat(candidate).st_ino == inode:
+                    pending.append((candidate, offset))
+                    break
+            except FileNotFoundError:
+                continue
+            pending.append((candidate, 0))
+        return reversed(pending)
+
+    def _ingest(self, path, offset, batch):
+        """پارس خط‌های کامل از offset تا انتهای فایل؛ خروجی: آفست بعد از آخرین خط کامل"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            remainder = b''
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                lines = (remainder + chunk).split(b'\n')
+                # خط آخر ممکن است هنوز در حال نوشته شدن باشد
+                remainder = lines.pop()
+                for line in lines:
+                    offset += len(line) + 1
+                    line = line.decode('utf-8', errors='replace').strip()
+                    if line:
+                        batch.add(line)
+        return offset
+
+    # ─── Query ─────────────────────────────────────────────
+
+    def summary(self, date_from=None, date_to=None, top=10):
+        """
+        آمار بازه‌ی [date_from, date_to] (تاریخ‌های date، هر دو اختیاری)
+        activity_by_hour همان قالب قبلی است: مجموع هر ساعت روز (00 تا 23) در کل بازه
+        """
+        hours, hour_params = _range_condition('hour', date_from and f'{date_from:%Y-%m-%d} 00',
+                                              date_to and f'{date_to:%Y-%m-%d} 23')
+        days, day_params = _range_condition('day', date_from and f'{date_from:%Y-%m-%d}',
+                                            date_to and f'{date_to:%Y-%m-%d}')
+
+        connection = self._connect()
+        try:
+            levels = dict(connection.execute(
+                f'SELECT level, SUM(n) FROM hourly_levels WHERE {hours} GROUP BY level', hour_params
+            ))
+            activity_by_hour = {str(h).zfill(2): 0 for h in range(24)}
+            activity_by_hour.update(connection.execute(
+                f'SELECT substr(hour, 12, 2), SUM(n) FROM hourly_levels WHERE {hours} '
+                'GROUP BY substr(hour, 12, 2)', hour_params
+            ))
+            activity_by_day = dict(connection.execute(
+                f'SELECT substr(hour, 1, 10), SUM(n) FROM hourly_levels WHERE {hours} '
+                'GROUP BY substr(hour, 1, 10) ORDER BY 1', hour_params
+            ))
+            if date_from or date_to:
+                top_users = dict(connection.execute(
+                    f'SELECT user, SUM(n) AS total FROM daily_users WHERE {days} '
+                    'GROUP BY user ORDER BY total DESC LIMIT ?', day_params + [top]
+                ))
+                top_paths = dict(connection.execute(
+                    f'SELECT path, SUM(n) AS total FROM daily_paths WHERE {days} '
+                    'GROUP BY path ORDER BY total DESC LIMIT ?', day_params + [top]
+                ))
+            else:
+                top_users = dict(connection.execute('SELECT user, n FROM user_totals ORDER BY n DESC LIMIT ?', [top]))
+                top_paths = dict(connection.execute('SELECT path, n FROM path_totals ORDER BY n DESC LIMIT ?', [top]))
+            recent_errors = [json.loads(entry) for (entry,) in connection.execute(
+                f'SELECT entry FROM recent_errors WHERE {hours} ORDER BY id DESC LIMIT ?', hour_params + [top]
+            )]
+        finally:
+            connection.close()
+
+        return {
+            'total_entries': sum(levels.values()),
+            'levels': levels,
+            'top_users': top_users,
+            'top_paths': top_paths,
+            'activity_by_hour': activity_by_hour,
+            'activity_by_day': activity_by_day,
+            'recent_errors': recent_errors,
+        }
+
+
+def _range_condition(column, start, end):
+    where, params = ['1 = 1'], []
+    if start:
+        where.append(f'{column} >= ?')
+        params.append(start)
+    if end:
+        where.append(f'{column} <= ?')
+        params.append(end)
+    return ' AND '.join(where), params
+
+
+class _Batch:
+    """شمارنده‌های یک بار update که در انتها با یک upsert به ازای هر کلید ذخیره می‌شوند"""
+
+    def __init__(self):
+        self.lines = 0
+        self.counters = {table: Counter() for table, _ in _COUNTER_TABLES}
+        self.errors = []
+
+    def add(self, line):
+        self.lines += 1
+        entry = parse_log_line(line)
+        timestamp = entry.get('timestamp', '')
+        if not _HOUR_RE.match(timestamp):
+            return
+        hour = timestamp[:13]
+
+        day = timestamp[:10]
+
+        level = entry.get('level', 'UNKNOWN')
+        user = entry.get('user', 'anonymous')
+        self.counters['hourly_levels'][(hour, level)] += 1
+        self.counters['daily_users'][(day, user)] += 1
+        self.counters['user_totals'][(user,)] += 1
+        if entry.get('path'):
+            self.counters['daily_paths'][(day, entry['path'])] += 1
+            self.counters['path_totals'][(entry['path'],)] += 1
+        if level in ('ERROR', 'CRITICAL'):
+            self.errors.append((hour, json.dumps(entry, ensure_ascii=False, default=str)))
+            del self.errors[:-RECENT_ERRORS_KEEP]
+
+    def save(self, connection):
+        for table, columns in _COUNTER_TABLES:
+            counter = self.counters[table]
+            if counter:
+                keys = ', '.join(columns)
+                placeholders = ', '.join('?' * (len(columns) + 1))
+                connection.executemany(
+                    f'INSERT INTO {table} ({keys}, n) VALUES ({placeholders}) '
+                    f'ON CONFLICT({keys}) DO UPDATE SET n = n + excluded.n',
+                    [key + (n,) for key, n in counter.items()]
+                )
+        if self.errors:
+            connection.executemany('INSERT INTO recent_errors (hour, entry) VALUES (?, ?)', self.errors)
+            connection.execute(
+                'DELETE FROM recent_errors WHERE id <= (SELECT MAX(id) FROM recent_errors) - ?',
+                (RECENT_ERRORS_KEEP,)
+            )
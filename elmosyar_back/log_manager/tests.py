@@ -0,0 +1,456 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import activity, jsonlog
+from .jsonlog import JsonLineFormatter, IndexedRotatingFileHandler
+from .pipeline import LogPipeline, PipelineQueueHandler, BatchRotatingFileHandler
+from .reader import read_index, iter_lines_newest_first, iter_rotated_lines_newest_first, rotated_paths
+from .stats import LogStatsStore
+from .activity import ENTRY, UserActivityIndex, read_generation, read_start, read_user_activity, reset_activity_index
+
+
+class LogPipelineTest(SimpleTestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'test.log')
+
+    def make_logger(self, pipeline, max_bytes=0):
+        handler = BatchRotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=3, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        self.addCleanup(handler.close)
+        pipeline.add_target('pipeline-test', handler)
+
+        logger = logging.getLogger('pipeline-test')
+        logger.handlers = [PipelineQueueHandler(pipeline, 'pipeline-test')]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        self.addCleanup(setattr, logger, 'handlers', [])
+        return logger
+
+    def read_lines(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_records_are_written_in_batches_on_flush(self):
+        pipeline = LogPipeline(batch_size=50, flush_interval=0.05)
+        logger = self.make_logger(pipeline)
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+
+        for i in range(120):
+            logger.info('message %s', i)
+        self.assertTrue(pipeline.flush())
+
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 120)
+        self.assertEqual(lines[0], 'INFO message 0')
+        self.assertEqual(pipeline.stats()['written'], {'pipeline-test': 120})
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_writer_restarts_in_forked_child(self):
+        pipeline = LogPipeline(batch_size=50, flush_interval=0.05)
+        logger = self.make_logger(pipeline)
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+        logger.info('parent')
+        pipeline.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            # پروسه‌ی فرزند (مثل worker گانیکورن با --preload)
+            ok = False
+            try:
+                logger.info('child')
+                ok = pipeline._thread.is_alive() and pipeline.flush(timeout=2) and pipeline.stats()['written'] == {'pipeline-test': 1}
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.read_lines(), ['INFO parent', 'INFO child'])
+
+    def test_full_queue_drops_and_counts(self):
+        pipeline = LogPipeline(max_queue=2, block_timeout=0)
+        logger = self.make_logger(pipeline)
+
+        for i in range(5):
+            logger.warning('burst %s', i)
+        self.assertEqual(pipeline.stats()['dropped_total'], 3)
+
+        pipeline.stop()  # thread شروع نشده؛ stop صف را مستقیم تخلیه می‌کند
+        self.assertEqual(self.read_lines(), ['WARNING burst 0', 'WARNING burst 1'])
+
+    def test_rotation_happens_between_batches(self):
+        pipeline = LogPipeline(batch_size=10)
+        logger = self.make_logger(pipeline, max_bytes=200)
+
+        for batch in range(3):
+            for i in range(10):
+                logger.info('%s-%s', batch, i)
+            pipeline.flush()
+
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertLessEqual(os.path.getsize(self.path), 200)
+
+
+class JsonLogIndexTest(TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'application.log')
+
+        self.handler = IndexedRotatingFileHandler(self.path, encoding='utf-8')
+        self.handler.setFormatter(JsonLineFormatter())
+        self.addCleanup(self.handler.close)
+
+    def record(self, message, level=logging.INFO, user_id=None, username='anonymous'):
+        record = logging.LogRecord('app', level, __file__, 1, message, None, None)
+        record.user = username
+        if user_id is not None:
+            record.user_id = user_id
+        return record
+
+    def write_logs(self):
+        with mock.patch.object(jsonlog, 'SEGMENT_MAX_RECORDS', 10):
+            for i in range(30):
+                user_id = 7 if i < 10 else None
+                level = logging.ERROR if i == 25 else logging.INFO
+                self.handler.emit_batch([self.record(f'event {i}', level, user_id, 'sara' if user_id else 'anonymous')])
+
+    def test_segments_cover_the_file(self):
+        self.write_logs()
+        segments = read_index(self.path)
+        # دو سگمنت بسته شده؛ ده رکورد آخر هنوز در انتهای بدون ایندکس فایل هستند
+        self.assertEqual([segment['n'] for segment in segments], [10, 10])
+        self.assertEqual(segments[0]['u'], {'7': 10})
+        self.assertEqual(segments[1]['o'], segments[0]['e'])
+
+        lines = list(iter_lines_newest_first(self.path))
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(json.loads(lines[0])['message'], 'event 29')
+        self.assertEqual(json.loads(lines[-1])['message'], 'event 0')
+
+    def test_segment_filter_skips_regions(self):
+        self.write_logs()
+        lines = list(iter_lines_newest_first(self.path, lambda segment: '7' in segment['u']))
+        messages = [json.loads(line)['message'] for line in lines]
+        # انتهای فایل همیشه خوانده می‌شود، سگمنت دوم (بدون کاربر 7) رد می‌شود
+        self.assertEqual(messages[:10], [f'event {i}' for i in range(29, 19, -1)])
+        self.assertEqual(messages[10:], [f'event {i}' for i in range(9, -1, -1)])
+
+    def test_read_logs_pages_newest_first(self):
+        self.write_logs()
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='1234')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with override_settings(LOG_DIR=self.log_dir):
+            response = client.get('/api/logs/read/', {'per_page': 5, 'page': 2})
+            errors = client.get('/api/logs/read/', {'level': 'ERROR'})
+            by_user = client.get('/api/logs/read/', {'user_id': 7, 'per_page': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('event 24', response.data['logs'][0])
+        self.assertTrue(response.data['pagination']['has_next'])
+        self.assertEqual(len(errors.data['logs']), 1)
+        self.assertIn('event 25', errors.data['logs'][0])
+        self.assertIn('event 9', by_user.data['logs'][0])
+        self.assertEqual(by_user.data['statistics']['levels'], {'INFO': 10})
+
+    def test_several_writers_do_not_hide_lines(self):
+        # handler دوم نقش worker دیگری را دارد که روی همان فایل می‌نویسد
+        other = IndexedRotatingFileHandler(self.path, encoding='utf-8')
+        other.setFormatter(JsonLineFormatter())
+        self.addCleanup(other.close)
+        with mock.patch.object(jsonlog, 'SEGMENT_MAX_RECORDS', 4):
+            for i in range(20):
+                if i % 2:
+                    other.emit_batch([self.record(f'event {i}', user_id=9, username='ali')])
+                else:
+                    self.handler.emit_batch([self.record(f'event {i}', user_id=7, username='sara')])
+
+        lines = list(iter_lines_newest_first(self.path, lambda segment: '9' in segment['u']))
+        ali = [json.loads(line)['message'] for line in lines if json.loads(line)['user_id'] == 9]
+        self.assertEqual(ali, [f'event {i}' for i in range(19, 0, -2)])
+        # هر سگمنت فقط خط‌های پشت سر هم یک نویسنده را می‌پوشاند
+        segments = sorted(read_index(self.path), key=lambda segment: segment['o'])
+        self.assertGreater(len(segments), 10)
+        self.assertEqual({segment['n'] for segment in segments}, {1})
+        for segment, following in zip(segments, segments[1:]):
+            self.assertLessEqual(segment['e'], following['o'])
+
+    def test_rotation_by_another_writer_is_followed(self):
+        other = IndexedRotatingFileHandler(self.path, encoding='utf-8', maxBytes=400, backupCount=3)
+        other.setFormatter(JsonLineFormatter())
+        self.addCleanup(other.close)
+        self.handler.emit_batch([self.record('first')])
+        for i in range(5):
+            other.emit_batch([self.record(f'other {i}')])
+        self.handler.emit_batch([self.record('last')])
+
+        lines = list(iter_rotated_lines_newest_first(self.path))
+        self.assertEqual(json.loads(lines[0])['message'], 'last')
+        self.assertEqual(len(lines), 7)
+
+    def test_download_streams_file(self):
+        self.write_logs()
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='1234')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with override_settings(LOG_DIR=self.log_dir):
+            response = client.get('/api/logs/download/application.log/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="application.log"')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(b''.join(response.streaming_content), f.read())
+        response.close()
+
+class RotatedLogReaderTest(TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'application.log')
+
+        # قدیمی‌ترین رکوردها در .2، جدیدترین‌ها در فایل اصلی
+        for suffix, numbers in (('.2', range(0, 40)), ('.1', range(40, 80)), ('', range(80, 100))):
+            with open(self.path + suffix, 'w', encoding='utf-8') as f:
+                for i in numbers:
+                    user = 'sara' if i % 3 == 0 else 'ali'
+                    f.write(f"📅 2024-01-01 12:00:00 | 📊 INFO | 👤 {user} | 🌐 127.0.0.1 | 📁 views:1 | 📝 event {i:03d}\n")
+
+    def test_reads_backups_after_current_file(self):
+        self.assertEqual(rotated_paths(self.path), [self.path, self.path + '.1', self.path + '.2'])
+        lines = list(iter_rotated_lines_newest_first(self.path))
+        self.assertEqual(len(lines), 100)
+        self.assertTrue(lines[0].endswith('event 099'))
+        self.assertTrue(lines[20].endswith('event 079'))
+        self.assertTrue(lines[-1].endswith('event 000'))
+
+    def test_my_activity_pages_across_backups(self):
+        user = get_user_model().objects.create_user(username='sara', email='sara@example.com', password='1234')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with override_settings(LOG_DIR=self.log_dir):
+            first = client.get('/api/logs/my-activity/', {'per_page': 5})
+            later = client.get('/api/logs/my-activity/', {'per_page': 5, 'page': 2})
+            last = client.get('/api/logs/my-activity/', {'per_page': 30, 'page': 2})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('event 099', first.data['logs'][0])
+        self.assertTrue(first.data['pagination']['has_next'])
+        # صفحه‌ی دوم از فایل اصلی به .1 می‌رسد
+        self.assertIn('event 084', later.data['logs'][0])
+        self.assertIn('event 072', later.data['logs'][-1])
+        self.assertEqual(len(last.data['logs']), 4)
+        self.assertFalse(last.data['pagination']['has_next'])
+
+
+class LogStatsStoreTest(TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'application.log')
+        self.store = LogStatsStore(self.log_dir)
+
+    def append(self, lines, path=None):
+        with open(path or self.path, 'a', encoding='utf-8') as f:
+            for timestamp, level, user in lines:
+                f.write(f"📅 {timestamp} | 📊 {level} | 👤 {user} | 🌐 127.0.0.1 | 📁 views:1 | 📝 hello\n")
+
+    def test_only_new_lines_are_parsed(self):
+        self.append([('2024-01-01 10:00:00', 'INFO', 'sara')] * 3)
+        self.assertEqual(self.store.update(), 3)
+        self.assertEqual(self.store.update(), 0)
+
+        self.append([('2024-01-02 11:30:00', 'ERROR', 'ali')])
+        self.assertEqual(self.store.update(), 1)
+
+        summary = self.store.summary()
+        self.assertEqual(summary['levels'], {'INFO': 3, 'ERROR': 1})
+        self.assertEqual(summary['top_users'], {'sara': 3, 'ali': 1})
+        self.assertEqual(summary['activity_by_hour']['10'], 3)
+        self.assertEqual(len(summary['recent_errors']), 1)
+
+        second_day = self.store.summary(date_from=date(2024, 1, 2), date_to=date(2024, 1, 2))
+        self.assertEqual(second_day['total_entries'], 1)
+        self.assertEqual(second_day['activity_by_day'], {'2024-01-02': 1})
+
+    def test_survives_rotation(self):
+        self.append([('2024-01-01 10:00:00', 'INFO', 'sara')] * 2)
+        self.store.update()
+
+        # خط‌هایی که قبل از چرخش نوشته شده‌اند ولی هنوز شمرده نشده‌اند از دست نمی‌روند
+        self.append([('2024-01-01 10:05:00', 'INFO', 'sara')])
+        os.replace(self.path, self.path + '.1')
+        self.append([('2024-01-01 10:10:00', 'WARNING', 'ali')] * 2)
+
+        self.assertEqual(self.store.update(), 3)
+        self.assertEqual(self.store.summary()['top_users'], {'sara': 3, 'ali': 2})
+
+    def test_counts_every_backup_after_several_rotations(self):
+        self.append([('2024-01-01 10:00:00', 'INFO', 'sara')])
+        self.store.update()
+
+        # دو چرخش بین دو update: log.2 ادامه‌ی فایل خوانده شده و log.1 کاملاً جدید است
+        self.append([('2024-01-01 10:05:00', 'INFO', 'sara')])
+        os.replace(self.path, self.path + '.2')
+        self.append([('2024-01-01 10:10:00', 'INFO', 'reza')] * 2)
+        os.replace(self.path, self.path + '.1')
+        self.append([('2024-01-01 10:15:00', 'INFO', 'ali')])
+
+        self.assertEqual(self.store.update(), 4)
+        self.assertEqual(self.store.summary()['top_users'], {'sara': 2, 'reza': 2, 'ali': 1})
+
+    def test_path_stats_need_json_format(self):
+        self.append([('2024-01-01 10:00:00', 'INFO', 'sara')])
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'ts': '2024-01-01 10:01:00', 'level': 'INFO', 'user': 'sara',
+                                'path': '/api/posts/', 'message': 'hello'}) + '\n')
+        self.store.update()
+
+        # خط متنی مسیر ندارد و فقط در آمار سطح/کاربر شمرده می‌شود
+        summary = self.store.summary()
+        self.assertEqual(summary['top_users'], {'sara': 2})
+        self.assertEqual(summary['top_paths'], {'/api/posts/': 1})
+
+    def test_statistics_endpoint_uses_store(self):
+        self.append([('2024-01-01 10:00:00', 'INFO', 'sara'), ('2024-01-03 09:00:00', 'INFO', 'ali')])
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='1234')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with override_settings(LOG_DIR=self.log_dir):
+            response = client.get('/api/logs/statistics/', {'date_from': '2024-01-02'})
+
+        self.assertEqual(response.status_code, 200)
+        statistics = response.data['statistics']
+        self.assertEqual(statistics['new_lines_processed'], 2)
+        self.assertEqual(statistics['top_users'], {'ali': 1})
+
+
+class UserActivityIndexTest(TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'application.log')
+
+        self.handler = BatchRotatingFileHandler(self.path, maxBytes=4000, backupCount=5, encoding='utf-8')
+        self.handler.setFormatter(logging.Formatter(
+            '📅 %(asctime)s | 📊 %(levelname)s | 👤 %(user)s | 🌐 %(ip)s | 📁 %(module)s:%(lineno)d | 📝 %(message)s'
+        ))
+        self.handler.activity_index = UserActivityIndex(self.path)
+        self.addCleanup(self.handler.close)
+
+    def write_logs(self, ali_id=1, alireza_id=2):
+        # ali و alireza یک‌درمیان؛ حجم کم فایل باعث چند بار چرخش می‌شود
+        for i in range(60):
+            user_id, username = (ali_id, 'ali') if i % 2 == 0 else (alireza_id, 'alireza')
+            record = logging.LogRecord('app', logging.INFO, __file__, 1, f'event {i:03d}', None, None)
+            record.user, record.user_id, record.ip = username, user_id, '127.0.0.1'
+            self.handler.handle(record)
+
+    def test_page_reads_across_rotations(self):
+        self.write_logs()
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        lines, has_next = read_user_activity(self.path, 1, 'ali', skip=0, limit=5)
+        self.assertEqual([line[-9:] for line in lines], [f'event {i:03d}' for i in (58, 56, 54, 52, 50)])
+        self.assertTrue(has_next)
+
+        lines, has_next = read_user_activity(self.path, 1, 'ali', skip=25, limit=10)
+        self.assertEqual([line[-9:] for line in lines], [f'event {i:03d}' for i in (8, 6, 4, 2, 0)])
+        self.assertFalse(has_next)
+        self.assertEqual(read_user_activity(self.path, 3, 'nobody'), ([], False))
+
+    def enable_index_after_history(self):
+        # مثل روشن کردن LOG_ACTIVITY_INDEX روی لاگ‌هایی که از قبل هستند
+        self.handler.activity_index = None
+        reset_activity_index(self.path)
+        self.write_logs()
+        self.handler.activity_index = UserActivityIndex(self.path)
+        return read_start(self.path + '.activity')
+
+    def test_scans_history_older_than_index(self):
+        self.enable_index_after_history()
+        self.write_logs()
+
+        lines, has_next = read_user_activity(self.path, 2, 'alireza', skip=25, limit=10)
+        self.assertEqual([line[-9:] for line in lines], [f'event {i:03d}' for i in (9, 7, 5, 3, 1, 59, 57, 55, 53, 51)])
+        self.assertTrue(has_next)
+
+    def test_short_index_scans_only_history_before_its_start(self):
+        start = self.enable_index_after_history()
+        self.assertEqual(start, (0, os.path.getsize(self.path)))
+        # بعد از شروع ایندکس کلی خط از بقیه و فقط یک خط از alireza
+        for i in range(40):
+            record = logging.LogRecord('app', logging.INFO, __file__, 1, f'later {i:03d}', None, None)
+            record.user, record.user_id = ('alireza', 2) if i == 39 else ('ali', 1)
+            record.ip = '127.0.0.1'
+            self.handler.handle(record)
+
+        with mock.patch.object(activity, '_iter_lines_before', wraps=activity._iter_lines_before) as scan:
+            lines, has_next = read_user_activity(self.path, 2, 'alireza', limit=5)
+
+        generation = read_generation(self.path + '.activity')
+        scan.assert_called_once_with(self.path, (generation - start[0], start[1]))
+        self.assertEqual([line[-9:] for line in lines], ['later 039'] + [f'event {i:03d}' for i in (59, 57, 55, 53)])
+        self.assertTrue(has_next)
+
+    def test_several_writers_share_the_index(self):
+        # handler دوم نقش worker دیگری را دارد؛ چرخش‌ها بین دو handler پخش می‌شوند
+        other = BatchRotatingFileHandler(self.path, maxBytes=4000, backupCount=5, encoding='utf-8')
+        other.setFormatter(self.handler.formatter)
+        other.activity_index = UserActivityIndex(self.path)
+        self.addCleanup(other.close)
+        handlers = [self.handler, other]
+        for i in range(60):
+            record = logging.LogRecord('app', logging.INFO, __file__, 1, f'event {i:03d}', None, None)
+            record.user, record.user_id, record.ip = 'ali', 1, '127.0.0.1'
+            handlers[(i // 7) % 2].handle(record)
+
+        lines, has_next = read_user_activity(self.path, 1, 'ali', limit=100)
+        self.assertEqual([line[-9:] for line in lines], [f'event {i:03d}' for i in range(59, -1, -1)])
+
+    def test_skips_lines_of_other_users(self):
+        self.write_logs()
+        # ورودی‌ای که (مثلا با نویسنده‌ی دوم) به خط کاربر دیگری اشاره می‌کند
+        with open(os.path.join(self.path + '.activity', '1.idx'), 'rb+') as f:
+            f.seek(-ENTRY.size, 2)
+            generation, offset, size = ENTRY.unpack(f.read(ENTRY.size))
+            f.seek(-ENTRY.size, 2)
+            f.write(ENTRY.pack(generation, offset - size - 1, size + 1))
+
+        lines, has_next = read_user_activity(self.path, 1, 'ali', limit=5)
+        self.assertEqual(lines, [])
+        self.assertFalse(has_next)
+
+    def test_my_activity_does_not_match_other_usernames(self):
+        user = get_user_model().objects.create_user(username='ali', email='ali@example.com', password='1234')
+        self.write_logs(ali_id=user.id, alireza_id=user.id + 1)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with override_settings(LOG_DIR=self.log_dir):
+            response = client.get('/api/logs/my-activity/', {'per_page': 30})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['logs']), 30)
+        self.assertTrue(all('alireza' not in line for line in response.data['logs']))
@@ -5,16 +5,24 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.paginator import Paginator
 from django.db.models import Q
 
 from .permissions import IsSuperUser
-from .log_config import logger, log_info, log_error
+from .log_config import logger, log_info, log_error, log_audit
+from .reader import iter_lines_newest_first, iter_rotated_lines_newest_first, parse_log_line, field_needles
+from .jsonlog import INDEX_SUFFIX
+from .stats import LogStatsStore
+from .activity import read_user_activity, reset_activity_index
+
+
+# بعد از پر شدن صفحه، آمار فقط تا این تعداد خط اسکن شده ادامه پیدا می‌کند
+STATS_SCAN_LIMIT = 20000
+
 
 # ════════════════════════════════════════════════════════════
 # 📊 Log Management Endpoints (Only for Superusers)
@@ -29,6 +37,7 @@ def list_log_files(request):
     """
     try:
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         
         if not os.path.exists(log_dir):
             return Response({
@@ -62,7 +71,7 @@ def list_log_files(request):
                 })
         
         # لاگ کردن دسترسی
-        logger.audit_trail(
+        log_audit(
             f"Superuser '{request.user.username}' viewed log files list",
             request
         )
@@ -100,9 +109,12 @@ def read_logs(request):
         date_to = request.GET.get('date_to')
         page = int(request.GET.get('page', 1))
         per_page = min(int(request.GET.get('per_page', 100)), 1000)
+        # برای فایل اصلی بکاپ‌های چرخیده (.1 تا .N) هم به ترتیب خوانده می‌شوند
+        include_rotated = request.GET.get('rotated', '1') not in ('0', 'false', 'False')
         
         # مسیر فایل لاگ
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         file_path = os.path.join(log_dir, log_file)
         
         # بررسی وجود فایل
@@ -112,80 +124,90 @@ def read_logs(request):
                 'message': f'فایل لاگ "{log_file}" یافت نشد'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # خواندن و فیلتر لاگ‌ها
-        logs = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # پارس کردن خط لاگ
-                log_entry = _parse_log_line(line)
-                
-                # اعمال فیلترها
-                include = True
-                
-                if level and log_entry.get('level') != level.upper():
-                    include = False
-                
-                if user_filter and user_filter not in log_entry.get('user', ''):
-                    include = False
-                
-                if ip_filter and ip_filter not in log_entry.get('ip', ''):
-                    include = False
-                
-                if search_text and search_text.lower() not in line.lower():
-                    include = False
-                
-                if date_from and log_entry.get('timestamp'):
-                    try:
-                        log_date = datetime.strptime(log_entry['timestamp'], '%Y-%m-%d %H:%M:%S')
-                        filter_date = datetime.strptime(date_from, '%Y-%m-%d')
-                        if log_date.date() < filter_date.date():
-                            include = False
-                    except:
-                        pass
-                
-                if date_to and log_entry.get('timestamp'):
-                    try:
-                        log_date = datetime.strptime(log_entry['timestamp'], '%Y-%m-%d %H:%M:%S')
-                        filter_date = datetime.strptime(date_to, '%Y-%m-%d')
-                        if log_date.date() > filter_date.date():
-                            include = False
-                    except:
-                        pass
-                
-                if include:
-                    logs.append({
-                        'raw': line,
-                        'parsed': log_entry,
-                        'highlight': _highlight_log_line(line)
-                    })
-        
-        # مرتب سازی (جدیدترین اول)
-        logs.reverse()
-        
-        # صفحه‌بندی
-        paginator = Paginator(logs, per_page)
-        try:
-            page_obj = paginator.page(page)
-        except:
-            page_obj = paginator.page(1)
-        
-        # آمار
+        # فیلترها؛ شرط‌های سطح/کاربر/تاریخ روی ایندکس هم اعمال می‌شوند تا سگمنت‌های بی‌ربط خوانده نشوند
+        day_from = _parse_day(date_from)
+        day_to = _parse_day(date_to)
+        user_id = request.GET.get('user_id')
+        search_lower = search_text.lower() if search_text else None
+
+        def segment_filter(segment):
+            if level and not segment['lv'].get(level.upper()):
+                return False
+            if user_id and user_id not in segment['u']:
+                return False
+            if day_from and datetime.fromtimestamp(segment['t1']).date() < day_from:
+                return False
+            if day_to and datetime.fromtimestamp(segment['t0']).date() > day_to:
+                return False
+            return True
+
+        def matches(line, log_entry):
+            if level and log_entry.get('level') != level.upper():
+                return False
+            if user_id and str(log_entry.get('user_id')) != user_id:
+                return False
+            if user_filter and user_filter not in log_entry.get('user', ''):
+                return False
+            if ip_filter and ip_filter not in log_entry.get('ip', ''):
+                return False
+            if search_lower and search_lower not in line.lower():
+                return False
+            if day_from or day_to:
+                log_day = _parse_day(log_entry.get('timestamp', '')[:10])
+                if log_day and day_from and log_day < day_from:
+                    return False
+                if log_day and day_to and log_day > day_to:
+                    return False
+            return True
+
+        # پیش‌فیلتر متنی خط‌های JSON قبل از پارس
+        json_needles = []
+        if level:
+            json_needles.append(field_needles('level', level.upper()))
+        if user_id and user_id.isdigit():
+            json_needles.append(field_needles('user_id', int(user_id)))
+
+        # خواندن از آخر فایل (جدیدترین اول) و توقف به محض پر شدن صفحه و نمونه‌ی آمار
+        skip = (page - 1) * per_page
+        page_lines = []
+        has_next = False
+        matched = 0
+        scanned = 0
         level_stats = {}
         user_stats = {}
-        for log in logs[:1000]:  # فقط ۱۰۰۰ خط اول برای آمار
-            entry = log['parsed']
-            level = entry.get('level', 'UNKNOWN')
-            user = entry.get('user', 'anonymous')
-            
-            level_stats[level] = level_stats.get(level, 0) + 1
-            user_stats[user] = user_stats.get(user, 0) + 1
-        
+
+        if include_rotated and not re.search(r'\.\d+$', log_file):
+            lines = iter_rotated_lines_newest_first(file_path, segment_filter)
+        else:
+            lines = iter_lines_newest_first(file_path, segment_filter)
+
+        for line in lines:
+            scanned += 1
+            if has_next and scanned >= STATS_SCAN_LIMIT:
+                break
+            if json_needles and line.startswith('{') and not all(any(n in line for n in alternatives) for alternatives in json_needles):
+                continue
+            log_entry = parse_log_line(line)
+            if not matches(line, log_entry):
+                continue
+
+            if matched < 1000:  # فقط ۱۰۰۰ خط اول برای آمار
+                entry_level = log_entry.get('level', 'UNKNOWN')
+                entry_user = log_entry.get('user', 'anonymous')
+                level_stats[entry_level] = level_stats.get(entry_level, 0) + 1
+                user_stats[entry_user] = user_stats.get(entry_user, 0) + 1
+
+            if skip <= matched < skip + per_page:
+                page_lines.append((line, log_entry))
+            elif matched >= skip + per_page:
+                has_next = True
+            matched += 1
+
+            if has_next and matched >= 1000:
+                break
+
         # لاگ کردن دسترسی
-        logger.audit_trail(
+        log_audit(
             f"Superuser '{request.user.username}' read logs from '{log_file}'",
             request,
             {'filters': request.GET.dict()}
@@ -194,14 +216,12 @@ def read_logs(request):
         return Response({
             'success': True,
             'file': log_file,
-            'logs': [log['highlight'] for log in page_obj.object_list],
+            'logs': [_highlight_log_line(_render_log_entry(line, entry)) for line, entry in page_lines],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
+                'has_next': has_next,
+                'has_previous': page > 1,
             },
             'statistics': {
                 'levels': level_stats,
@@ -227,6 +247,7 @@ def download_log_file(request, file_name):
     """
     try:
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         file_path = os.path.join(log_dir, file_name)
         
         # بررسی امنیتی: فقط فایل‌های .log
@@ -243,16 +264,16 @@ def download_log_file(request, file_name):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # لاگ کردن دانلود
-        logger.audit_trail(
+        log_audit(
             f"Superuser '{request.user.username}' downloaded log file '{file_name}'",
             request
         )
         
-        # ارسال فایل
-        with open(file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='text/plain; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-            return response
+        # ارسال فایل به صورت stream (فایل‌های بزرگ در حافظه خوانده نمی‌شوند)
+        return FileResponse(
+            open(file_path, 'rb'), as_attachment=True, filename=file_name,
+            content_type='text/plain; charset=utf-8'
+        )
             
     except Exception as e:
         log_error(f"Failed to download log file: {str(e)}", request)
@@ -271,6 +292,7 @@ def clear_log_file(request, file_name):
     """
     try:
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         file_path = os.path.join(log_dir, file_name)
         
         # بررسی امنیتی
@@ -289,9 +311,13 @@ def clear_log_file(request, file_name):
         # پاک کردن فایل (ایجاد فایل خالی جدید)
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(f"# Log file cleared by {request.user.username} at {datetime.now()}\n")
+        if os.path.exists(file_path + INDEX_SUFFIX):
+            os.remove(file_path + INDEX_SUFFIX)
+        LogStatsStore(log_dir).forget(file_name)
+        reset_activity_index(file_path)
         
         # لاگ کردن عملیات
-        logger.audit_trail(
+        log_audit(
             f"Superuser '{request.user.username}' cleared log file '{file_name}'",
             request
         )
@@ -318,14 +344,13 @@ def get_log_statistics(request):
     """
     try:
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         
         statistics = {
             'total_files': 0,
             'total_size': 0,
             'files': [],
-            'recent_errors': [],
-            'top_users': {},
-            'activity_by_hour': {}
+            'pipeline': logger.pipeline_stats()
         }
         
         # بررسی فایل‌های لاگ
@@ -344,50 +369,16 @@ def get_log_statistics(request):
                     'modified': datetime.fromtimestamp(stat.st_mtime)
                 })
         
-        # تحلیل فایل application.log برای آمار
-        app_log_path = os.path.join(log_dir, 'application.log')
-        if os.path.exists(app_log_path):
-            errors_today = []
-            user_activities = {}
-            hourly_activity = {str(h).zfill(2): 0 for h in range(24)}
-            
-            with open(app_log_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # استخراج اطلاعات
-                    entry = _parse_log_line(line)
-                    
-                    # شمارش خطاهای امروز
-                    if entry.get('level') in ['ERROR', 'CRITICAL']:
-                        if 'today' in entry.get('timestamp', ''):
-                            errors_today.append(entry)
-                    
-                    # آمار کاربران
-                    user = entry.get('user', 'anonymous')
-                    user_activities[user] = user_activities.get(user, 0) + 1
-                    
-                    # فعالیت ساعتی
-                    timestamp = entry.get('timestamp')
-                    if timestamp:
-                        try:
-                            hour = timestamp.split()[1].split(':')[0]
-                            hourly_activity[hour] = hourly_activity.get(hour, 0) + 1
-                        except:
-                            pass
-            
-            statistics['recent_errors'] = errors_today[-10:]  # ۱۰ خطای آخر
-            statistics['top_users'] = dict(sorted(
-                user_activities.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:10])
-            statistics['activity_by_hour'] = hourly_activity
+        # آمار application.log از store تجمعی؛ فقط خط‌های اضافه شده از دفعه‌ی قبل پارس می‌شوند
+        stats_store = LogStatsStore(log_dir)
+        statistics['new_lines_processed'] = stats_store.update('application.log')
+        statistics.update(stats_store.summary(
+            date_from=_parse_day(request.GET.get('date_from')),
+            date_to=_parse_day(request.GET.get('date_to')),
+        ))
         
         # لاگ کردن دسترسی
-        logger.audit_trail(
+        log_audit(
             f"Superuser '{request.user.username}' viewed log statistics",
             request
         )
@@ -417,6 +408,7 @@ def get_my_activity_logs(request):
         per_page = min(int(request.GET.get('per_page', 50)), 200)
         
         log_dir = getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+        logger.flush()  # رکوردهای در صف pipeline هم در فایل باشند
         app_log_path = os.path.join(log_dir, 'application.log')
         
         if not os.path.exists(app_log_path):
@@ -425,40 +417,21 @@ def get_my_activity_logs(request):
                 'message': 'فایل لاگ یافت نشد'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # فیلتر لاگ‌های کاربر جاری
-        user_logs = []
         username = request.user.username
-        
-        with open(app_log_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if username in line:
-                    user_logs.append({
-                        'raw': line,
-                        'highlight': _highlight_log_line(line)
-                    })
-        
-        # مرتب سازی معکوس (جدیدترین اول)
-        user_logs.reverse()
-        
-        # صفحه‌بندی
-        paginator = Paginator(user_logs, per_page)
-        try:
-            page_obj = paginator.page(page)
-        except:
-            page_obj = paginator.page(1)
-        
+        skip = (page - 1) * per_page
+
+        # ایندکس فعالیت کاربر (فقط ورودی‌های همین صفحه) و اسکن معکوس برای تاریخچه‌ی قبل از ایندکس
+        page_lines, has_next = read_user_activity(app_log_path, request.user.id, username, skip, per_page)
+
         return Response({
             'success': True,
             'username': username,
-            'logs': [log['highlight'] for log in page_obj.object_list],
+            'logs': [_highlight_log_line(_render_log_entry(line, parse_log_line(line))) for line in page_lines],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
+                'has_next': has_next,
+                'has_previous': page > 1,
             }
         })
         
@@ -474,55 +447,24 @@ def get_my_activity_logs(request):
 # 🛠️ Helper Functions
 # ════════════════════════════════════════════════════════════
 
-def _parse_log_line(line):
-    """پارس کردن یک خط لاگ به اجزای تشکیل دهنده"""
+def _render_log_entry(line, entry):
+    """نمایش خط JSON به شکل فرمت متنی تا هایلایت و کلاینت‌ها بدون تغییر کار کنند"""
+    if not line.startswith('{') or 'raw' in entry:
+        return line
+    return (
+        f"📅 {entry['timestamp']} | 📊 {entry['level']} | 👤 {entry['user']} | 🌐 {entry['ip']} | "
+        f"📁 {entry['location']} | 📝 {entry['message']}"
+    )
+
+
+def _parse_day(value):
+    """تاریخ YYYY-MM-DD یا None"""
+    if not value:
+        return None
     try:
-        # فرمت: 📅 2024-01-01 12:00:00 | 📊 INFO | 👤 admin | 🌐 127.0.0.1 | 📁 module:42 | 📝 message
-        pattern = r'📅 (.+?) \| 📊 (.+?) \| 👤 (.+?) \| 🌐 (.+?) \| 📁 (.+?) \| 📝 (.+)'
-        match = re.match(pattern, line)
-        
-        if match:
-            return {
-                'timestamp': match.group(1),
-                'level': match.group(2),
-                'user': match.group(3),
-                'ip': match.group(4),
-                'location': match.group(5),
-                'message': match.group(6)
-            }
-        
-        # فرمت قدیمی‌تر
-        patterns = [
-            r'\[(.+?)\] \[(.+?)\] \[(.+?)\] \[(.+?):(\d+)\] \[User:(.+?)\] \[IP:(.+?)\] - (.+)',
-            r'\[(.+?)\] \[(.+?)\] \[(.+?)\] - (.+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, line)
-            if match:
-                if len(match.groups()) == 8:
-                    return {
-                        'timestamp': match.group(1),
-                        'level': match.group(2),
-                        'logger': match.group(3),
-                        'module': match.group(4),
-                        'line': match.group(5),
-                        'user': match.group(6),
-                        'ip': match.group(7),
-                        'message': match.group(8)
-                    }
-                elif len(match.groups()) == 4:
-                    return {
-                        'timestamp': match.group(1),
-                        'level': match.group(2),
-                        'logger': match.group(3),
-                        'message': match.group(4)
-                    }
-    except:
-        pass
-    
-    # اگر نتوانستیم پارس کنیم
-    return {'raw': line}
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
 
 
 def _highlight_log_line(line):
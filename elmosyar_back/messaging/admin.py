@@ -50,16 +50,16 @@ class ConversationAdmin(admin.ModelAdmin):
 class MessageAdmin(admin.ModelAdmin):
     list_display = [
         'id', 'sender', 'conversation', 'content_preview', 
-        'has_attachment', 'is_read', 'created_at'
+        'has_attachment', 'created_at'
     ]
-    list_filter = ['is_read', 'created_at']
+    list_filter = ['created_at']
     search_fields = ['sender__username', 'content']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
     
     fieldsets = (
         ('پیام', {
-            'fields': ('conversation', 'sender', 'content', 'is_read')
+            'fields': ('conversation', 'sender', 'content')
         }),
         ('پیوست‌ها', {
             'fields': ('image', 'file'),
@@ -84,18 +84,3 @@ class MessageAdmin(admin.ModelAdmin):
             return format_html('<span style="color: green;">✓</span>')
         return format_html('<span style="color: red;">✗</span>')
     has_attachment.short_description = 'پیوست'
-    
-    actions = ['mark_as_read', 'mark_as_unread']
-    
-    def mark_as_read(self, request, queryset):
-        """علامت‌گذاری به عنوان خوانده شده"""
-        updated = queryset.update(is_read=True)
-        self.message_user(request, f'{updated} پیام به عنوان خوانده شده علامت‌گذاری شد.')
-    mark_as_read.short_description = 'علامت‌گذاری به عنوان خوانده شده'
-    
-    def mark_as_unread(self, request, queryset):
-        """علامت‌گذاری به عنوان خوانده نشده"""
-        updated = queryset.update(is_read=False)
-        self.message_user(request, f'{updated} پیام به عنوان خوانده نشده علامت‌گذاری شد.')
-    mark_as_unread.short_description = 'علامت‌گذاری به عنوان خوانده نشده'
-
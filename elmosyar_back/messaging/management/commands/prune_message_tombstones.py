@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from messaging.models import MessageTombstone
+from messaging.sync import tombstone_retention
+
+
+class Command(BaseCommand):
+    help = 'Delete message tombstones older than MESSAGE_TOMBSTONE_DAYS (suitable for cron)'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - tombstone_retention()
+        removed, _ = MessageTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"{removed} message tombstone(s) removed"))
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_states(apps, schema_editor):
+    """ردیف وضعیت برای مکالمه‌های موجود از روی پیام‌ها و فلگ is_read"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationState = apps.get_model('messaging', 'ConversationState')
+    Message = apps.get_model('messaging', 'Message')
+
+    states = []
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=500):
+        messages = Message.objects.filter(conversation=conversation)
+        last = messages.order_by('-created_at', '-id').first()
+        for user in conversation.participants.all():
+            others = messages.exclude(sender=user)
+            last_read = others.filter(is_read=True).order_by('-id').values_list('id', flat=True).first()
+            states.append(ConversationState(
+                conversation=conversation,
+                user=user,
+                last_message=last,
+                last_activity=last.created_at if last else conversation.updated_at,
+                unread_count=others.filter(is_read=False).count(),
+                last_read_message_id=last_read,
+            ))
+        if len(states) >= 1000:
+            ConversationState.objects.bulk_create(states, ignore_conflicts=True)
+            states = []
+    ConversationState.objects.bulk_create(states, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_cursor_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_read_message_id', models.BigIntegerField(blank=True, null=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='states', to='messaging.conversation')),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'conversation_state',
+                'indexes': [models.Index(fields=['user', 'last_activity', 'id'], name='conversatio_user_id_e45d77_idx')],
+                'constraints': [models.UniqueConstraint(fields=('conversation', 'user'), name='conversation_state_unique_user')],
+            },
+        ),
+        migrations.RunPython(backfill_states, migrations.RunPython.noop),
+    ]
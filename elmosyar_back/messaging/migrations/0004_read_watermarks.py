@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:04
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_conversation_state'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_convers_ef2279_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
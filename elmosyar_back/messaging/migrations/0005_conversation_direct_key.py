@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+def backfill_direct_keys(apps, schema_editor):
+    """
+    کلید مکالمه‌های دو نفره‌ی موجود؛ اگر قبلاً برای یک جفت چند مکالمه ساخته شده،
+    فقط قدیمی‌ترین کلید می‌گیرد (بقیه مثل مکالمه‌ی گروهی NULL می‌مانند)
+    """
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Participant = Conversation.participants.through
+
+    pairs = {}
+    for conversation_id, user_id in Participant.objects.values_list('conversation_id', 'user_id').iterator():
+        pairs.setdefault(conversation_id, []).append(user_id)
+
+    seen = set()
+    for conversation_id in sorted(pairs):
+        users = pairs[conversation_id]
+        if len(users) != 2:
+            continue
+        low, high = sorted(users)
+        key = f'{low}:{high}'
+        if key not in seen:
+            seen.add(key)
+            Conversation.objects.filter(id=conversation_id).update(direct_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='direct_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_conversation_direct_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'message_tombstone',
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='edited_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='message_convers_9cefe4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'edited_at'], name='message_convers_241413_idx'),
+        ),
+        migrations.AddField(
+            model_name='messagetombstone',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='messaging.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='messagetombstone',
+            index=models.Index(fields=['conversation', 'deleted_at'], name='message_tom_convers_ba6263_idx'),
+        ),
+    ]
@@ -1,13 +1,44 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
+from django.utils import timezone
+
+
+def direct_key(user_id, other_user_id):
+    """کلید یکتای مکالمه‌ی دو نفره، مستقل از ترتیب دو کاربر: '<id کوچکتر>:<id بزرگتر>'"""
+    low, high = sorted((int(user_id), int(other_user_id)))
+    return f'{low}:{high}'
+
+
+class ConversationQuerySet(models.QuerySet):
+
+    def get_or_create_direct(self, user, other_user):
+        """
+        مکالمه‌ی دو نفره‌ی user و other_user با یک جستجوی ایندکس یکتا؛ خروجی: (مکالمه، ساخته شد؟)
+        دو درخواست همزمان: ایندکس یکتای direct_key فقط یکی را می‌سازد و دیگری همان را برمی‌گرداند.
+        """
+        key = direct_key(user.pk, other_user.pk)
+        conversation = self.filter(direct_key=key).first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic():
+                conversation = self.create(direct_key=key)
+                conversation.participants.add(user, other_user)
+        except IntegrityError:
+            return self.get(direct_key=key), False
+        return conversation, True
 
 
 class Conversation(models.Model):
     """مدل جدید برای مکالمات خصوصی"""
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    # فقط برای مکالمه‌های دو نفره (direct_key)؛ گروهی‌ها NULL
+    direct_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ConversationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']
         db_table = 'conversation'
@@ -23,20 +54,66 @@ class Message(models.Model):
     content = models.TextField(max_length=2000)
     image = models.ImageField(upload_to='messages/images/', blank=True, null=True)
     file = models.FileField(upload_to='messages/files/', blank=True, null=True)
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # زمان آخرین ویرایش؛ sync تغییرات پیام‌های قبلاً دریافت شده را با آن پیدا می‌کند
+    edited_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['conversation', 'is_read', 'created_at']),
+            models.Index(fields=['conversation', 'created_at', 'id']),  # صفحه‌بندی cursor
+            models.Index(fields=['conversation', 'id']),  # تاریخچه‌ی قبل/بعد از یک پیام (messaging/sync.py)
+            models.Index(fields=['conversation', 'edited_at']),
         ]
         db_table = 'message'
 
     def __str__(self):
         return f"Message from {self.sender} in {self.conversation.id}"
 
-    def mark_as_read(self):
-        """علامت‌گذاری پیام به عنوان خوانده شده"""
-        self.is_read = True
-        self.save()
\ No newline at end of file
+
+class ConversationState(models.Model):
+    """
+    وضعیت هر مکالمه برای هر شرکت‌کننده: آخرین پیام، زمان آخرین فعالیت و شمارنده‌ی خوانده نشده‌ها
+    صندوق پیام‌ها (conversations_list) فقط همین جدول را با ایندکس (user, last_activity, id) می‌خواند.
+    با سیگنال‌های messaging/signals.py و messaging/state.py به‌روز می‌شود.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='states')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversation_states')
+    last_message = models.ForeignKey(
+        Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    last_activity = models.DateTimeField(default=timezone.now)
+    unread_count = models.PositiveIntegerField(default=0)
+    # watermark خواندن: همه‌ی پیام‌های تا این id خوانده شده‌اند (خوانده شدن پیام‌ها از مقایسه‌ی همین‌ها)
+    last_read_message_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='conversation_state_unique_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'last_activity', 'id']),  # صندوق پیام‌ها با cursor
+        ]
+        db_table = 'conversation_state'
+
+    def __str__(self):
+        return f"Conversation {self.conversation_id} state for user {self.user_id}"
+
+
+class MessageTombstone(models.Model):
+    """
+    ردپای پیام حذف شده تا کلاینت‌هایی که آن را قبلاً گرفته‌اند در sync حذفش کنند
+    بعد از MESSAGE_TOMBSTONE_DAYS با دستور prune_message_tombstones پاک می‌شود.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='tombstones')
+    message_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', 'deleted_at']),
+        ]
+        db_table = 'message_tombstone'
+
+    def __str__(self):
+        return f"Deleted message {self.message_id} in {self.conversation_id}"
@@ -0,0 +1,156 @@
+"""
+ارسال لحظه‌ای رویدادهای پیام‌رسانی به کاربران (WebSocket در messaging/websocket.py)
+
+ویوها بعد از commit تراکنش publish_event را صدا می‌زنند؛ رویداد یک بار به JSON تبدیل
+و از طریق broker به همه‌ی اتصال‌های شرکت‌کنندگان مکالمه فرستاده می‌شود.
+
+broker قابل تعویض است (MESSAGING_BROKER): LocalBroker فقط اتصال‌های همین پروسه را می‌شناسد.
+برای چند worker یک broker دیگر (مثلاً Redis pub/sub) همین سه متد را پیاده می‌کند و پیام‌های
+رسیده از بقیه‌ی پروسه‌ها را به LocalBroker داخل پروسه‌ی خودش می‌دهد.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core import fastjson
+from log_manager.log_config import log_error
+
+
+# نشانه‌ی بسته شدن اتصال در صف (قطع اتصال کلاینت یا پر شدن صف)
+CLOSE = object()
+OVERFLOW = object()
+
+
+class Connection:
+    """
+    یک اتصال WebSocket از دید broker: صف پیام‌های آماده‌ی ارسال روی event loop همان اتصال
+    push از هر threadی قابل صدا زدن است.
+    """
+
+    def __init__(self, user_id, loop=None, max_queue=None):
+        self.user_id = user_id
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.max_queue = max_queue or getattr(settings, 'MESSAGING_WS_MAX_QUEUE', 256)
+        self.closed = False
+
+    def push(self, text):
+        self.loop.call_soon_threadsafe(self._put, text)
+
+    def _put(self, item):
+        if self.closed:
+            return
+        if item is CLOSE:
+            self.closed = True
+        elif self.queue.qsize() >= self.max_queue:
+            # کلاینت کندتر از رویدادهاست؛ قطع می‌شود تا با API دوباره همگام شود
+            self.closed = True
+            item = OVERFLOW
+        self.queue.put_nowait(item)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self._put, CLOSE)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    """رابط broker؛ user_id → اتصال‌ها"""
+
+    def subscribe(self, connection):
+        raise NotImplementedError
+
+    def unsubscribe(self, connection):
+        raise NotImplementedError
+
+    def publish(self, user_ids, text):
+        """ارسال یک پیام (JSON آماده) به همه‌ی اتصال‌های کاربران؛ خروجی: تعداد اتصال‌ها"""
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """pub/sub داخل پروسه (یک worker ASGI یا تست‌ها)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def subscribe(self, connection):
+        with self._lock:
+            self._connections.setdefault(connection.user_id, set()).add(connection)
+
+    def unsubscribe(self, connection):
+        with self._lock:
+            connections = self._connections.get(connection.user_id)
+            if connections is not None:
+                connections.discard(connection)
+                if not connections:
+                    del self._connections[connection.user_id]
+
+    def publish(self, user_ids, text):
+        with self._lock:
+            targets = [connection for user_id in set(user_ids) for connection in self._connections.get(user_id, ())]
+        for connection in targets:
+            connection.push(text)
+        return len(targets)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(connections) for connections in self._connections.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'MESSAGING_BROKER', 'messaging.realtime.LocalBroker'))()
+    return _broker
+
+
+def reset_broker():
+    """ساخت دوباره‌ی broker در فراخوانی بعدی get_broker (تست‌ها و تغییر تنظیمات)"""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_event(user_ids, event_type, data):
+    """
+    ارسال رویداد به کاربران بعد از commit تراکنش جاری (rollback شده‌ها فرستاده نمی‌شوند)
+    خطای broker فقط لاگ می‌شود؛ کلاینت‌ها همیشه می‌توانند با API همگام شوند.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    text = fastjson.dumps({'type': event_type, 'data': data}, default=str)
+
+    def send():
+        try:
+            get_broker().publish(user_ids, text)
+        except Exception as e:
+            log_error(f"Realtime publish failed for {event_type}: {str(e)}", None, {'user_ids': user_ids})
+
+    transaction.on_commit(send)
+
+
+def participant_ids(conversation):
+    return list(conversation.participants.values_list('id', flat=True))
+
+
+def publish_message(event_type, message, user_ids):
+    """رویدادهای message.created / message.updated با همان خروجی MessageSerializer"""
+    from .serializers import MessageSerializer
+
+    data = dict(MessageSerializer(message).data)
+    data['conversation_id'] = message.conversation_id
+    publish_event(user_ids, event_type, data)
+
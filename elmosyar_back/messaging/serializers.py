@@ -1,48 +1,68 @@
 from rest_framework import serializers
-from accounts.serializers import UserSerializer
-from .models import Conversation, Message
+from accounts.serializers import CompactUserSerializer
+from .models import ConversationState, Message
+from .state import is_read_by_others, read_watermarks
 
 class MessageSerializer(serializers.ModelSerializer):
-    sender_info = UserSerializer(source='sender', read_only=True)
+    sender_info = CompactUserSerializer(source='sender', read_only=True)
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
         fields = [
             'id', 'sender', 'sender_info', 'content', 'image', 'file',
-            'is_read', 'created_at'
+            'is_read', 'created_at', 'edited_at'
         ]
-        read_only_fields = ['sender', 'created_at']
+        read_only_fields = ['sender', 'created_at', 'edited_at']
+
+    def get_is_read(self, obj):
+        # watermarkهای هر مکالمه یک بار برای کل لیست خوانده و در context نگه داشته می‌شوند
+        cache = self.context.setdefault('read_watermarks', {})
+        if obj.conversation_id not in cache:
+            cache[obj.conversation_id] = read_watermarks(obj.conversation_id)
+        return is_read_by_others(obj, cache[obj.conversation_id])
+
+class MessageSyncSerializer(MessageSerializer):
+    """
+    پیام برای تاریخچه و sync: sender فقط id است و هر کاربر یک بار در users پاسخ می‌آید
+    (context باید user_map داشته باشد؛ serializer_context یا {'user_map': {}})
+    """
+    sender = CompactUserSerializer(read_only=True)
+
+    class Meta(MessageSerializer.Meta):
+        fields = ['id', 'sender', 'content', 'image', 'file', 'is_read', 'created_at', 'edited_at']
+
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    یک مکالمه از دید کاربر جاری، از روی ردیف ConversationState او
+    (queryset با select_related('last_message__sender') و prefetch_related('conversation__participants'))
+    """
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
     other_user = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
-    unread_count = serializers.SerializerMethodField()
+    updated_at = serializers.DateTimeField(source='last_activity', read_only=True)
 
     class Meta:
-        model = Conversation
+        model = ConversationState
         fields = ['id', 'other_user', 'last_message', 'unread_count', 'updated_at']
-        read_only_fields = ['updated_at']
+        read_only_fields = ['unread_count']
 
     def get_other_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            other_user = obj.participants.exclude(id=request.user.id).first()
-            return UserSerializer(other_user, context=self.context).data if other_user else None
-        return None
+        other_user = next(
+            (user for user in obj.conversation.participants.all() if user.id != obj.user_id), None
+        )
+        return CompactUserSerializer(other_user, context=self.context).data if other_user else None
 
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
+        last_message = obj.last_message
         if last_message:
             return {
                 'content': last_message.content,
                 'sender': last_message.sender.username,
                 'created_at': last_message.created_at,
-                'is_read': last_message.is_read
+                'is_read': is_read_by_others(last_message, {
+                    state.user_id: state.last_read_message_id for state in obj.conversation.states.all()
+                })
             }
         return None
-
-    def get_unread_count(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
-        return 0
\ No newline at end of file
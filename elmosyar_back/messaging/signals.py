@@ -0,0 +1,49 @@
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Conversation, ConversationState, Message, MessageTombstone
+from .state import ensure_states, forget_message, record_message
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.conversations.add(...)؛ instance کاربر است
+        conversations = Conversation.objects.filter(pk__in=pk_set or ())
+        if action == 'post_add':
+            for conversation in conversations:
+                ensure_states(conversation, [instance.pk])
+        elif action == 'post_remove':
+            ConversationState.objects.filter(user=instance, conversation__in=conversations).delete()
+        elif action == 'pre_clear':
+            ConversationState.objects.filter(user=instance).delete()
+        return
+
+    if action == 'post_add':
+        ensure_states(instance, pk_set)
+    elif action == 'post_remove':
+        ConversationState.objects.filter(conversation=instance, user_id__in=pk_set).delete()
+    elif action == 'pre_clear':
+        ConversationState.objects.filter(conversation=instance).delete()
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, **kwargs):
+    if created:
+        record_message(instance)
+
+
+def _deletes_conversation(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is Conversation
+    return isinstance(origin, Conversation)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, origin=None, **kwargs):
+    forget_message(instance)
+    # هر حذفی (ویو، ادمین، cascade حذف فرستنده) برای sync کلاینت‌هایی که پیام را قبلاً گرفته‌اند؛
+    # اگر خود مکالمه حذف می‌شود tombstone معنایی ندارد (و با cascade آن هم حذف می‌شد)
+    if not _deletes_conversation(origin):
+        MessageTombstone.objects.create(conversation_id=instance.conversation_id, message_id=instance.id)
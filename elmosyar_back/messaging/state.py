@@ -0,0 +1,102 @@
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import ConversationState, Message
+
+
+def latest_message(conversation_id):
+    return Message.objects.filter(conversation_id=conversation_id).order_by('-created_at', '-id').first()
+
+
+def ensure_states(conversation, user_ids):
+    """ساخت ردیف وضعیت برای شرکت‌کنندگان تازه (پیام‌های قبلی برایشان خوانده نشده حساب می‌شوند)"""
+    last = latest_message(conversation.id)
+    states = []
+    for user_id in user_ids:
+        unread = Message.objects.filter(conversation=conversation).exclude(sender_id=user_id).count() if last else 0
+        states.append(ConversationState(
+            conversation=conversation,
+            user_id=user_id,
+            last_message=last,
+            last_activity=last.created_at if last else conversation.updated_at,
+            unread_count=unread,
+        ))
+    ConversationState.objects.bulk_create(states, ignore_conflicts=True)
+
+
+def record_message(message):
+    """پیام جدید: یک UPDATE برای همه‌ی شرکت‌کنندگان (خوانده نشده‌ها فقط برای غیر فرستنده‌ها زیاد می‌شود)"""
+    ConversationState.objects.filter(conversation_id=message.conversation_id).update(
+        last_message=message,
+        last_activity=message.created_at,
+        unread_count=Case(
+            When(user_id=message.sender_id, then=F('unread_count')),
+            default=F('unread_count') + 1,
+        ),
+    )
+
+
+def forget_message(message):
+    """پیام حذف شده: کم کردن شمارنده‌ی کسانی که آن را نخوانده بودند و جایگزینی آخرین پیام"""
+    states = ConversationState.objects.filter(conversation_id=message.conversation_id)
+    states.exclude(user_id=message.sender_id).filter(
+        Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=message.id)
+    ).update(unread_count=Greatest(F('unread_count') - 1, Value(0)))
+
+    # on_delete=SET_NULL ارجاع به همین پیام را خالی کرده است
+    orphaned = states.filter(last_message__isnull=True)
+    if orphaned.exists():
+        last = latest_message(message.conversation_id)
+        if last is not None:
+            orphaned.update(last_message=last)
+
+
+def mark_read(state, up_to=None):
+    """
+    جلو بردن watermark خواندن صاحب state تا پیام up_to (پیش‌فرض: آخرین پیام مکالمه)
+    فقط یک UPDATE روی ردیف خودش، مستقل از تعداد پیام‌های خوانده نشده؛ watermark هیچ‌وقت عقب نمی‌رود.
+    خروجی: تعداد پیام‌هایی که خوانده نشده بودند و حالا خوانده شدند (0 یعنی تغییری نبود)
+    """
+    last_id = state.last_message_id
+    target = last_id if up_to is None or last_id is None else min(up_to, last_id)
+    if target is None or (state.last_read_message_id or 0) >= target:
+        return 0
+
+    behind = ConversationState.objects.filter(id=state.id).filter(
+        Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=target)
+    )
+    previous = state.unread_count
+    # همه خوانده شد؛ شرط last_message_id تا پیامی که همین حالا رسیده صفر نشود
+    if target == last_id and behind.filter(last_message_id=last_id).update(
+        last_read_message_id=target, unread_count=0
+    ):
+        unread_count = 0
+    else:
+        unread_count = Message.objects.filter(
+            conversation_id=state.conversation_id, id__gt=target
+        ).exclude(sender_id=state.user_id).count()
+        if not behind.update(last_read_message_id=target, unread_count=unread_count):
+            return 0
+
+    state.last_read_message_id, state.unread_count = target, unread_count
+    return max(previous - unread_count, 0)
+
+
+def read_watermarks(conversation_id):
+    """{user_id: last_read_message_id} همه‌ی شرکت‌کنندگان یک مکالمه"""
+    return dict(
+        ConversationState.objects.filter(conversation_id=conversation_id).values_list('user_id', 'last_read_message_id')
+    )
+
+
+def is_read_by_others(message, watermarks):
+    """پیام را همه‌ی شرکت‌کنندگان به جز فرستنده خوانده‌اند؟ (رسید خواندن از مقایسه‌ی watermarkها)"""
+    others = [watermark for user_id, watermark in watermarks.items() if user_id != message.sender_id]
+    return bool(others) and all(watermark is not None and watermark >= message.id for watermark in others)
+
+
+def inbox(user):
+    """ردیف‌های وضعیت مکالمه‌های user با همه‌ی داده‌ی لازم برای ConversationSerializer"""
+    return ConversationState.objects.filter(user=user).select_related(
+        'conversation', 'last_message__sender'
+    ).prefetch_related('conversation__participants', 'conversation__states')
@@ -0,0 +1,147 @@
+"""
+تاریخچه و همگام‌سازی پیام‌های یک مکالمه بر اساس id پیام (بدون OFFSET و COUNT)
+
+- message_history: پیام‌های قبل یا بعد از یک id (بارگذاری تدریجی تاریخچه)
+- sync_changes: هرچه از آخرین sync عوض شده: پیام‌های جدید، ویرایش شده‌ها و حذف شده‌ها (tombstone)
+
+توکن sync مات است و (آخرین id پیام دیده شده، زمان آخرین sync) را نگه می‌دارد.
+زمان با کمی هم‌پوشانی (SYNC_OVERLAP) ذخیره می‌شود تا تغییرهایی که تراکنششان دیرتر commit شده
+از دست نروند؛ کلاینت ممکن است یک تغییر را دو بار بگیرد و باید آن را جایگزین (upsert) کند.
+
+وقتی تغییرها در یک پاسخ جا نمی‌شوند (has_more) توکن وضعیت «catch-up» را هم دارد: آخرین id که کلاینت
+قبل از شروع آن داشت (فقط همین‌ها ممکن است ویرایش/دیر commit شده باشند)، جای ادامه در لیست ویرایش شده‌ها
+و زمانی که sync بعد از پایان catch-up از آن شروع می‌شود. هر ردیف در یک catch-up یک بار فرستاده می‌شود.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Message, MessageTombstone
+
+
+SYNC_OVERLAP = timedelta(seconds=5)
+MAX_LIMIT = 200
+
+
+class SyncTokenExpired(Exception):
+    """توکن قدیمی‌تر از نگهداری tombstoneهاست؛ کلاینت باید از اول بارگذاری کند"""
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'MESSAGE_TOMBSTONE_DAYS', 30))
+
+
+def encode_sync_token(last_message_id, since, catch_up=None):
+    """catch_up: (id پایه، ادامه‌ی ویرایش شده‌ها بعد از این id، زمان sync بعد از catch-up) یا None"""
+    payload = {'m': last_message_id, 't': since.isoformat()}
+    if catch_up is not None:
+        base_id, edited_after, next_since = catch_up
+        payload.update({'b': base_id, 'e': edited_after, 'n': next_since.isoformat()})
+    payload = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """(آخرین id پیام، زمان، catch_up یا None) از روی توکن؛ برای توکن نامعتبر ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        last_message_id, since = int(payload['m']), datetime.fromisoformat(payload['t'])
+        catch_up = None
+        if 'b' in payload:
+            catch_up = (int(payload['b']), int(payload['e']), datetime.fromisoformat(payload['n']))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError('Invalid sync token')
+    if since.tzinfo is None or last_message_id < 0:
+        raise ValueError('Invalid sync token')
+    if catch_up is not None and (catch_up[2].tzinfo is None or min(catch_up[:2]) < 0):
+        raise ValueError('Invalid sync token')
+    return last_message_id, since, catch_up
+
+
+def _messages(conversation_id):
+    return Message.objects.filter(conversation_id=conversation_id).select_related('sender')
+
+
+def message_history(conversation_id, before=None, after=None, limit=50):
+    """
+    پیام‌های قبل از before یا بعد از after (بدون هیچ‌کدام: آخرین پیام‌ها)، همیشه به ترتیب صعودی id
+    خروجی: (پیام‌ها، در آن جهت پیام بیشتری هست؟)
+    """
+    messages = _messages(conversation_id)
+    if after is not None:
+        page = list(messages.filter(id__gt=after).order_by('id')[:limit + 1])
+        return page[:limit], len(page) > limit
+
+    if before is not None:
+        messages = messages.filter(id__lt=before)
+    page = list(messages.order_by('-id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    page.reverse()
+    return page, has_more
+
+
+def sync_changes(conversation_id, token=None, limit=100):
+    """
+    تغییرات مکالمه از زمان توکن؛ بدون توکن: آخرین limit پیام و توکن اولیه
+    خروجی: {'messages', 'deleted', 'has_more', 'sync_token'}
+    has_more یعنی پیام جدید یا ویرایش شده‌ی بیشتری هست و باید فوراً با توکن جدید دوباره صدا زده شود.
+    """
+    started = timezone.now()
+
+    if token is None:
+        messages, _ = message_history(conversation_id, limit=limit)
+        last_message_id = messages[-1].id if messages else 0
+        return {
+            'messages': messages,
+            'deleted': [],
+            'has_more': False,
+            'sync_token': encode_sync_token(last_message_id, started - SYNC_OVERLAP),
+        }
+
+    last_message_id, since, catch_up = decode_sync_token(token)
+    if since < started - tombstone_retention():
+        raise SyncTokenExpired()
+
+    deleted = []
+    if catch_up is None:
+        # شروع catch-up؛ حذف‌ها فقط همین‌جا، حذف‌های بعدی زمانشان بعد از next_since است
+        base_id, edited_after, next_since = last_message_id, 0, max(since, started - SYNC_OVERLAP)
+        deleted = list(
+            MessageTombstone.objects.filter(
+                conversation_id=conversation_id, deleted_at__gte=since, message_id__lte=base_id
+            ).values_list('message_id', flat=True)
+        )
+    else:
+        base_id, edited_after, next_since = catch_up
+
+    created, more_created = message_history(conversation_id, after=last_message_id, limit=limit)
+    # ویرایش شده‌ها، و پیام‌هایی که دیرتر commit شدند و در sync قبلی نبودند؛ فقط بین پیام‌هایی که
+    # کلاینت قبل از catch-up داشت (پیام‌های خود catch-up تازه فرستاده شده‌اند) و صفحه به صفحه
+    edited = list(
+        _messages(conversation_id).filter(id__gt=edited_after, id__lte=base_id).filter(
+            Q(edited_at__gte=since) | Q(created_at__gte=since)
+        ).order_by('id')[:limit + 1]
+    )
+    more_edited = len(edited) > limit
+    edited = edited[:limit]
+
+    new_last_id = created[-1].id if created else last_message_id
+    if more_created or more_edited:
+        edited_after = edited[-1].id if more_edited else base_id
+        token = encode_sync_token(new_last_id, since, (base_id, edited_after, next_since))
+    else:
+        # ویرایش/حذف‌هایی که وسط catch-up رخ دادند بعد از next_since هستند و دور بعد می‌آیند
+        token = encode_sync_token(new_last_id, next_since)
+    return {
+        'messages': edited + created,
+        'deleted': sorted(set(deleted)),
+        'has_more': more_created or more_edited,
+        'sync_token': token,
+    }
@@ -0,0 +1,444 @@
+import asyncio
+import datetime
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Conversation, ConversationState, Message, MessageTombstone
+from .realtime import get_broker, reset_broker
+from .sync import encode_sync_token
+
+
+User = get_user_model()
+
+class WebSocketClient:
+    """اتصال آزمایشی به ASGI application بدون سرور"""
+
+    def __init__(self, path='/ws/messaging/', token=None):
+        from asgi import application
+
+        self.incoming, self.outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {
+            'type': 'websocket', 'path': path, 'headers': [],
+            'query_string': f'token={token}'.encode() if token else b'',
+        }
+        self.task = asyncio.ensure_future(application(scope, self.incoming.get, self.outgoing.put))
+
+    async def connect(self):
+        await self.incoming.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outgoing.get(), 2)
+
+    async def receive_json(self):
+        return json.loads((await self.receive())['text'])
+
+    async def send_json(self, data):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 2)
+
+
+class RealtimeMessagingTest(TestCase):
+
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.sara = User.objects.create_user(username="sara", email="sara@example.com", password="1234")
+        self.ali = User.objects.create_user(username="ali", email="ali@example.com", password="1234")
+        self.outsider = User.objects.create_user(username="reza", email="reza@example.com", password="1234")
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sara, self.ali)
+        self.client = APIClient()
+
+    def token(self, user):
+        return str(RefreshToken.for_user(user).access_token)
+
+    def request(self, user, method, url, data=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def test_participants_receive_message_events(self):
+        ali_token, outsider_token = self.token(self.ali), self.token(self.outsider)
+
+        async def scenario():
+            ali = WebSocketClient(token=ali_token)
+            outsider = WebSocketClient(token=outsider_token)
+            for socket, user in ((ali, self.ali), (outsider, self.outsider)):
+                self.assertEqual((await socket.connect())['type'], 'websocket.accept')
+                self.assertEqual(await socket.receive_json(), {'type': 'ready', 'data': {'user_id': user.id}})
+
+            response = await sync_to_async(self.request)(
+                self.sara, 'post', f'/api/conversations/{self.conversation.id}/send/', {'content': 'salam'}
+            )
+            message_id = response.json()['message']['id']
+            event = await ali.receive_json()
+            self.assertEqual(event['type'], 'message.created')
+            self.assertEqual(event['data']['id'], message_id)
+            self.assertEqual(event['data']['content'], 'salam')
+            self.assertEqual(event['data']['conversation_id'], self.conversation.id)
+            self.assertEqual(event['data']['sender_info']['username'], 'sara')
+
+            await sync_to_async(self.request)(self.sara, 'put', f'/api/messages/{message_id}/update/', {'content': 'salam!'})
+            event = await ali.receive_json()
+            self.assertEqual((event['type'], event['data']['content']), ('message.updated', 'salam!'))
+
+            await sync_to_async(self.request)(self.sara, 'delete', f'/api/messages/{message_id}/delete/')
+            event = await ali.receive_json()
+            self.assertEqual(event, {'type': 'message.deleted', 'data': {
+                'id': message_id, 'conversation_id': self.conversation.id
+            }})
+
+            await ali.send_json({'type': 'ping'})
+            self.assertEqual((await ali.receive_json())['type'], 'pong')
+
+            # کاربر بیرون از مکالمه چیزی دریافت نمی‌کند
+            self.assertTrue(outsider.outgoing.empty())
+            await ali.disconnect()
+            await outsider.disconnect()
+            self.assertEqual(get_broker().connection_count(), 0)
+
+        async_to_sync(scenario)()
+
+    def test_read_receipt(self):
+        Message.objects.create(conversation=self.conversation, sender=self.sara, content='hi')
+        token = self.token(self.sara)
+
+        async def scenario():
+            sara = WebSocketClient(token=token)
+            await sara.connect()
+            await sara.receive_json()
+
+            await sync_to_async(self.request)(self.ali, 'get', f'/api/conversations/{self.conversation.id}/')
+            event = await sara.receive_json()
+            self.assertEqual(event['type'], 'conversation.read')
+            self.assertEqual(event['data']['reader_id'], self.ali.id)
+
+            # بار دوم پیام خوانده نشده‌ای نیست
+            await sync_to_async(self.request)(self.ali, 'get', f'/api/conversations/{self.conversation.id}/')
+            self.assertTrue(sara.outgoing.empty())
+            await sara.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_rejected_connections(self):
+        token = self.token(self.sara)
+
+        async def scenario():
+            for socket in (WebSocketClient(), WebSocketClient(token='invalid'),
+                               WebSocketClient('/ws/other/', token=token)):
+                self.assertEqual((await socket.connect())['type'], 'websocket.close')
+                await asyncio.wait_for(socket.task, 2)
+
+        async_to_sync(scenario)()
+
+    @override_settings(MESSAGING_WS_MAX_QUEUE=2)
+    def test_slow_client_is_disconnected(self):
+        token = self.token(self.sara)
+
+        async def scenario():
+            sara = WebSocketClient(token=token)
+            await sara.connect()
+            await sara.receive_json()
+            for i in range(5):
+                get_broker().publish([self.sara.id], json.dumps({'type': 'test', 'data': i}))
+            messages = [await sara.receive() for _ in range(3)]
+            self.assertEqual([message['type'] for message in messages],
+                             ['websocket.send', 'websocket.send', 'websocket.close'])
+            self.assertEqual(messages[-1]['code'], 4408)
+            await asyncio.wait_for(sara.task, 2)
+            self.assertEqual(get_broker().connection_count(), 0)
+
+        async_to_sync(scenario)()
+
+
+class ConversationStateTest(TestCase):
+
+    def setUp(self):
+        self.sara = User.objects.create_user(username="sara", email="sara@example.com", password="1234")
+        self.friends = [
+            User.objects.create_user(username=f"friend{i}", email=f"friend{i}@example.com", password="1234")
+            for i in range(3)
+        ]
+        self.conversations = []
+        for friend in self.friends:
+            conversation = Conversation.objects.create()
+            conversation.participants.add(self.sara, friend)
+            self.conversations.append(conversation)
+        self.client = APIClient()
+
+    def send(self, user, conversation, content):
+        self.client.force_authenticate(user)
+        response = self.client.post(f'/api/conversations/{conversation.id}/send/', {'content': content}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['message']['id']
+
+    def state(self, conversation, user):
+        return ConversationState.objects.get(conversation=conversation, user=user)
+
+    def test_states_follow_messages(self):
+        first, second, _ = self.conversations
+        self.send(self.friends[0], first, 'one')
+        last_id = self.send(self.friends[0], first, 'two')
+        self.send(self.sara, second, 'hello')
+
+        self.assertEqual(self.state(first, self.sara).unread_count, 2)
+        self.assertEqual(self.state(first, self.sara).last_message_id, last_id)
+        self.assertEqual(self.state(first, self.friends[0]).unread_count, 0)
+        self.assertEqual(self.state(second, self.friends[1]).unread_count, 1)
+
+        # حذف آخرین پیام: آخرین پیام قبلی جایگزین و شمارنده کم می‌شود
+        self.client.force_authenticate(self.friends[0])
+        self.client.delete(f'/api/messages/{last_id}/delete/')
+        state = self.state(first, self.sara)
+        self.assertEqual((state.unread_count, state.last_message.content), (1, 'one'))
+
+        self.client.force_authenticate(self.sara)
+        response = self.client.get(f'/api/conversations/{first.id}/')
+        self.assertEqual(response.json()['conversation']['unread_count'], 0)
+        state = self.state(first, self.sara)
+        self.assertEqual((state.unread_count, state.last_read_message_id), (0, state.last_message_id))
+
+    def test_inbox_is_paginated_and_query_count_is_flat(self):
+        for conversation, friend in zip(self.conversations, self.friends):
+            self.send(friend, conversation, f'from {friend.username}')
+
+        self.client.force_authenticate(self.sara)
+        # صفحه + participants + watermarkها (مستقل از تعداد مکالمه‌ها و پیام‌ها)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/conversations/', {'per_page': 2})
+        data = response.json()
+        self.assertEqual([item['id'] for item in data['conversations']],
+                         [self.conversations[2].id, self.conversations[1].id])
+        self.assertEqual(data['conversations'][0]['other_user']['username'], 'friend2')
+        self.assertEqual(data['conversations'][0]['last_message']['content'], 'from friend2')
+        self.assertEqual(data['conversations'][0]['unread_count'], 1)
+        self.assertTrue(data['pagination']['has_next'])
+
+        rest = self.client.get('/api/conversations/', {'per_page': 2, 'cursor': data['pagination']['next_cursor']})
+        self.assertEqual([item['id'] for item in rest.json()['conversations']], [self.conversations[0].id])
+
+    def test_participant_added_later_gets_state(self):
+        conversation = self.conversations[0]
+        self.send(self.friends[0], conversation, 'before')
+        late = User.objects.create_user(username="late", email="late@example.com", password="1234")
+        late.conversations.add(conversation)
+        self.assertEqual(self.state(conversation, late).unread_count, 1)
+
+        conversation.participants.remove(late)
+        self.assertFalse(ConversationState.objects.filter(user=late).exists())
+
+
+class ReadWatermarkTest(TestCase):
+
+    def setUp(self):
+        self.sara = User.objects.create_user(username="sara", email="sara@example.com", password="1234")
+        self.ali = User.objects.create_user(username="ali", email="ali@example.com", password="1234")
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sara, self.ali)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=self.sara, content=f'm{i}') for i in range(30)
+        ]
+        self.client = APIClient()
+
+    def state(self, user):
+        return ConversationState.objects.get(conversation=self.conversation, user=user)
+
+    def test_marking_read_is_one_write(self):
+        self.assertEqual(self.state(self.ali).unread_count, 30)
+        self.client.force_authenticate(self.ali)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/conversations/{self.conversation.id}/', {'per_page': 5})
+        self.assertEqual(response.status_code, 200)
+        writes = [query['sql'] for query in queries if not query['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('conversation_state', writes[0])
+        self.assertEqual(self.state(self.ali).last_read_message_id, self.messages[-1].id)
+
+        # رسید خواندن برای فرستنده از مقایسه‌ی watermark
+        self.client.force_authenticate(self.sara)
+        data = self.client.get(f'/api/conversations/{self.conversation.id}/', {'per_page': 5}).json()
+        self.assertTrue(all(message['is_read'] for message in data['messages']))
+        self.assertTrue(self.client.get('/api/conversations/').json()['conversations'][0]['last_message']['is_read'])
+
+    def test_partial_read_and_watermark_never_moves_back(self):
+        self.client.force_authenticate(self.ali)
+        url = f'/api/conversations/{self.conversation.id}/read/'
+        response = self.client.post(url, {'message_id': self.messages[9].id}, format='json')
+        self.assertEqual(response.json()['unread_count'], 20)
+        self.assertEqual(response.json()['marked'], 10)
+
+        response = self.client.post(url, {'message_id': self.messages[2].id}, format='json')
+        self.assertEqual(response.json()['last_read_message_id'], self.messages[9].id)
+        self.assertEqual(response.json()['marked'], 0)
+
+        self.client.force_authenticate(self.sara)
+        data = self.client.get(f'/api/conversations/{self.conversation.id}/', {'per_page': 50}).json()
+        read = [message['is_read'] for message in data['messages']]
+        self.assertEqual(read.count(True), 10)
+
+        self.client.force_authenticate(self.ali)
+        response = self.client.post(url, format='json')
+        self.assertEqual((response.json()['unread_count'], response.json()['marked']), (0, 20))
+        self.assertEqual(self.client.post(url, {'message_id': 'x'}, format='json').status_code, 400)
+
+
+class DirectConversationTest(TestCase):
+
+    def setUp(self):
+        self.sara = User.objects.create_user(username="sara", email="sara@example.com", password="1234")
+        self.ali = User.objects.create_user(username="ali", email="ali@example.com", password="1234")
+        self.client = APIClient()
+
+    def start(self, user, username):
+        self.client.force_authenticate(user)
+        response = self.client.post(f'/api/conversations/start/{username}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['conversation']['id']
+
+    def test_start_conversation_reuses_pair(self):
+        first = self.start(self.sara, 'ali')
+        self.assertEqual(self.start(self.ali, 'sara'), first)
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.direct_key, f'{self.sara.id}:{self.ali.id}')
+        self.assertEqual(set(conversation.participants.values_list('id', flat=True)), {self.sara.id, self.ali.id})
+
+        self.client.force_authenticate(self.sara)
+        self.assertEqual(self.client.post('/api/conversations/start/nobody/').status_code, 404)
+        self.assertEqual(self.client.post('/api/conversations/start/sara/').status_code, 400)
+
+    def test_concurrent_create_returns_existing(self):
+        existing, created = Conversation.objects.get_or_create_direct(self.sara, self.ali)
+        self.assertTrue(created)
+        # درخواست همزمانی که هنوز مکالمه را ندیده بود: ایندکس یکتا جلوی ساخت دوم را می‌گیرد
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            conversation, created = Conversation.objects.get_or_create_direct(self.ali, self.sara)
+        self.assertFalse(created)
+        self.assertEqual(conversation.id, existing.id)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+
+class MessageSyncTest(TestCase):
+
+    def setUp(self):
+        self.sara = User.objects.create_user(username="sara", email="sara@example.com", password="1234")
+        self.ali = User.objects.create_user(username="ali", email="ali@example.com", password="1234")
+        self.conversation, _ = Conversation.objects.get_or_create_direct(self.sara, self.ali)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=(self.sara, self.ali)[i % 2], content=f'm{i}')
+            for i in range(30)
+        ]
+        # پیام‌های قدیمی، بیرون از پنجره‌ی هم‌پوشانی sync
+        Message.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.sara)
+        self.url = f'/api/conversations/{self.conversation.id}/messages/'
+
+    def ids(self, response):
+        return [message['id'] for message in response.json()['messages']]
+
+    def test_history_before_and_after(self):
+        latest = self.client.get(self.url, {'limit': 10})
+        self.assertEqual(self.ids(latest), [message.id for message in self.messages[20:]])
+        self.assertTrue(latest.json()['has_more'])
+        data = latest.json()
+        self.assertEqual(data['messages'][0]['sender'], self.sara.id)
+        self.assertEqual(set(data['users']), {str(self.sara.id), str(self.ali.id)})
+
+        older = self.client.get(self.url, {'before': self.messages[5].id, 'limit': 10})
+        self.assertEqual(self.ids(older), [message.id for message in self.messages[:5]])
+        self.assertFalse(older.json()['has_more'])
+
+        newer = self.client.get(self.url, {'after': self.messages[25].id})
+        self.assertEqual(self.ids(newer), [message.id for message in self.messages[26:]])
+
+        self.assertEqual(self.client.get(self.url, {'before': 'x'}).status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(username="reza", password="1234"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_incremental_sync(self):
+        first = self.client.get(self.url + 'sync/', {'limit': 5}).json()
+        self.assertEqual([m['id'] for m in first['messages']], [message.id for message in self.messages[25:]])
+        token = first['sync_token']
+
+        # بدون تغییر: پاسخ خالی
+        unchanged = self.client.get(self.url + 'sync/', {'since': token}).json()
+        self.assertEqual((unchanged['messages'], unchanged['deleted']), ([], []))
+
+        edited, removed = self.messages[2], self.messages[28]
+        self.client.put(f'/api/messages/{edited.id}/update/', {'content': 'edited'}, format='json')
+        self.client.delete(f'/api/messages/{removed.id}/delete/')
+        new_ids = [
+            self.client.post(f'/api/conversations/{self.conversation.id}/send/', {'content': f'new {i}'},
+                             format='json').json()['message']['id']
+            for i in range(3)
+        ]
+
+        delta = self.client.get(self.url + 'sync/', {'since': token, 'limit': 2}).json()
+        self.assertEqual([m['id'] for m in delta['messages']], [edited.id] + new_ids[:2])
+        self.assertEqual(delta['messages'][0]['content'], 'edited')
+        self.assertIsNotNone(delta['messages'][0]['edited_at'])
+        self.assertEqual(delta['deleted'], [removed.id])
+        self.assertTrue(delta['has_more'])
+
+        rest = self.client.get(self.url + 'sync/', {'since': delta['sync_token']}).json()
+        self.assertIn(new_ids[2], [m['id'] for m in rest['messages']])
+        self.assertFalse(rest['has_more'])
+
+    def test_catch_up_sends_each_row_once(self):
+        # کلاینتی که ۳۰ دقیقه آفلاین بوده؛ تغییرها بیرون از پنجره‌ی هم‌پوشانی‌اند
+        token = encode_sync_token(self.messages[-1].id, timezone.now() - datetime.timedelta(minutes=30))
+        changed_at = timezone.now() - datetime.timedelta(minutes=10)
+        Message.objects.filter(id__in=[message.id for message in self.messages[:12]]).update(
+            content='edited', edited_at=changed_at
+        )
+        backlog = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.ali, content=f'new {i}') for i in range(45)
+        ])
+        Message.objects.filter(id__in=[m.id for m in backlog]).update(created_at=changed_at)
+
+        sent, rounds, has_more = [], 0, True
+        while has_more:
+            delta = self.client.get(self.url + 'sync/', {'since': token, 'limit': 5}).json()
+            sent += [m['id'] for m in delta['messages']]
+            token, has_more = delta['sync_token'], delta['has_more']
+            rounds += 1
+
+        # ۱۲ ویرایش و ۴۵ پیام جدید، هرکدام یک بار
+        self.assertEqual(len(sent), 57)
+        self.assertEqual(set(sent), {message.id for message in self.messages[:12]} | {m.id for m in backlog})
+        self.assertEqual(rounds, 9)
+        unchanged = self.client.get(self.url + 'sync/', {'since': token}).json()
+        self.assertEqual(unchanged['messages'], [])
+
+    def test_tombstones_for_every_kind_of_delete(self):
+        token = self.client.get(self.url + 'sync/').json()['sync_token']
+        expected = [self.messages[0].id] + [message.id for message in self.messages[1::2]]
+        self.messages[0].delete()
+        # cascade: حذف حساب فرستنده پیام‌هایش را هم حذف می‌کند
+        self.ali.delete()
+
+        delta = self.client.get(self.url + 'sync/', {'since': token}).json()
+        self.assertEqual(delta['deleted'], expected)
+
+        self.conversation.delete()
+        self.assertFalse(MessageTombstone.objects.exists())
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get(self.url + 'sync/', {'since': 'garbage'}).status_code, 400)
+        old = encode_sync_token(self.messages[-1].id, timezone.now() - datetime.timedelta(days=365))
+        response = self.client.get(self.url + 'sync/', {'since': old})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['reset'])
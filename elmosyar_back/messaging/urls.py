@@ -7,6 +7,9 @@ urlpatterns = [
     path('conversations/', views.conversations_list, name='conversations_list'),
     path('conversations/<int:conversation_id>/', views.conversation_detail, name='conversation_detail'),
     path('conversations/<int:conversation_id>/send/', views.send_message, name='send_message'),
+    path('conversations/<int:conversation_id>/read/', views.mark_conversation_read, name='mark_conversation_read'),
+    path('conversations/<int:conversation_id>/messages/', views.conversation_messages, name='conversation_messages'),
+    path('conversations/<int:conversation_id>/messages/sync/', views.sync_messages, name='sync_messages'),
     path('conversations/start/<str:username>/', views.start_conversation, name='start_conversation'),
     path('messages/<int:message_id>/delete/', views.delete_message, name='delete_message'),
     path('messages/<int:message_id>/update/', views.update_message, name='update_message'),
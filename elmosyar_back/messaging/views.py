@@ -2,19 +2,27 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.core.paginator import Paginator
 from django.utils import timezone
 
-import settings
-from .models import Conversation, Message
-from .serializers import ConversationSerializer, MessageSerializer
+from core.pagination import paginate
+from .models import Conversation, ConversationState, Message
+from accounts.serializers import serializer_context, user_map_payload
+from .serializers import ConversationSerializer, MessageSerializer, MessageSyncSerializer
+from .realtime import participant_ids, publish_event, publish_message
+from .state import inbox, mark_read
+from .sync import MAX_LIMIT as SYNC_MAX_LIMIT, SyncTokenExpired, message_history, sync_changes
+from uploads.files import UploadError, claim_uploads
+from uploads.models import Upload
 
 # جایگزین کردن لاگر قدیمی
 from log_manager.log_config import log_info, log_error, log_warning, log_audit
 
 MAX_MESSAGE_CONTENT_LENGTH = 2000
+MAX_MESSAGE_ATTACHMENT_SIZE = 10 * 1024 * 1024
+INBOX_ORDERING = ('-last_activity', '-id')
 
 
 # ════════════════════════════════════════════════════════════
@@ -24,19 +32,20 @@ MAX_MESSAGE_CONTENT_LENGTH = 2000
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def conversations_list(request):
-    """Get user's conversations"""
-    conversations = Conversation.objects.filter(participants=request.user).prefetch_related(
-        'participants', 'messages'
-    ).order_by('-updated_at')
+    """Get user's conversations (از جدول ConversationState، صفحه‌بندی شده)"""
+    states, pagination = paginate(request, inbox(request.user), ordering=INBOX_ORDERING)
     
-    serializer = ConversationSerializer(conversations, many=True, context={'request': request})
+    context = serializer_context(request)
+    serializer = ConversationSerializer(states, many=True, context=context)
     
-    log_info(f"User viewed conversations list ({len(conversations)} conversations)", request)
+    log_info(f"User viewed conversations list ({len(states)} conversations)", request)
     
     return Response({
         'success': True,
         'conversations': serializer.data,
-        'count': len(conversations)
+        'count': len(states),
+        'pagination': pagination,
+        **user_map_payload(context)
     }, status=status.HTTP_200_OK)
 
 
@@ -44,10 +53,9 @@ def conversations_list(request):
 @permission_classes([IsAuthenticated])
 def start_conversation(request, username):
     """Start a new conversation"""
+    other_user = get_object_or_404(get_user_model(), username=username)
     try:
         with transaction.atomic():
-            other_user = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
-            
             if other_user == request.user:
                 log_warning(f"User tried to start conversation with themselves", request)
                 return Response({
@@ -55,14 +63,10 @@ def start_conversation(request, username):
                     'message': 'Cannot start conversation with yourself'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check for existing conversation
-            conversation = Conversation.objects.filter(participants=request.user).filter(
-                participants=other_user
-            ).first()
+            # مکالمه‌ی موجود یا ساخت آن (یک جستجو روی ایندکس یکتای direct_key)
+            conversation, created = Conversation.objects.get_or_create_direct(request.user, other_user)
             
-            if not conversation:
-                conversation = Conversation.objects.create()
-                conversation.participants.add(request.user, other_user)
+            if created:
                 log_audit(f"User started new conversation with {username}", request, {
                     'other_user_id': other_user.id,
                     'conversation_id': conversation.id
@@ -72,7 +76,8 @@ def start_conversation(request, username):
                     'conversation_id': conversation.id
                 })
             
-            serializer = ConversationSerializer(conversation, context={'request': request})
+            state = inbox(request.user).get(conversation=conversation)
+            serializer = ConversationSerializer(state, context={'request': request})
             
             return Response({
                 'success': True,
@@ -91,44 +96,155 @@ def start_conversation(request, username):
 @permission_classes([IsAuthenticated])
 def conversation_detail(request, conversation_id):
     """Get conversation messages with pagination"""
-    conversation = get_object_or_404(
-        Conversation.objects.prefetch_related('participants', 'messages'),
-        id=conversation_id, 
-        participants=request.user
-    )
-    
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 50)), 100)
-    
-    # Mark messages as read
-    unread_count = conversation.messages.filter(is_read=False).exclude(sender=request.user).count()
-    conversation.messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
+    state = get_object_or_404(inbox(request.user), conversation_id=conversation_id)
+    conversation = state.conversation
     
-    messages = conversation.messages.all().order_by('-created_at')
-    paginator = Paginator(messages, per_page)
+    # Mark messages as read (فقط جلو بردن watermark خود کاربر)
+    unread_count = mark_read(state)
+    if unread_count:
+        publish_read_receipt(state)
     
-    try:
-        messages_page = paginator.page(page)
-    except:
-        messages_page = paginator.page(1)
+    messages = conversation.messages.select_related('sender')
+    messages_page, pagination = paginate(request, messages, default_per_page=50)
     
-    log_info(f"User viewed conversation {conversation_id} page {page}, marked {unread_count} messages as read", request)
+    log_info(f"User viewed conversation {conversation_id}, marked {unread_count} messages as read", request, {
+        'pagination': pagination
+    })
     
-    conversation_serializer = ConversationSerializer(conversation, context={'request': request})
-    message_serializer = MessageSerializer(messages_page, many=True, context={'request': request})
+    context = serializer_context(request)
+    conversation_serializer = ConversationSerializer(state, context=context)
+    message_serializer = MessageSerializer(messages_page, many=True, context=context)
     
     return Response({
         'success': True,
         'conversation': conversation_serializer.data,
         'messages': message_serializer.data,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': messages_page.has_next(),
-            'has_previous': messages_page.has_previous(),
-        }
+        'pagination': pagination,
+        **user_map_payload(context)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_conversation_read(request, conversation_id):
+    """
+    خوانده شدن مکالمه تا message_id (یا تا آخرین پیام) بدون گرفتن دوباره‌ی پیام‌ها
+    برای کلاینت‌هایی که پیام‌ها را از WebSocket گرفته‌اند
+    """
+    state = get_object_or_404(
+        ConversationState.objects.select_related('conversation'), conversation_id=conversation_id, user=request.user
+    )
+    message_id = request.data.get('message_id')
+    try:
+        message_id = int(message_id) if message_id not in (None, '') else None
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'message': 'Invalid message_id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        marked = mark_read(state, message_id)
+        if marked:
+            publish_read_receipt(state)
+    except Exception as e:
+        log_error(f"Mark conversation read failed: {str(e)}", request, {'conversation_id': conversation_id})
+        return Response({
+            'success': False,
+            'message': 'Failed to mark conversation as read'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'success': True,
+        'last_read_message_id': state.last_read_message_id,
+        'unread_count': state.unread_count,
+        'marked': marked
+    }, status=status.HTTP_200_OK)
+
+
+def publish_read_receipt(state):
+    """رسید خواندن برای بقیه‌ی شرکت‌کنندگان (WebSocket)؛ کلاینت id پیام‌ها را با watermark مقایسه می‌کند"""
+    publish_event(participant_ids(state.conversation), 'conversation.read', {
+        'conversation_id': state.conversation_id,
+        'reader_id': state.user_id,
+        'last_read_message_id': state.last_read_message_id,
+        'read_at': timezone.now().isoformat(),
+    })
+
+
+def _limit_param(request, default):
+    """پارامتر limit (حداکثر MAX_LIMIT)؛ برای مقدار نامعتبر ValueError"""
+    limit = int(request.GET.get('limit', default))
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return min(limit, SYNC_MAX_LIMIT)
+
+
+def _messages_payload(request, messages):
+    """پیام‌ها با sender فشرده (فقط id) و users یک بار در سطح بالا"""
+    context = {'request': request, 'user_map': {}}
+    return {
+        'messages': MessageSyncSerializer(messages, many=True, context=context).data,
+        'users': context['user_map'],
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def conversation_messages(request, conversation_id):
+    """
+    تاریخچه‌ی پیام‌ها بر اساس id: ?before=<id> پیام‌های قدیمی‌تر، ?after=<id> جدیدتر، بدون هر دو آخرین پیام‌ها
+    بدون COUNT و بدون سریالایز دوباره‌ی خود مکالمه؛ مکالمه را خوانده شده علامت نمی‌زند (conversations/<id>/read/)
+    """
+    get_object_or_404(ConversationState, conversation_id=conversation_id, user=request.user)
+    try:
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        after = int(request.GET['after']) if request.GET.get('after') else None
+        limit = _limit_param(request, 50)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Invalid before/after/limit parameters'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    messages, has_more = message_history(conversation_id, before=before, after=after, limit=limit)
+    return Response({
+        'success': True,
+        **_messages_payload(request, messages),
+        'has_more': has_more
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_messages(request, conversation_id):
+    """
+    همگام‌سازی تدریجی: ?since=<sync_token> فقط پیام‌های جدید، ویرایش شده و id حذف شده‌ها از sync قبلی
+    بدون since: آخرین پیام‌ها و اولین توکن. با has_more=true باید فوراً با توکن جدید دوباره صدا زده شود.
+    410: توکن قدیمی‌تر از نگهداری tombstoneهاست و کلاینت باید از اول بارگذاری کند.
+    """
+    get_object_or_404(ConversationState, conversation_id=conversation_id, user=request.user)
+    try:
+        limit = _limit_param(request, 100)
+        changes = sync_changes(conversation_id, request.GET.get('since') or None, limit=limit)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Invalid sync token or limit'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except SyncTokenExpired:
+        return Response({
+            'success': False,
+            'message': 'Sync token expired, reload the conversation',
+            'reset': True
+        }, status=status.HTTP_410_GONE)
+
+    return Response({
+        'success': True,
+        **_messages_payload(request, changes['messages']),
+        'deleted': changes['deleted'],
+        'has_more': changes['has_more'],
+        'sync_token': changes['sync_token']
     }, status=status.HTTP_200_OK)
 
 
@@ -143,6 +259,31 @@ def send_message(request, conversation_id):
             content = request.data.get('content', '').strip()
             image = request.FILES.get('image')
             file = request.FILES.get('file')
+            upload_id = request.data.get('upload_id')
+
+            if upload_id and not image and not file:
+                # پیوست آپلود شده با /api/uploads/ (تصویر در image، بقیه در file)
+                try:
+                    attachment = claim_uploads(request.user, [upload_id], Upload.PURPOSE_MESSAGE,
+                                               max_size=MAX_MESSAGE_ATTACHMENT_SIZE)[0]
+                except UploadError as e:
+                    log_warning(f"Message with invalid upload: {str(e)}", request, {'upload_id': upload_id})
+                    return Response({
+                        'success': False,
+                        'message': str(e)
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                if (attachment.content_type or '').startswith('image/'):
+                    image = attachment
+                else:
+                    file = attachment
+
+            for attachment in (image, file):
+                if attachment and attachment.size > MAX_MESSAGE_ATTACHMENT_SIZE:
+                    log_warning(f"Message attachment too large: {attachment.size} bytes", request)
+                    return Response({
+                        'success': False,
+                        'message': f'Attachment is too large (max {MAX_MESSAGE_ATTACHMENT_SIZE // (1024 * 1024)}MB)'
+                    }, status=status.HTTP_400_BAD_REQUEST)
             
             if not content and not image and not file:
                 log_warning("Attempt to send empty message", request)
@@ -169,6 +310,7 @@ def send_message(request, conversation_id):
             # Update conversation time
             conversation.updated_at = timezone.now()
             conversation.save()
+            publish_message('message.created', message, participant_ids(conversation))
             
             # لاگ پیام ارسالی (محتوا را کوتاه می‌کنیم)
             truncated_content = content[:100] + "..." if len(content) > 100 else content
@@ -219,6 +361,10 @@ def delete_message(request, message_id):
             
             conversation_id = message.conversation.id
             message_content = message.content[:50] if message.content else "No content"
+            publish_event(participant_ids(message.conversation), 'message.deleted', {
+                'id': message_id,
+                'conversation_id': conversation_id,
+            })
             message.delete()
             
             log_audit(f"User deleted message from conversation {conversation_id}", request, {
@@ -275,7 +421,9 @@ def update_message(request, message_id):
             
             old_content = message.content
             message.content = content
+            message.edited_at = timezone.now()
             message.save()
+            publish_message('message.updated', message, participant_ids(message.conversation))
             
             log_audit(f"User updated message {message_id}", request, {
                 'message_id': message_id,
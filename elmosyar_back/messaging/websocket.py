@@ -0,0 +1,113 @@
+"""
+WebSocket پیام‌رسانی روی همان ASGI application (asgi.py)
+
+اتصال: ws://host/ws/messaging/?token=<access token>
+(یا هدر Authorization: Bearer <token> برای کلاینت‌های غیر مرورگر)
+
+رویدادهای سرور (هر فریم یک JSON):
+    {"type": "ready", "data": {"user_id": 7}}
+    {"type": "message.created" | "message.updated", "data": <MessageSerializer + conversation_id>}
+    {"type": "message.deleted", "data": {"id": ..., "conversation_id": ...}}
+    {"type": "conversation.read", "data": {"conversation_id": ..., "reader_id": ..., "last_read_message_id": ..., "read_at": ...}}
+کلاینت می‌تواند {"type": "ping"} بفرستد و {"type": "pong"} بگیرد.
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from core import fastjson
+from log_manager.log_config import log_warning
+from .realtime import CLOSE, OVERFLOW, Connection, get_broker
+
+
+WS_PATH = '/ws/messaging/'
+
+# کدهای بستن اتصال (بازه‌ی 4000-4999 مخصوص برنامه است)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+CLOSE_TOO_SLOW = 4408
+
+
+def _raw_token(scope):
+    token = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    if token:
+        return token[0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    return None
+
+
+def authenticate(scope):
+    """کاربر صاحب access token اتصال؛ None اگر توکن نباشد یا معتبر نباشد"""
+    raw_token = _raw_token(scope)
+    if not raw_token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _event(event_type, data=None):
+    return {'type': 'websocket.send', 'text': fastjson.dumps({'type': event_type, 'data': data})}
+
+
+async def _read_client(receive, send, connection):
+    """خواندن فریم‌های کلاینت تا قطع اتصال (فقط ping)"""
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            connection.close()
+            return
+        if message['type'] != 'websocket.receive' or not message.get('text'):
+            continue
+        try:
+            payload = fastjson.loads(message['text'])
+        except (fastjson.JSONDecodeError, ValueError):
+            continue
+        if isinstance(payload, dict) and payload.get('type') == 'ping':
+            await send(_event('pong'))
+
+
+async def websocket_application(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if scope['path'].rstrip('/') != WS_PATH.rstrip('/'):
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    user = await sync_to_async(authenticate)(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+    connection = Connection(user.id)
+    broker = get_broker()
+    broker.subscribe(connection)
+    reader = asyncio.ensure_future(_read_client(receive, send, connection))
+    try:
+        await send(_event('ready', {'user_id': user.id}))
+        while True:
+            item = await connection.get()
+            if item is CLOSE:
+                break
+            if item is OVERFLOW:
+                log_warning(f"Realtime connection of user {user.id} closed: event queue full", None, {
+                    'user_id': user.id,
+                })
+                await send({'type': 'websocket.close', 'code': CLOSE_TOO_SLOW})
+                break
+            await send({'type': 'websocket.send', 'text': item})
+    finally:
+        broker.unsubscribe(connection)
+        reader.cancel()
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0002_comment_counters'),
+        ('notifications', '0001_initial'),
+        ('posts', '0006_timeline_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at', 'id'], name='notificatio_recipie_306fd1_idx'),
+        ),
+    ]
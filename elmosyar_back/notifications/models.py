@@ -27,6 +27,7 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'is_read', 'created_at']),
+            models.Index(fields=['recipient', 'created_at', 'id']),  # صفحه‌بندی cursor
         ]
         db_table = 'notification'
 
@@ -0,0 +1,24 @@
+from posts.rendering import UserRefs, datetime_renderer
+
+
+def render_notifications(notifications, context):
+    """
+    معادل سریع NotificationSerializer(notifications, many=True, context=context).data
+    خروجی JSON با NotificationSerializer یکسان است؛ sender باید select_related شده باشد
+    """
+    render_datetime = datetime_renderer()
+    user_ref = UserRefs(context)
+    return [
+        {
+            'id': notification.id,
+            'sender': notification.sender_id,
+            'sender_info': user_ref(notification.sender),
+            'notif_type': notification.notif_type,
+            'post': notification.post_id,
+            'comment': notification.comment_id,
+            'message': notification.message,
+            'is_read': notification.is_read,
+            'created_at': render_datetime(notification.created_at),
+        }
+        for notification in notifications
+    ]
@@ -1,10 +1,10 @@
 from rest_framework import serializers
-from accounts.serializers import UserSerializer
+from accounts.serializers import CompactUserSerializer
 from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
-    sender_info = UserSerializer(source='sender', read_only=True)
+    sender_info = CompactUserSerializer(source='sender', read_only=True)
 
     class Meta:
         model = Notification
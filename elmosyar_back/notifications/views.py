@@ -2,10 +2,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from django.core.paginator import Paginator
 
+from core.pagination import paginate
 from .models import Notification
-from .serializers import NotificationSerializer
+from accounts.serializers import serializer_context, user_map_payload
+from .rendering import render_notifications
 
 # جایگزین کردن لاگر قدیمی
 from log_manager.log_config import log_info, log_error, log_warning
@@ -18,36 +19,24 @@ from log_manager.log_config import log_info, log_error, log_warning
 @permission_classes([IsAuthenticated])
 def notifications_list(request):
     """Get user notifications with pagination"""
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 20)), 100)
-    
     notifications = Notification.objects.filter(
         recipient=request.user
-    ).select_related('sender', 'post', 'comment').order_by('-created_at')
+    ).select_related('sender', 'post', 'comment')
     
-    paginator = Paginator(notifications, per_page)
-    try:
-        notifications_page = paginator.page(page)
-    except:
-        notifications_page = paginator.page(1)
+    notifications_page, pagination = paginate(request, notifications)
     
-    serializer = NotificationSerializer(notifications_page, many=True, context={'request': request})
+    context = serializer_context(request)
+    data = render_notifications(notifications_page, context)
     
     # لاگ کردن دسترسی
-    log_info(f"User viewed notifications page {page}", request)
+    log_info(f"User viewed notifications", request, {'pagination': pagination})
     
     return Response({
         'success': True,
-        'notifications': serializer.data,
+        'notifications': data,
         'unread_count': Notification.objects.filter(recipient=request.user, is_read=False).count(),
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': notifications_page.has_next(),
-            'has_previous': notifications_page.has_previous(),
-        }
+        'pagination': pagination,
+        **user_map_payload(context)
     }, status=status.HTTP_200_OK)
 
 
@@ -0,0 +1,172 @@
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from log_manager.log_config import log_error, log_info
+from social.models import UserFollow
+from .models import Post, TimelineEntry
+
+
+# نویسنده‌هایی با دنبال‌کننده‌ی بیشتر از این مقدار fan-out-on-write نمی‌شوند
+FANOUT_FOLLOWER_LIMIT = 5000
+FANOUT_BATCH_SIZE = 1000
+# تعداد پست‌های اخیری که بعد از فالو کردن به تایم‌لاین اضافه می‌شوند
+FOLLOW_BACKFILL_LIMIT = 100
+# فید فقط از جدیدترین ردیف‌های تایم‌لاین ساخته می‌شود
+TIMELINE_WINDOW = 800
+
+
+def is_feed_post(post):
+    """فقط پست‌های اصلی و ریپست‌ها وارد فید می‌شوند (نه ریپلای‌ها)"""
+    return post.parent_id is None
+
+
+def uses_fanout_on_write(author):
+    return author.followers_count <= FANOUT_FOLLOWER_LIMIT
+
+
+def fanout_post(post, batch_size=FANOUT_BATCH_SIZE):
+    """
+    نوشتن پست در تایم‌لاین همه‌ی دنبال‌کننده‌ها
+    خروجی: تعداد ردیف‌های ساخته شده (برای نویسنده‌های پرمخاطب 0)
+    """
+    if not is_feed_post(post) or not uses_fanout_on_write(post.author):
+        return 0
+
+    follower_ids = (
+        UserFollow.objects
+        .filter(following_id=post.author_id)
+        .values_list('follower_id', flat=True)
+        .order_by()
+    )
+    total = 0
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(TimelineEntry(
+            user_id=follower_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            created_at=post.created_at,
+        ))
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+class FanoutWorker:
+    """
+    thread پس‌زمینه‌ی داخل پروسه برای fan-out پست‌های تازه، تا زمان ساخت پست به تعداد دنبال‌کننده‌ها بستگی نداشته باشد
+    صف فقط id پست نگه می‌دارد؛ اگر پروسه وسط کار بسته شود یا صف پر باشد، دستور backfill_timelines
+    تایم‌لاین‌ها را دوباره از روی فالوها و پست‌ها می‌سازد.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, post_id):
+        self._start()
+        try:
+            self.queue.put_nowait(post_id)
+        except queue.Full:
+            log_info(f"Fanout worker queue full, post {post_id} left for backfill_timelines", None)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='fanout-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            post_id = self.queue.get()
+            try:
+                fanout_post_id(post_id)
+            except Exception as e:
+                log_error(f"Fanout worker error for post {post_id}: {str(e)}", None)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+worker = FanoutWorker()
+
+
+def fanout_post_id(post_id):
+    """fan-out پستی که ممکن است تا اجرای worker حذف شده باشد"""
+    post = Post.objects.select_related('author').filter(id=post_id).first()
+    return fanout_post(post) if post is not None else 0
+
+
+def schedule_fanout(post):
+    """
+    fan-out پست بعد از commit تراکنش ساخت آن
+    (FEED_FANOUT_IN_PROCESS=False: همان لحظه‌ی commit و در همان thread، بدون worker)
+    """
+    if not is_feed_post(post):
+        return
+    post_id = post.id
+    if getattr(settings, 'FEED_FANOUT_IN_PROCESS', True):
+        transaction.on_commit(lambda: worker.submit(post_id))
+    else:
+        transaction.on_commit(lambda: fanout_post_id(post_id))
+
+
+def backfill_timeline(user, authors=None, limit=FOLLOW_BACKFILL_LIMIT):
+    """
+    اضافه کردن پست‌های اخیر نویسنده‌های دنبال شده به تایم‌لاین یک کاربر
+    authors=None یعنی همه‌ی دنبال‌شده‌های کاربر (دستور backfill_timelines)
+    """
+    if authors is None:
+        authors = UserFollow.objects.filter(follower=user).values('following_id')
+
+    posts = (
+        Post.objects
+        .filter(author__in=authors, parent=None, author__followers_count__lte=FANOUT_FOLLOWER_LIMIT)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'author_id', 'created_at')[:limit]
+    )
+    entries = [
+        TimelineEntry(user_id=user.id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in posts
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def remove_author_from_timeline(user_id, author_id):
+    """بعد از آنفالو، پست‌های آن نویسنده از تایم‌لاین کاربر حذف می‌شوند"""
+    return TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()[0]
+
+
+def home_feed_queryset(user):
+    """
+    فید خانه‌ی کاربر:
+    پست‌های تایم‌لاین (fan-out-on-write) + پست‌های نویسنده‌های پرمخاطبی که دنبال می‌کند
+    (fan-out-on-read) + پست‌های خود کاربر، همه در یک کوئری
+    """
+    timeline = (
+        TimelineEntry.objects
+        .filter(user=user)
+        .order_by('-created_at', '-post_id')
+        .values('post_id')[:TIMELINE_WINDOW]
+    )
+    large_followees = UserFollow.objects.filter(
+        follower=user,
+        following__followers_count__gt=FANOUT_FOLLOWER_LIMIT,
+    ).values('following_id')
+
+    return Post.objects.filter(
+        Q(id__in=timeline) |
+        Q(author__in=large_followees, parent=None) |
+        Q(author=user, parent=None)
+    )
@@ -0,0 +1,157 @@
+import copy
+import json
+import re
+import threading
+
+
+FIELD_TYPES = ('string', 'number')
+
+
+class FormatField:
+    """
+    یک کلید تعریف شده در فایل فرمت دسته‌بندی
+
+    فرمت قدیمی:  {"price": "^[0-9]+$"}
+    فرمت نوع‌دار: {"price": {"pattern": "^[0-9]+$", "type": "number"}}
+    """
+    __slots__ = ('key', 'pattern', 'type', 'regex')
+
+    def __init__(self, key, pattern, type='string'):
+        self.key = key
+        self.pattern = pattern
+        self.type = type
+        self.regex = re.compile(pattern)
+
+    @property
+    def is_number(self):
+        return self.type == 'number'
+
+    def matches(self, value):
+        """معادل re.match(pattern, str(value)) با الگوی از پیش کامپایل شده"""
+        return self.regex.match(str(value)) is not None
+
+
+def parse_format(format_data):
+    """تبدیل محتوای JSON فایل فرمت به دیکشنری {key: FormatField}"""
+    if not isinstance(format_data, dict):
+        raise ValueError('Format must be a JSON object')
+
+    fields = {}
+    for key, spec in format_data.items():
+        if isinstance(spec, dict):
+            pattern = spec.get('pattern', '')
+            field_type = spec.get('type', 'string')
+        else:
+            pattern = spec
+            field_type = 'string'
+
+        if not isinstance(pattern, str):
+            raise ValueError(f'Pattern of "{key}" must be a string')
+        if field_type not in FIELD_TYPES:
+            raise ValueError(f'Type of "{key}" must be one of: {", ".join(FIELD_TYPES)}')
+
+        try:
+            fields[key] = FormatField(key, pattern, field_type)
+        except re.error as e:
+            raise ValueError(f'Pattern of "{key}" is not a valid regex: {e}')
+    return fields
+
+
+def to_number(value):
+    """تبدیل مقدار attribute به عدد (در صورت امکان)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or number in (float('inf'), float('-inf')):
+        return None
+    return number
+
+
+# ════════════════════════════════════════════════════════════
+# 🗃️ Format Registry
+# ════════════════════════════════════════════════════════════
+
+class CompiledFormat:
+    """فرمت پارس شده‌ی یک دسته‌بندی به همراه نسخه‌ی آن (id, updated_at)"""
+    __slots__ = ('category', 'version', 'data', 'fields')
+
+    def __init__(self, category, version, data, fields):
+        self.category = category
+        self.version = version
+        self.data = data
+        self.fields = fields
+
+    @property
+    def updated_at(self):
+        return self.version[1]
+
+
+class FormatRegistry:
+    """
+    کش درون پروسه‌ای فرمت دسته‌بندی‌ها
+
+    هر درخواست فقط (id, format_file, updated_at) را با یک کوئری سبک می‌خواند؛
+    فایل JSON و re.compile فقط وقتی اجرا می‌شوند که نسخه تغییر کرده باشد.
+    چون نسخه از دیتابیس خوانده می‌شود، آپلود یا حذف فرمت در یک worker
+    در بقیه‌ی workerها هم در درخواست بعدی دیده می‌شود.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, category):
+        """CompiledFormat یک دسته‌بندی یا None اگر فرمتی ثبت نشده باشد"""
+        from .models import CategoryFormat
+
+        row = (
+            CategoryFormat.objects
+            .filter(category=category)
+            .values_list('id', 'format_file', 'updated_at')
+            .first()
+        )
+        if not row or not row[1]:
+            self.invalidate(category)
+            return None
+
+        format_id, file_name, updated_at = row
+        version = (format_id, updated_at)
+        entry = self._entries.get(category)
+        if entry is not None and entry.version == version:
+            return entry
+
+        data = self._read(CategoryFormat._meta.get_field('format_file').storage, file_name)
+        entry = CompiledFormat(category, version, data, parse_format(data))
+        with self._lock:
+            current = self._entries.get(category)
+            # نسخه‌ی قدیمی‌تر نباید جایگزین نسخه‌ی جدیدتری شود که worker thread دیگری گذاشته
+            if current is None or current.version[1] <= updated_at:
+                self._entries[category] = entry
+        return entry
+
+    def fields(self, category):
+        entry = self.get(category)
+        return entry.fields if entry else None
+
+    def data(self, category):
+        """محتوای خام فایل فرمت (کپی، تا تغییر آن کش را خراب نکند)"""
+        entry = self.get(category)
+        return copy.deepcopy(entry.data) if entry else None
+
+    def invalidate(self, category=None):
+        with self._lock:
+            if category is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(category, None)
+
+    @staticmethod
+    def _read(storage, file_name):
+        with storage.open(file_name, 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+
+format_registry = FormatRegistry()
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import PostMedia
+
+
+METADATA_FIELDS = ['file_size', 'mime_type', 'width', 'height', 'duration', 'checksum']
+
+
+class Command(BaseCommand):
+    help = 'Record size, MIME type, dimensions, duration and checksum for PostMedia rows uploaded before these columns existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Rows updated per bulk_update'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recompute metadata for every row, not only rows without file_size'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        media = PostMedia.objects.order_by('id')
+        if not options['force']:
+            media = media.filter(file_size__isnull=True)
+
+        updated = missing = 0
+        batch = []
+        last_id = 0
+        while True:
+            # پیمایش بر اساس id تا ردیف‌های به‌روز شده (که دیگر در فیلتر نیستند) صفحه‌ها را جابه‌جا نکنند
+            rows = list(media.filter(id__gt=last_id)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for item in rows:
+                if not item.file or not item.file.storage.exists(item.file.name):
+                    missing += 1
+                    self.stderr.write(f"postmedia {item.id}: file '{item.file.name}' not found, skipped")
+                    continue
+                with item.file.open('rb'):
+                    item.fill_metadata()
+                batch.append(item)
+
+            if batch:
+                PostMedia.objects.bulk_update(batch, METADATA_FIELDS)
+                updated += len(batch)
+                batch = []
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} media row(s) updated, {missing} with missing files"
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from posts.feed import FOLLOW_BACKFILL_LIMIT, backfill_timeline
+
+
+class Command(BaseCommand):
+    help = 'Fill the materialized home timelines from existing follows and posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append',
+            help='Only backfill the given username (can be repeated)'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=FOLLOW_BACKFILL_LIMIT,
+            help=f'Most recent posts to keep per timeline (default: {FOLLOW_BACKFILL_LIMIT})'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(following_count__gt=0).only('id').order_by('id')
+        if options['user']:
+            users = users.filter(username__in=options['user'])
+
+        total = 0
+        user_count = 0
+        for user in users.iterator(chunk_size=500):
+            total += backfill_timeline(user, limit=options['limit'])
+            user_count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} timeline entr(ies) written for {user_count} user(s)"))
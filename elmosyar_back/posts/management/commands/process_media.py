@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.models import PostMedia
+from posts.processing import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/medium WebP variants for pending PostMedia rows (run once, from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for pending media instead of exiting'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep between polls when nothing is pending (with --loop)'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Media processed per poll'
+        )
+        parser.add_argument(
+            '--retry', action='store_true',
+            help='Requeue failed rows and rows left in "processing" by a crashed worker'
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a "processing" row is considered abandoned (with --retry)'
+        )
+        parser.add_argument(
+            '--requeue-missing', action='store_true',
+            help='Queue images uploaded before variants existed'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry']:
+            # ردیف‌های processing که worker زنده هنوز رویشان کار می‌کند دست نمی‌خورند
+            stale = timezone.now() - timedelta(seconds=options['stale_after'])
+            count = PostMedia.objects.filter(
+                Q(processing_status=PostMedia.PROCESSING_FAILED)
+                | Q(processing_status=PostMedia.PROCESSING_RUNNING, claimed_at__lt=stale)
+                | Q(processing_status=PostMedia.PROCESSING_RUNNING, claimed_at__isnull=True)
+            ).update(processing_status=PostMedia.PROCESSING_PENDING)
+            self.stdout.write(f"{count} media row(s) requeued")
+        if options['requeue_missing']:
+            count = PostMedia.objects.filter(
+                media_type='image', processing_status=PostMedia.PROCESSING_READY, variants={}
+            ).update(processing_status=PostMedia.PROCESSING_PENDING)
+            self.stdout.write(f"{count} image(s) without variants queued")
+
+        total = 0
+        while True:
+            processed = process_pending(options['limit'])
+            total += processed
+            if processed:
+                self.stdout.write(f"{processed} media processed")
+            if not options['loop']:
+                break
+            close_old_connections()
+            if not processed:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} media processed"))
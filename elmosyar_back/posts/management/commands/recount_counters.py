@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from core.counters import count_subquery
+from posts.models import Post
+from interactions.models import Reaction, Comment
+from social.models import UserFollow
+
+
+def _counter_definitions():
+    """(گروه، مدل، ستون، عبارت شمارش واقعی) برای همه‌ی شمارنده‌های denormalize شده"""
+    User = get_user_model()
+    return [
+        ('posts', Post, 'likes_count', count_subquery(Reaction.objects.filter(reaction='like'), 'post')),
+        ('posts', Post, 'dislikes_count', count_subquery(Reaction.objects.filter(reaction='dislike'), 'post')),
+        ('posts', Post, 'comments_count', count_subquery(Comment.objects.all(), 'post')),
+        ('posts', Post, 'reposts_count', count_subquery(Post.objects.filter(is_repost=True), 'original_post')),
+        ('posts', Post, 'replies_count', count_subquery(Post.objects.all(), 'parent')),
+        ('comments', Comment, 'likes_count', count_subquery(Comment.likes.through.objects.all(), 'comment')),
+        ('comments', Comment, 'dislikes_count', count_subquery(Comment.dislikes.through.objects.all(), 'comment')),
+        ('comments', Comment, 'replies_count', count_subquery(Comment.objects.all(), 'parent')),
+        ('users', User, 'followers_count', count_subquery(UserFollow.objects.all(), 'following')),
+        ('users', User, 'following_count', count_subquery(UserFollow.objects.all(), 'follower')),
+        ('users', User, 'posts_count', count_subquery(Post.objects.all(), 'author')),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized counter columns (posts, comments, users) and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', choices=['posts', 'comments', 'users'], action='append',
+            help='Limit the recount to one group (can be repeated)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many rows have drifted'
+        )
+
+    def handle(self, *args, **options):
+        groups = options['only']
+        dry_run = options['dry_run']
+        total = 0
+
+        for group, model, field, actual in _counter_definitions():
+            if groups and group not in groups:
+                continue
+
+            with transaction.atomic():
+                # فقط ردیف‌هایی که با مقدار واقعی اختلاف دارند، در یک UPDATE گروهی اصلاح می‌شوند
+                drifted = model.objects.annotate(actual_count=actual).exclude(**{field: F('actual_count')})
+                if dry_run:
+                    changed = drifted.count()
+                else:
+                    changed = model.objects.filter(pk__in=drifted.values('pk')).update(**{field: actual})
+
+            total += changed
+            self.stdout.write(f"{model._meta.db_table}.{field}: {changed} row(s) {'drifted' if dry_run else 'fixed'}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} counter value(s) {'out of sync' if dry_run else 'reconciled'}"
+        ))
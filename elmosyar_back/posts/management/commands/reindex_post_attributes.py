@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import CategoryFormat, PostAttribute
+from posts.search import reindex_category
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the post_attribute search index from Post.attributes and the category formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category', action='append',
+            help='Only reindex the given category (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        categories = options['category'] or list(
+            CategoryFormat.objects.order_by('category').values_list('category', flat=True)
+        )
+
+        if not options['category']:
+            # ردیف‌های دسته‌بندی‌هایی که دیگر فرمت ندارند
+            PostAttribute.objects.exclude(category__in=categories).delete()
+
+        total = 0
+        for category in categories:
+            count = reindex_category(category)
+            total += count
+            self.stdout.write(f"{category}: {count} attribute row(s) indexed")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} attribute row(s) indexed in {len(categories)} categories"))
@@ -0,0 +1,124 @@
+import hashlib
+import mimetypes
+import struct
+import wave
+
+from PIL import Image, UnidentifiedImageError
+
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# باکس‌های MP4/MOV که mvhd داخلشان است
+_MP4_CONTAINERS = {b'moov'}
+
+
+def extract_media_metadata(file, media_type, content_type=None, checksum=None):
+    """
+    متادیتای یک فایل مدیا با یک بار خواندن: حجم، MIME، ابعاد تصویر، مدت ویدیو/صوت و sha256
+
+    file هر شیء فایل جنگو است (UploadedFile یا FieldFile باز شده)؛ در پایان به ابتدای فایل برمی‌گردد.
+    اگر checksum از قبل معلوم باشد (آپلود تکه‌تکه) فایل برای هش دوباره خوانده نمی‌شود.
+    مقدارهایی که قابل تشخیص نیستند None می‌مانند.
+    """
+    if checksum:
+        size = file.size
+    else:
+        digest = hashlib.sha256()
+        size = 0
+        file.seek(0)
+        for chunk in file.chunks(READ_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        checksum = digest.hexdigest()
+
+    metadata = {
+        'file_size': size,
+        'mime_type': content_type or mimetypes.guess_type(file.name or '')[0] or '',
+        'checksum': checksum,
+        'width': None,
+        'height': None,
+        'duration': None,
+    }
+
+    try:
+        if media_type == 'image':
+            metadata['width'], metadata['height'], image_mime = _image_info(file)
+            metadata['mime_type'] = image_mime or metadata['mime_type']
+        elif media_type in ('video', 'audio'):
+            metadata['duration'] = _duration(file)
+    finally:
+        file.seek(0)
+    return metadata
+
+
+def _image_info(file):
+    """ابعاد و MIME تصویر؛ Pillow فقط هدر فایل را می‌خواند"""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            return image.width, image.height, Image.MIME.get(image.format)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None, None, None
+
+
+def _duration(file):
+    """مدت فایل (ثانیه) برای WAV و MP4/MOV/M4A؛ بقیه‌ی فرمت‌ها None"""
+    file.seek(0)
+    header = file.read(12)
+    file.seek(0)
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        try:
+            with wave.open(file) as audio:
+                return round(audio.getnframes() / audio.getframerate(), 3)
+        except (wave.Error, EOFError, ZeroDivisionError):
+            return None
+    if header[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide'):
+        return _mp4_duration(file)
+    return None
+
+
+def _mp4_duration(file):
+    """خواندن timescale و duration از باکس moov/mvhd بدون خواندن داده‌ی مدیا؛ فایل ناقص یا خراب None"""
+    try:
+        return _read_mvhd(file)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def _read_exact(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError('truncated MP4 box')
+    return data
+
+
+def _read_mvhd(file):
+    file.seek(0, 2)
+    end = file.tell()
+    position = 0
+    while position + 8 <= end:
+        file.seek(position)
+        size, box_type = struct.unpack('>I4s', _read_exact(file, 8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', _read_exact(file, 8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return None
+
+        if box_type in _MP4_CONTAINERS:
+            # وارد باکس می‌شویم و فرزندانش را پیمایش می‌کنیم
+            end = min(end, position + size)
+            position += header_size
+            continue
+        if box_type == b'mvhd':
+            version = _read_exact(file, 4)[0]
+            if version == 1:
+                timescale, duration = struct.unpack('>16xIQ', _read_exact(file, 28))
+            else:
+                timescale, duration = struct.unpack('>8xII', _read_exact(file, 16))
+            return round(duration / timescale, 3) if timescale else None
+        position += size
+    return None
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Reaction = apps.get_model('interactions', 'Reaction')
+    Comment = apps.get_model('interactions', 'Comment')
+    Post.objects.update(
+        likes_count=_count(Reaction.objects.filter(reaction='like'), 'post'),
+        dislikes_count=_count(Reaction.objects.filter(reaction='dislike'), 'post'),
+        comments_count=_count(Comment.objects.all(), 'post'),
+        reposts_count=_count(Post.objects.filter(is_repost=True), 'original_post'),
+        replies_count=_count(Post.objects.all(), 'parent'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0001_initial'),
+        ('posts', '0003_post_attributes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reposts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
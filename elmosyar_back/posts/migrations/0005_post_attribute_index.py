@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:05
+
+import json
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_attribute_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostAttribute = apps.get_model('posts', 'PostAttribute')
+    CategoryFormat = apps.get_model('posts', 'CategoryFormat')
+
+    for format_obj in CategoryFormat.objects.all():
+        try:
+            with format_obj.format_file.open('rb') as f:
+                format_data = json.loads(f.read().decode('utf-8'))
+        except Exception:
+            continue
+        if not isinstance(format_data, dict):
+            continue
+
+        rows = []
+        posts = Post.objects.filter(category=format_obj.category).only('id', 'category', 'attributes').order_by()
+        for post in posts.iterator(chunk_size=2000):
+            attributes = post.attributes if isinstance(post.attributes, dict) else {}
+            for key, pattern in format_data.items():
+                if key not in attributes or not isinstance(pattern, str):
+                    continue
+                value = str(attributes[key])
+                try:
+                    if not re.match(pattern, value):
+                        continue
+                except re.error:
+                    continue
+                rows.append(PostAttribute(post_id=post.id, category=post.category, key=key, value_str=value[:255]))
+            if len(rows) >= 2000:
+                PostAttribute.objects.bulk_create(rows)
+                rows = []
+        PostAttribute.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255)),
+                ('value_str', models.CharField(max_length=255)),
+                ('value_num', models.FloatField(blank=True, null=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_index', to='posts.post')),
+            ],
+            options={
+                'db_table': 'post_attribute',
+                'indexes': [models.Index(fields=['category', 'key', 'value_str'], name='post_attrib_categor_a0e3e2_idx'), models.Index(fields=['category', 'key', 'value_num'], name='post_attrib_categor_6a9c6e_idx')],
+            },
+        ),
+        migrations.RunPython(build_attribute_index, migrations.RunPython.noop),
+    ]
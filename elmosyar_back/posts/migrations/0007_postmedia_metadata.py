@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmedia',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='mime_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
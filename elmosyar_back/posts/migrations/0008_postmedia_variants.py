@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_postmedia_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmedia',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
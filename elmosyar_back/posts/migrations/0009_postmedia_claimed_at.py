@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_postmedia_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmedia',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
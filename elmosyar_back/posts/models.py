@@ -1,9 +1,41 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Subquery, Value
 from django.conf import settings
-import os
+from django.apps import apps
 
+from core.counters import CounterFieldsMixin
+from uploads.blobs import release
 
-class Post(models.Model):
+from .media import extract_media_metadata
+
+
+class PostQuerySet(models.QuerySet):
+
+    def with_viewer_state(self, user=None):
+        """
+        افزودن واکنش و وضعیت ذخیره‌ی کاربر جاری به صورت annotation
+        تا سریالایزر برای هر پست کوئری جداگانه نزند
+        """
+        Reaction = apps.get_model('interactions', 'Reaction')
+        SavedPost = self.model.saved_by.through
+
+        if user is not None and user.is_authenticated:
+            viewer_reaction = Reaction.objects.filter(post=OuterRef('pk'), user=user).values('reaction')[:1]
+            return self.annotate(
+                viewer_reaction=Subquery(viewer_reaction),
+                viewer_saved=Exists(SavedPost.objects.filter(post=OuterRef('pk'), user=user)),
+            )
+        return self.annotate(
+            viewer_reaction=Value(None, output_field=models.CharField()),
+            viewer_saved=Value(False, output_field=models.BooleanField()),
+        )
+
+    def for_listing(self, user=None):
+        """کوئری‌ست مشترک همه‌ی endpointهای لیست و جزئیات پست"""
+        return self.select_related('author').prefetch_related('media', 'mentions').with_viewer_state(user)
+
+
+class Post(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField(max_length=5000)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='replies')
@@ -21,34 +53,57 @@ class Post(models.Model):
     # فیلد جدید برای ذخیره داده‌های JSON ساختاریافته
     attributes = models.JSONField(default=dict, blank=True)
 
+    # شمارنده‌های denormalize شده؛ توسط posts/signals.py و interactions/signals.py
+    # به صورت اتمیک به‌روز می‌شوند و با دستور recount_counters قابل بازسازی هستند
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    reposts_count = models.PositiveIntegerField(default=0)
+    replies_count = models.PositiveIntegerField(default=0)
+    counter_fields = ('likes_count', 'dislikes_count', 'comments_count', 'reposts_count', 'replies_count')
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['category', 'created_at']),
             models.Index(fields=['author', 'created_at']),
+            # پست‌های اصلی یک نویسنده (فید خانه و user_posts)
+            models.Index(fields=['author', 'parent', 'created_at'], name='post_author_parent_idx'),
         ]
         db_table = 'post'
 
     def __str__(self):
         return f"Post by {self.author} at {self.created_at}"[:50]
 
-    @property
-    def likes_count(self):
-        """تعداد لایک‌ها"""
-        return self.reactions.filter(reaction='like').count()
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
 
-    @property
-    def dislikes_count(self):
-        """تعداد دیس‌لایک‌ها"""
-        return self.reactions.filter(reaction='dislike').count()
 
-    @property
-    def comments_count(self):
-        """تعداد کامنت‌ها"""
-        return self.comments.count()
+class TimelineEntry(models.Model):
+    """
+    تایم‌لاین از پیش ساخته شده‌ی هر کاربر (fan-out-on-write)
+    پست‌های نویسنده‌هایی با دنبال‌کننده‌ی زیاد اینجا نوشته نمی‌شوند و
+    هنگام خواندن فید مستقیماً از جدول post خوانده می‌شوند (posts/feed.py)
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()  # همان created_at پست
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+    class Meta:
+        db_table = 'timeline_entry'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='timeline_entry_user_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of {self.user_id}"
 
 
 class PostMedia(models.Model):
@@ -58,6 +113,16 @@ class PostMedia(models.Model):
         ("audio", "Audio"),
         ("file", "File"),
     ]
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING_PENDING, "Pending"),
+        (PROCESSING_RUNNING, "Processing"),
+        (PROCESSING_READY, "Ready"),
+        (PROCESSING_FAILED, "Failed"),
+    ]
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='media')
     file = models.FileField(upload_to='posts/media/')
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES)
@@ -67,6 +132,22 @@ class PostMedia(models.Model):
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
 
+    # متادیتای فایل که هنگام آپلود ثبت می‌شود تا سریالایز کردن به دیسک سر نزند
+    # (ردیف‌های قدیمی: python manage.py backfill_media_metadata)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # ثانیه
+    checksum = models.CharField(max_length=64, blank=True)  # sha256
+
+    # نسخه‌های کوچک‌تر تصویر که worker بعد از آپلود می‌سازد (posts/processing.py):
+    # {"thumb": {"name", "width", "height", "size", "mime_type"}, "medium": {...}}
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, default=PROCESSING_READY)
+    variants = models.JSONField(default=dict, blank=True)
+    # زمان گرفتن ردیف توسط worker؛ process_media --retry فقط ردیف‌های processing قدیمی را برمی‌گرداند
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['order', 'created_at']
         db_table = 'postmedia'
@@ -74,12 +155,69 @@ class PostMedia(models.Model):
     def __str__(self):
         return f"Media for post {self.post_id} ({self.media_type})"
 
-    def delete(self, *args, **kwargs):
-        """حذف فایل فیزیکی هنگام حذف مدیا"""
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        # فایل تازه آپلود شده هنوز در حافظه/فایل موقت است؛ متادیتا همین‌جا و با یک بار خواندن ثبت می‌شود
+        if self.file and not self.file._committed and self.file_size is None:
+            upload = self.file.file
+            self.fill_metadata(getattr(upload, 'content_type', None), getattr(upload, 'checksum', None))
+            if self.media_type == 'image':
+                self.processing_status = self.PROCESSING_PENDING
+        super().save(*args, **kwargs)
+
+    def fill_metadata(self, content_type=None, checksum=None):
+        """پر کردن فیلدهای متادیتا از روی فایل (آپلود جدید یا فایل ذخیره شده در storage)"""
+        for field, value in extract_media_metadata(self.file, self.media_type, content_type, checksum).items():
+            setattr(self, field, value)
+
+    def variant_urls(self):
+        """نسخه‌های آماده برای خروجی API (آدرس از روی نام ذخیره شده، بدون دسترسی به دیسک)"""
+        storage = self.file.storage
+        return {
+            name: {
+                'url': storage.url(variant['name']),
+                'width': variant['width'],
+                'height': variant['height'],
+                'mime_type': variant['mime_type'],
+            }
+            for name, variant in (self.variants or {}).items()
+        }
+
+    def variant_names(self):
+        return {variant['name'] for variant in (self.variants or {}).values()}
+
+    def release_variants(self):
+        """
+        کم کردن ارجاع نسخه‌ها؛ خود فایل اصلی با سیگنال‌های uploads.blobs شمرده می‌شود
+        (حذف فیزیکی blobهای بی‌ارجاع با gc_blobs)
+        """
+        release(*self.variant_names())
+
+
+# ════════════════════════════════════════════════════════════
+# 🔎 Post Attribute Index
+# ════════════════════════════════════════════════════════════
+
+class PostAttribute(models.Model):
+    """
+    جدول کمکی جستجو روی Post.attributes
+    برای هر کلید تعریف شده در فرمت دسته‌بندی یک ردیف نگه می‌دارد تا
+    شرط‌های برابری، پیشوند و بازه داخل دیتابیس و روی ایندکس اجرا شوند
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='attribute_index')
+    category = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    value_str = models.CharField(max_length=255)
+    value_num = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'post_attribute'
+        indexes = [
+            models.Index(fields=['category', 'key', 'value_str']),
+            models.Index(fields=['category', 'key', 'value_num']),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value_str} (post {self.post_id})"
 
 
 # ════════════════════════════════════════════════════════════
@@ -99,9 +237,3 @@ class CategoryFormat(models.Model):
     def __str__(self):
         return f"Format for {self.category}"
 
-    def delete(self, *args, **kwargs):
-        """حذف فایل فیزیکی هنگام حذف فرمت"""
-        if self.format_file:
-            if os.path.isfile(self.format_file.path):
-                os.remove(self.format_file.path)
-        super().delete(*args, **kwargs)
\ No newline at end of file
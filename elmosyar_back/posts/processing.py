@@ -0,0 +1,169 @@
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from log_manager.log_config import log_error, log_info
+from uploads.blobs import retain
+from .models import PostMedia
+
+
+# (نام، بیشترین ضلع به پیکسل)؛ به ترتیب کوچک به بزرگ
+VARIANTS = (
+    ('thumb', 320),
+    ('medium', 1080),
+)
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_MIME_TYPE = 'image/webp'
+VARIANT_QUALITY = 80
+VARIANT_DIR = 'posts/variants'
+
+
+def variant_name(media, name):
+    return f'{VARIANT_DIR}/{media.id}/{name}.{VARIANT_EXTENSION}'
+
+
+def build_variants(media):
+    """
+    ساخت نسخه‌های thumb / medium به صورت WebP برای یک تصویر
+    چرخش EXIF اعمال و خود EXIF حذف می‌شود (save بدون exif)؛ خروجی: دیکشنری variants
+    """
+    storage = media.file.storage
+    largest = VARIANTS[-1][1]
+    variants = {}
+
+    with media.file.open('rb'), Image.open(media.file) as source:
+        # برای JPEG دیکود مستقیم در اندازه‌ی کوچک‌تر (چند برابر سریع‌تر از دیکود کامل)
+        source.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        previous = None
+        for name, max_side in VARIANTS:
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side), Image.LANCZOS)
+            if previous is not None and variants[previous]['width'] == variant.width:
+                # تصویر اصلی کوچک‌تر از این اندازه است؛ همان فایل قبلی کافی است
+                variants[name] = variants[previous]
+                continue
+
+            buffer = BytesIO()
+            variant.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+            saved_name = storage.save(variant_name(media, name), ContentFile(buffer.getvalue()))
+            variants[name] = {
+                'name': saved_name,
+                'width': variant.width,
+                'height': variant.height,
+                'size': buffer.tell(),
+                'mime_type': VARIANT_MIME_TYPE,
+            }
+            previous = name
+    return variants
+
+
+def process_media(media):
+    """پردازش یک مدیا (در worker)؛ فقط تصاویر نسخه‌ی کوچک‌تر دارند"""
+    try:
+        if media.media_type == 'image' and media.file:
+            media.release_variants()
+            media.variants = {}
+            media.variants = build_variants(media)
+            retain(*media.variant_names())
+        media.processing_status = PostMedia.PROCESSING_READY
+    except Exception as e:
+        media.processing_status = PostMedia.PROCESSING_FAILED
+        log_error(f"Media processing failed for postmedia {media.id}: {str(e)}", None, {
+            'media_id': media.id,
+            'file': media.file.name,
+        })
+    updated = PostMedia.objects.filter(id=media.id).update(
+        processing_status=media.processing_status, variants=media.variants
+    )
+    if not updated:
+        # ردیف در این فاصله حذف شده؛ سیگنال حذف نسخه‌های تازه را نمی‌شناخت
+        media.release_variants()
+    return media
+
+
+def claim(media_id):
+    """گرفتن یک مدیا برای پردازش؛ UPDATE شرطی تا دو worker یک ردیف را با هم برندارند"""
+    claimed = PostMedia.objects.filter(
+        id=media_id, processing_status=PostMedia.PROCESSING_PENDING
+    ).update(processing_status=PostMedia.PROCESSING_RUNNING, claimed_at=timezone.now())
+    if not claimed:
+        return None
+    return PostMedia.objects.filter(id=media_id).first()
+
+
+def process_pending(limit=None):
+    """پردازش مدیاهای در انتظار (قدیمی‌ترها اول)؛ خروجی: تعداد مدیاهای پردازش شده"""
+    pending = PostMedia.objects.filter(processing_status=PostMedia.PROCESSING_PENDING).order_by('id')
+    processed = 0
+    for media_id in pending.values_list('id', flat=True)[:limit]:
+        media = claim(media_id)
+        if media is not None:
+            process_media(media)
+            processed += 1
+    return processed
+
+
+class MediaWorker:
+    """
+    thread پس‌زمینه‌ی داخل پروسه برای پردازش مدیاهای تازه آپلود شده
+    صف فقط id نگه می‌دارد؛ وضعیت واقعی در دیتابیس است، پس اگر پروسه وسط کار بسته شود
+    ردیف‌های pending با دستور process_media پردازش می‌شوند.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, media_ids):
+        self._start()
+        for media_id in media_ids:
+            try:
+                self.queue.put_nowait(media_id)
+            except queue.Full:
+                # می‌ماند برای process_media
+                log_info(f"Media worker queue full, postmedia {media_id} left pending", None)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='media-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            media_id = self.queue.get()
+            try:
+                media = claim(media_id)
+                if media is not None:
+                    process_media(media)
+            except Exception as e:
+                log_error(f"Media worker error for postmedia {media_id}: {str(e)}", None)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+worker = MediaWorker()
+
+
+def schedule_processing(media_ids):
+    """
+    بعد از commit تراکنش آپلود، مدیاها به worker داخل پروسه داده می‌شوند
+    (MEDIA_PROCESSING_IN_PROCESS=False: فقط دستور process_media آن‌ها را پردازش می‌کند)
+    """
+    media_ids = list(media_ids)
+    if media_ids and getattr(settings, 'MEDIA_PROCESSING_IN_PROCESS', True):
+        transaction.on_commit(lambda: worker.submit(media_ids))
@@ -0,0 +1,104 @@
+from django.utils import timezone
+from rest_framework import serializers
+
+from accounts.serializers import compact_user_ref
+from .serializers import PostSerializer
+
+
+_datetime_field = serializers.DateTimeField()
+
+
+def datetime_renderer():
+    """
+    همان خروجی DateTimeField در ModelSerializer (ISO 8601 با Z برای UTC)
+    با این تفاوت که timezone فعلی یک بار برای کل صفحه خوانده می‌شود نه برای هر مقدار
+    """
+    current_timezone = _datetime_field.default_timezone()
+    if current_timezone is None:
+        return _datetime_field.to_representation
+
+    def render(value):
+        if value is None or not timezone.is_aware(value):
+            return _datetime_field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return render
+
+
+class UserRefs:
+    """compact_user_ref با کش هر کاربر در طول یک صفحه (نویسنده‌ها و mentionهای تکراری)"""
+
+    def __init__(self, context):
+        self.user_map = context.get('user_map')
+        self._cache = {}
+
+    def __call__(self, user):
+        ref = self._cache.get(user.pk)
+        if ref is None:
+            ref = self._cache[user.pk] = compact_user_ref(user, self.user_map)
+        return ref
+
+
+def render_media(media):
+    """معادل PostMediaSerializer"""
+    file = media.file
+    return {
+        'id': media.id,
+        'url': file.url if file else '',
+        'media_type': media.media_type,
+        'caption': media.caption,
+        'order': media.order,
+        'file_size': media.file_size or 0,
+        'mime_type': media.mime_type,
+        'width': media.width,
+        'height': media.height,
+        'duration': media.duration,
+        'processing_status': media.processing_status,
+        'variants': media.variant_urls() if file else {},
+    }
+
+
+def render_posts(posts, context):
+    """
+    معادل سریع PostSerializer(posts, many=True, context=context).data برای لیست‌های فقط-خواندنی
+
+    بدون ساختن فیلدهای DRF برای هر شیء؛ خروجی JSON بایت به بایت با PostSerializer یکسان است
+    (posts/tests.py). هر فیلدی که به PostSerializer اضافه شود باید اینجا هم اضافه شود.
+    پست‌ها باید از for_listing() آمده باشند (author, media, mentions و وضعیت کاربر جاری).
+    """
+    render_datetime = datetime_renderer()
+    user_ref = UserRefs(context)
+    # متدهای وضعیت کاربر جاری همان متدهای PostSerializer هستند (با fallback برای پست‌های annotate نشده)
+    viewer_state = PostSerializer(context=context)
+    get_user_reaction = viewer_state.get_user_reaction
+    get_is_saved = viewer_state.get_is_saved
+
+    return [
+        {
+            'id': post.id,
+            'author': post.author_id,
+            'author_info': user_ref(post.author),
+            'content': post.content,
+            'created_at': render_datetime(post.created_at),
+            'updated_at': render_datetime(post.updated_at),
+            'tags': post.tags,
+            'mentions': [user_ref(user) for user in post.mentions.all()],
+            'media': [render_media(media) for media in post.media.all()],
+            'category': post.category,
+            'parent': post.parent_id,
+            'is_repost': post.is_repost,
+            'original_post': post.original_post_id,
+            'likes_count': post.likes_count,
+            'dislikes_count': post.dislikes_count,
+            'comments_count': post.comments_count,
+            'reposts_count': post.reposts_count,
+            'replies_count': post.replies_count,
+            'user_reaction': get_user_reaction(post),
+            'is_saved': get_is_saved(post),
+            'attributes': post.attributes,
+        }
+        for post in posts
+    ]
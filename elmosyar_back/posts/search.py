@@ -0,0 +1,196 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .formats import format_registry, to_number
+from .models import Post, PostAttribute
+
+
+MAX_INDEXED_VALUE_LENGTH = 255
+SEARCH_OPERATORS = ('eq', 'prefix', 'regex', 'gt', 'gte', 'lt', 'lte')
+RANGE_OPERATORS = ('gt', 'gte', 'lt', 'lte')
+
+_REGEX_META = set('.^$*+?{}[]\\|()')
+_QUANTIFIERS = set('*+?{')
+_PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def load_category_fields(category):
+    """فیلدهای فرمت یک دسته‌بندی یا None اگر فرمتی ثبت نشده باشد"""
+    return format_registry.fields(category)
+
+
+# ════════════════════════════════════════════════════════════
+# 🗂️ Indexing
+# ════════════════════════════════════════════════════════════
+
+def build_attribute_rows(post, fields):
+    """
+    ردیف‌های PostAttribute یک پست
+    فقط کلیدهای تعریف شده در فرمت که مقدارشان با الگوی فرمت می‌خواند ایندکس می‌شوند
+    """
+    attributes = post.attributes
+    if not post.category or not attributes or not isinstance(attributes, dict):
+        return []
+
+    rows = []
+    for key, field in fields.items():
+        if key not in attributes:
+            continue
+        value = str(attributes[key])
+        if not field.regex.match(value):
+            continue
+        rows.append(PostAttribute(
+            post_id=post.id,
+            category=post.category,
+            key=key,
+            value_str=value[:MAX_INDEXED_VALUE_LENGTH],
+            value_num=to_number(attributes[key]) if field.is_number else None,
+        ))
+    return rows
+
+
+def index_post_attributes(post, fields=None, replace=True):
+    """به‌روزرسانی ایندکس attributes یک پست بعد از ذخیره"""
+    if replace:
+        PostAttribute.objects.filter(post_id=post.id).delete()
+    if not post.category or not post.attributes:
+        return 0
+    if fields is None:
+        fields = load_category_fields(post.category)
+    if not fields:
+        return 0
+    rows = build_attribute_rows(post, fields)
+    PostAttribute.objects.bulk_create(rows)
+    return len(rows)
+
+
+def reindex_category(category, fields=None, batch_size=2000):
+    """بازسازی کامل ایندکس یک دسته‌بندی (بعد از آپلود/تغییر فرمت)"""
+    PostAttribute.objects.filter(category=category).delete()
+    if fields is None:
+        fields = load_category_fields(category)
+    if not fields:
+        return 0
+
+    total = 0
+    batch = []
+    posts = Post.objects.filter(category=category).only('id', 'category', 'attributes').order_by()
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.extend(build_attribute_rows(post, fields))
+        if len(batch) >= batch_size:
+            PostAttribute.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        PostAttribute.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+# ════════════════════════════════════════════════════════════
+# 🔎 Search
+# ════════════════════════════════════════════════════════════
+
+def literal_prefix(pattern):
+    """
+    بخش ثابت ابتدای یک regex (با معنای re.match)
+    تا قبل از اجرای regex، کاندیداها با شرط بازه روی ایندکس محدود شوند
+    """
+    if '|' in pattern:
+        return ''
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+
+    prefix = []
+    for char in pattern:
+        if char in _REGEX_META:
+            if char in _QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+def _prefix_condition(prefix):
+    # شرط بازه روی ایندکس B-tree قابل استفاده است؛ startswith دقت را تضمین می‌کند
+    return Q(value_str__gte=prefix, value_str__lt=prefix + _PREFIX_UPPER_BOUND, value_str__startswith=prefix)
+
+
+def _search_value(field, value, operator):
+    if field.is_number:
+        number = to_number(value)
+        if number is None:
+            raise ValidationError(f'"{field.key}" {operator} value must be a number')
+        return 'value_num', number
+    return 'value_str', str(value)
+
+
+def attribute_conditions(field, spec):
+    """
+    تبدیل شرط جستجوی یک کلید به لیست Q
+
+    "regex"                         → سازگار با نسخه قبلی (re.match)
+    12                              → برابری
+    {"eq", "prefix", "regex", "gt", "gte", "lt", "lte"} → ترکیب شرط‌ها
+    خروجی None یعنی هیچ پستی تطابق ندارد (regex نامعتبر)
+    """
+    if isinstance(spec, dict):
+        operators = spec
+    elif isinstance(spec, str):
+        operators = {'regex': spec} if spec else {}
+    elif isinstance(spec, (int, float)) and not isinstance(spec, bool):
+        operators = {'eq': spec}
+    else:
+        raise ValidationError(f'Invalid search value for "{field.key}"')
+
+    unknown = set(operators) - set(SEARCH_OPERATORS)
+    if unknown:
+        raise ValidationError(f'Unsupported search operator(s) for "{field.key}": {", ".join(sorted(unknown))}')
+
+    conditions = []
+    if 'eq' in operators:
+        column, value = _search_value(field, operators['eq'], 'eq')
+        conditions.append(Q(**{column: value}))
+
+    if operators.get('prefix'):
+        conditions.append(_prefix_condition(str(operators['prefix'])))
+
+    for operator in RANGE_OPERATORS:
+        if operator in operators:
+            column, value = _search_value(field, operators[operator], operator)
+            conditions.append(Q(**{f'{column}__{operator}': value}))
+
+    regex = operators.get('regex')
+    if regex:
+        try:
+            re.compile(regex)
+        except re.error:
+            return None
+        prefix = literal_prefix(regex)
+        if prefix:
+            conditions.append(_prefix_condition(prefix))
+        # regex فقط روی ردیف‌هایی اجرا می‌شود که ایندکس (کلید/پیشوند/بازه) باقی گذاشته
+        conditions.append(Q(value_str__regex=f'^(?:{regex})'))
+
+    return conditions
+
+
+def filter_by_attributes(queryset, criteria, category, fields):
+    """
+    اعمال معیارهای جستجو به صورت زیرکوئری روی post_attribute
+    خروجی یک QuerySet تنبل است و با صفحه‌بندی cursor/offset ترکیب می‌شود
+    """
+    for key, spec in criteria.items():
+        field = fields.get(key)
+        if field is None:
+            return queryset.none()
+
+        conditions = attribute_conditions(field, spec)
+        if conditions is None:
+            return queryset.none()
+
+        matching = PostAttribute.objects.filter(*conditions, category=category, key=key).values('post_id')
+        queryset = queryset.filter(id__in=matching)
+    return queryset
@@ -1,32 +1,35 @@
 from rest_framework import serializers
-from accounts.serializers import UserSerializer
+from accounts.serializers import CompactUserSerializer
 from .models import Post, PostMedia, CategoryFormat
 
 
 class PostMediaSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
     file_size = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = PostMedia
-        fields = ['id', 'url', 'media_type', 'caption', 'order', 'file_size']
+        fields = [
+            'id', 'url', 'media_type', 'caption', 'order', 'file_size', 'mime_type', 'width', 'height', 'duration',
+            'processing_status', 'variants'
+        ]
 
     def get_url(self, obj):
         return obj.file.url if obj.file else ''
 
     def get_file_size(self, obj):
-        return obj.file.size if obj.file else 0
+        # ستون ثبت شده هنگام آپلود؛ بدون stat روی دیسک
+        return obj.file_size or 0
+
+    def get_variants(self, obj):
+        return obj.variant_urls() if obj.file else {}
 
 
 class PostSerializer(serializers.ModelSerializer):
-    author_info = UserSerializer(source='author', read_only=True)
+    author_info = CompactUserSerializer(source='author', read_only=True)
     media = PostMediaSerializer(many=True, read_only=True)
-    mentions = UserSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    dislikes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
-    reposts_count = serializers.SerializerMethodField()
-    replies_count = serializers.SerializerMethodField()
+    mentions = CompactUserSerializer(many=True, read_only=True)
     user_reaction = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
     attributes = serializers.JSONField(default=dict, required=False)  # اضافه کردن فیلد attributes
@@ -39,26 +42,19 @@ class PostSerializer(serializers.ModelSerializer):
             'original_post', 'likes_count', 'dislikes_count', 'comments_count',
             'reposts_count', 'replies_count', 'user_reaction', 'is_saved', 'attributes'
         ]
-        read_only_fields = ['author', 'created_at', 'updated_at']
-
-    def get_likes_count(self, obj):
-        return obj.reactions.filter(reaction='like').count()
-
-    def get_dislikes_count(self, obj):
-        return obj.reactions.filter(reaction='dislike').count()
-
-    def get_comments_count(self, obj):
-        return obj.comments.count()
-
-    def get_reposts_count(self, obj):
-        return Post.objects.filter(original_post=obj, is_repost=True).count()
+        read_only_fields = [
+            'author', 'created_at', 'updated_at', 'likes_count', 'dislikes_count',
+            'comments_count', 'reposts_count', 'replies_count'
+        ]
 
-    def get_replies_count(self, obj):
-        return obj.replies.count()
+    # وضعیت کاربر جاری در لیست‌ها توسط Post.objects.for_listing() از قبل محاسبه شده است؛
+    # کوئری مستقیم فقط برای پست‌هایی است که annotate نشده‌اند (مثل پست تازه ساخته شده)
 
     def get_user_reaction(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'viewer_reaction'):
+                return obj.viewer_reaction
             reaction = obj.reactions.filter(user=request.user).first()
             return reaction.reaction if reaction else None
         return None
@@ -66,12 +62,14 @@ class PostSerializer(serializers.ModelSerializer):
     def get_is_saved(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'viewer_saved'):
+                return obj.viewer_saved
             return obj.saved_by.filter(id=request.user.id).exists()
         return False
 
 
 class CategoryFormatSerializer(serializers.ModelSerializer):
-    created_by_info = UserSerializer(source='created_by', read_only=True)
+    created_by_info = CompactUserSerializer(source='created_by', read_only=True)
     file_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+
+from core.counters import adjust_counter
+from social.models import UserFollow
+from .models import Post, PostMedia
+from .search import index_post_attributes
+from .feed import backfill_timeline, remove_author_from_timeline, uses_fanout_on_write
+
+
+def _apply_post_counters(post, delta):
+    adjust_counter(get_user_model(), post.author_id, 'posts_count', delta)
+    if post.parent_id:
+        adjust_counter(Post, post.parent_id, 'replies_count', delta)
+    if post.is_repost and post.original_post_id:
+        adjust_counter(Post, post.original_post_id, 'reposts_count', delta)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        _apply_post_counters(instance, 1)
+    index_post_attributes(instance, replace=not created)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _apply_post_counters(instance, -1)
+
+
+@receiver(post_save, sender=UserFollow)
+def follow_created(sender, instance, created, **kwargs):
+    if created and uses_fanout_on_write(instance.following):
+        backfill_timeline(instance.follower, authors=[instance.following_id])
+
+
+@receiver(post_delete, sender=UserFollow)
+def follow_deleted(sender, instance, **kwargs):
+    remove_author_from_timeline(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=PostMedia)
+def post_media_deleted(sender, instance, **kwargs):
+    # نسخه‌های thumb / medium (حذف پست‌ها به صورت cascade هم از این مسیر می‌گذرد)
+    instance.release_variants()
@@ -0,0 +1,570 @@
+import hashlib
+import json
+import os
+import struct
+import wave
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from PIL import Image
+
+from core.testing import TempMediaRootMixin
+from accounts.serializers import serializer_context, user_map_payload
+from interactions.models import Reaction, Comment
+from notifications.models import Notification
+from notifications.rendering import render_notifications
+from notifications.serializers import NotificationSerializer
+from .models import Post, PostAttribute, PostMedia, CategoryFormat, TimelineEntry
+from . import feed
+from .feed import FANOUT_FOLLOWER_LIMIT, home_feed_queryset
+from .formats import FormatRegistry, format_registry
+from .search import filter_by_attributes, load_category_fields, literal_prefix
+from . import processing
+from .processing import process_pending
+from .serializers import PostSerializer, PostMediaSerializer
+from .rendering import render_posts
+
+
+User = get_user_model()
+
+class PostListingQuerySetTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="1234")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="1234")
+
+        self.post = Post.objects.create(author=self.author, content="hello", category="general")
+        Post.objects.create(author=self.author, content="second", category="general")
+
+        Reaction.objects.create(user=self.viewer, post=self.post, reaction='like')
+        Reaction.objects.create(user=self.other, post=self.post, reaction='dislike')
+        Comment.objects.create(user=self.viewer, post=self.post, content="nice")
+        Comment.objects.create(user=self.other, post=self.post, content="ok")
+        Post.objects.create(author=self.other, content="reply", parent=self.post)
+        Post.objects.create(author=self.viewer, content="hello", is_repost=True, original_post=self.post)
+        self.post.saved_by.add(self.viewer)
+
+        self.request = RequestFactory().get('/api/posts/')
+        self.request.user = self.viewer
+
+    def test_viewer_state_is_annotated(self):
+        post = Post.objects.for_listing(self.viewer).get(id=self.post.id)
+        self.assertEqual(post.viewer_reaction, 'like')
+        self.assertTrue(post.viewer_saved)
+
+    def test_serializer_reads_precomputed_values(self):
+        posts = list(Post.objects.filter(parent=None, is_repost=False).for_listing(self.viewer))
+        serializer = PostSerializer(context={'request': self.request})
+
+        with self.assertNumQueries(0):
+            values = [
+                (
+                    post.likes_count,
+                    post.comments_count,
+                    serializer.get_user_reaction(post),
+                    serializer.get_is_saved(post),
+                )
+                for post in posts
+            ]
+
+        self.assertIn((1, 2, 'like', True), values)
+        self.assertIn((0, 0, None, False), values)
+
+
+class CounterColumnsTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.fan = User.objects.create_user(username="fan", email="fan@example.com", password="1234")
+        self.post = Post.objects.create(author=self.author, content="hello", category="general")
+
+    def test_counters_follow_writes(self):
+        reaction = Reaction.objects.create(user=self.fan, post=self.post, reaction='like')
+        comment = Comment.objects.create(user=self.fan, post=self.post, content="nice")
+        Comment.objects.create(user=self.author, post=self.post, content="thanks", parent=comment)
+        repost = Post.objects.create(author=self.fan, content="hello", is_repost=True, original_post=self.post)
+        comment.likes.add(self.author)
+        self.fan.follow(self.author)
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.author.refresh_from_db()
+        self.fan.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count, self.post.reposts_count), (1, 2, 1))
+        self.assertEqual((comment.likes_count, comment.replies_count), (1, 1))
+        self.assertEqual((self.author.followers_count, self.author.posts_count), (1, 1))
+        self.assertEqual((self.fan.following_count, self.fan.posts_count), (1, 1))
+
+        reaction.delete()
+        repost.delete()
+        comment.likes.remove(self.author)
+        comment.dislikes.remove(self.author)  # کاربر دیس‌لایک نکرده بود؛ شمارنده نباید منفی شود
+        self.fan.unfollow(self.author)
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.reposts_count), (0, 0))
+        self.assertEqual((comment.likes_count, comment.dislikes_count), (0, 0))
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_saves_do_not_overwrite_concurrent_increments(self):
+        stale_post = Post.objects.get(id=self.post.id)
+        stale_author = User.objects.get(id=self.author.id)
+        # بین load و save، سیگنال‌ها شمارنده‌ها را با F() زیاد می‌کنند
+        Reaction.objects.create(user=self.fan, post=self.post, reaction='like')
+        self.fan.follow(self.author)
+
+        client = APIClient()
+        client.force_authenticate(stale_author)
+        self.assertEqual(client.put('/api/profile/update/', {'bio': 'new bio'}, format='json').status_code, 200)
+        stale_author.generate_email_verification_token()
+        stale_post.content = "edited"
+        stale_post.save()
+
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.content, self.post.likes_count), ("edited", 1))
+        self.assertEqual((self.author.bio, self.author.followers_count, self.author.posts_count), ('new bio', 1, 1))
+
+    def test_recount_counters_fixes_drift(self):
+        Reaction.objects.create(user=self.fan, post=self.post, reaction='like')
+        Post.objects.filter(id=self.post.id).update(likes_count=7, comments_count=3)
+        User.objects.filter(id=self.author.id).update(posts_count=0)
+
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+        self.assertEqual(self.author.posts_count, 1)
+        self.assertIn('3 counter value(s) reconciled', out.getvalue())
+
+
+class FastRenderingTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.viewer = User.objects.create_user(username="viewer", email="viewer@example.com", password="1234")
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234", first_name="Sara")
+
+        post = Post.objects.create(author=self.author, content="سلام", tags="a,b", category="books", attributes={"price": 10})
+        post.mentions.add(self.viewer, self.author)
+        PostMedia.objects.create(post=post, file=SimpleUploadedFile("a.jpg", b"jpeg-bytes"), media_type="image", caption="cover")
+        PostMedia.objects.create(post=post, file=SimpleUploadedFile("b.mp4", b"mp4"), media_type="video", order=1)
+        Reaction.objects.create(user=self.viewer, post=post, reaction='like')
+        post.saved_by.add(self.viewer)
+        Post.objects.create(author=self.viewer, content="reply", parent=post)
+        Post.objects.create(author=self.viewer, content="", is_repost=True, original_post=post)
+
+        Notification.objects.create(recipient=self.viewer, sender=self.author, notif_type='mention', post=post, message='hi')
+        Notification.objects.create(recipient=self.viewer, sender=self.author, notif_type='follow')
+
+    def make_context(self, query=''):
+        request = Request(RequestFactory().get(f'/api/posts/?{query}'))
+        request.user = self.viewer
+        return serializer_context(request)
+
+    def assertSameJson(self, fast, slow):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(slow))
+
+    def test_posts_match_serializer(self):
+        for query in ('', 'users=map'):
+            posts = list(Post.objects.for_listing(self.viewer))
+            fast_context, slow_context = self.make_context(query), self.make_context(query)
+            self.assertSameJson(
+                {'posts': render_posts(posts, fast_context), **user_map_payload(fast_context)},
+                {'posts': PostSerializer(posts, many=True, context=slow_context).data, **user_map_payload(slow_context)},
+            )
+
+    def test_notifications_match_serializer(self):
+        notifications = list(Notification.objects.filter(recipient=self.viewer).select_related('sender'))
+        context = self.make_context()
+        self.assertSameJson(
+            render_notifications(notifications, context),
+            NotificationSerializer(notifications, many=True, context=context).data,
+        )
+
+
+class PostMediaMetadataTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.post = Post.objects.create(author=self.author, content="media", category="general")
+
+    def png_bytes(self):
+        output = BytesIO()
+        Image.new('RGB', (30, 20), 'red').save(output, format='PNG')
+        return output.getvalue()
+
+    def wav_bytes(self):
+        output = BytesIO()
+        with wave.open(output, 'wb') as audio:
+            audio.setnchannels(1)
+            audio.setsampwidth(2)
+            audio.setframerate(8000)
+            audio.writeframes(b'\0\0' * 12000)
+        return output.getvalue()
+
+    def mp4_bytes(self, seconds):
+        mvhd_body = bytes(4) + struct.pack('>IIII', 0, 0, 1000, seconds * 1000) + bytes(80)
+        mvhd = struct.pack('>I4s', 8 + len(mvhd_body), b'mvhd') + mvhd_body
+        moov = struct.pack('>I4s', 8 + len(mvhd), b'moov') + mvhd
+        ftyp = struct.pack('>I4s', 16, b'ftyp') + b'isom' + bytes(4)
+        return ftyp + moov
+
+    def test_metadata_recorded_on_upload(self):
+        data = self.png_bytes()
+        media = PostMedia.objects.create(post=self.post, media_type='image',
+                                         file=SimpleUploadedFile("a.png", data, content_type='image/png'))
+        media.refresh_from_db()
+        self.assertEqual((media.file_size, media.width, media.height), (len(data), 30, 20))
+        self.assertEqual(media.mime_type, 'image/png')
+        self.assertEqual(media.checksum, hashlib.sha256(data).hexdigest())
+
+        audio = PostMedia.objects.create(post=self.post, media_type='audio',
+                                         file=SimpleUploadedFile("a.wav", self.wav_bytes(), content_type='audio/wav'))
+        self.assertEqual(audio.duration, 1.5)
+        video = PostMedia.objects.create(post=self.post, media_type='video',
+                                         file=SimpleUploadedFile("a.mp4", self.mp4_bytes(42), content_type='video/mp4'))
+        self.assertEqual(video.duration, 42)
+        self.assertIsNone(video.width)
+
+    def test_truncated_mp4_has_no_duration(self):
+        data = self.mp4_bytes(42)
+        # قطع شده وسط mvhd، وسط هدر moov و وسط اندازه‌ی ۶۴ بیتی یک باکس
+        for truncated in (data[:33], data[:20], struct.pack('>I4s', 1, b'ftyp') + b'\0\0'):
+            video = PostMedia.objects.create(post=self.post, media_type='video',
+                                             file=SimpleUploadedFile("t.mp4", truncated, content_type='video/mp4'))
+            self.assertIsNone(video.duration)
+            self.assertEqual(video.file_size, len(truncated))
+
+    def test_serialization_does_not_touch_files(self):
+        PostMedia.objects.create(post=self.post, media_type='image', file=SimpleUploadedFile("a.png", self.png_bytes()))
+        posts = list(Post.objects.for_listing(self.author))
+        with mock.patch.object(FileSystemStorage, 'size', side_effect=AssertionError('stat')):
+            data = PostSerializer(posts, many=True).data
+            self.assertEqual(render_posts(posts, {}), data)
+        self.assertEqual(data[0]['media'][0]['width'], 30)
+        self.assertGreater(data[0]['media'][0]['file_size'], 0)
+
+    def test_backfill_command(self):
+        data = self.png_bytes()
+        media = PostMedia.objects.create(post=self.post, media_type='image', file=SimpleUploadedFile("a.png", data))
+        missing = PostMedia.objects.create(post=self.post, media_type='file', file=SimpleUploadedFile("b.txt", b"x"))
+        os.remove(missing.file.path)
+        PostMedia.objects.update(file_size=None, mime_type='', width=None, height=None, checksum='')
+
+        out = StringIO()
+        call_command('backfill_media_metadata', stdout=out, stderr=StringIO())
+        self.assertIn('1 media row(s) updated, 1 with missing files', out.getvalue())
+
+        media.refresh_from_db()
+        self.assertEqual((media.file_size, media.width, media.mime_type), (len(data), 30, 'image/png'))
+        self.assertEqual(media.checksum, hashlib.sha256(data).hexdigest())
+        missing.refresh_from_db()
+        self.assertIsNone(missing.file_size)
+
+
+class MediaProcessingTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.post = Post.objects.create(author=self.author, content="media", category="general")
+
+    def jpeg_upload(self, size, orientation=None):
+        output = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        Image.new('RGB', size, 'blue').save(output, format='JPEG', exif=exif)
+        return SimpleUploadedFile("photo.jpg", output.getvalue(), content_type='image/jpeg')
+
+    def test_variants_generated_and_exif_stripped(self):
+        # orientation=6: تصویر ۲۰۰۰×۱۰۰۰ باید عمودی (۱۰۰۰×۲۰۰۰) نمایش داده شود
+        media = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((2000, 1000), 6))
+        self.assertEqual(media.processing_status, PostMedia.PROCESSING_PENDING)
+
+        self.assertEqual(process_pending(), 1)
+        media.refresh_from_db()
+        self.assertEqual(media.processing_status, PostMedia.PROCESSING_READY)
+        self.assertEqual((media.variants['thumb']['width'], media.variants['thumb']['height']), (160, 320))
+        self.assertEqual((media.variants['medium']['width'], media.variants['medium']['height']), (540, 1080))
+
+        with media.file.storage.open(media.variants['thumb']['name']) as f, Image.open(f) as thumb:
+            self.assertEqual(thumb.format, 'WEBP')
+            self.assertFalse(thumb.getexif())
+
+        data = PostMediaSerializer(media).data
+        self.assertEqual(data['variants']['thumb']['url'], media.file.storage.url(media.variants['thumb']['name']))
+        self.assertEqual(data['variants']['medium']['mime_type'], 'image/webp')
+
+        # نسخه‌ها blob هستند؛ بعد از حذف مدیا فایلشان را gc_blobs پاک می‌کند
+        variant_path = media.file.storage.path(media.variants['medium']['name'])
+        media.delete()
+        call_command('gc_blobs', '--grace-minutes', '0', stdout=StringIO())
+        self.assertFalse(os.path.exists(variant_path))
+
+    def test_small_image_shares_one_variant(self):
+        media = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((100, 50)))
+        process_pending()
+        media.refresh_from_db()
+        self.assertEqual(media.variants['thumb'], media.variants['medium'])
+        self.assertEqual(media.variants['thumb']['width'], 100)
+
+    def test_non_images_and_broken_images(self):
+        document = PostMedia.objects.create(post=self.post, media_type='file', file=SimpleUploadedFile("a.pdf", b"%PDF"))
+        self.assertEqual(document.processing_status, PostMedia.PROCESSING_READY)
+
+        broken = PostMedia.objects.create(post=self.post, media_type='image', file=SimpleUploadedFile("b.jpg", b"not a jpeg"))
+        process_pending()
+        broken.refresh_from_db()
+        self.assertEqual((broken.processing_status, broken.variants), (PostMedia.PROCESSING_FAILED, {}))
+
+        out = StringIO()
+        call_command('process_media', '--retry', stdout=out)
+        self.assertIn('1 media row(s) requeued', out.getvalue())
+
+    def test_retry_leaves_rows_of_live_workers(self):
+        stale = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((100, 100)))
+        running = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((100, 100)))
+        processing.claim(stale.id)
+        processing.claim(running.id)
+        PostMedia.objects.filter(id=stale.id).update(claimed_at=timezone.now() - timedelta(hours=1))
+
+        out = StringIO()
+        call_command('process_media', '--retry', stdout=out)
+        self.assertIn('1 media row(s) requeued', out.getvalue())
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(stale.processing_status, PostMedia.PROCESSING_READY)
+        self.assertEqual(running.processing_status, PostMedia.PROCESSING_RUNNING)
+
+    def test_media_deleted_during_processing_releases_variants(self):
+        media = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((400, 400)))
+        claimed = processing.claim(media.id)
+        media.delete()
+
+        processing.process_media(claimed)
+        variant_path = claimed.file.storage.path(claimed.variants['thumb']['name'])
+        self.assertTrue(os.path.exists(variant_path))
+        call_command('gc_blobs', '--grace-minutes', '0', stdout=StringIO())
+        self.assertFalse(os.path.exists(variant_path))
+
+    def test_requeue_missing(self):
+        media = PostMedia.objects.create(post=self.post, media_type='image', file=self.jpeg_upload((400, 400)))
+        PostMedia.objects.filter(id=media.id).update(processing_status=PostMedia.PROCESSING_READY)
+
+        out = StringIO()
+        call_command('process_media', '--requeue-missing', stdout=out)
+        self.assertIn('1 image(s) without variants queued', out.getvalue())
+        media.refresh_from_db()
+        self.assertEqual(set(media.variants), {'thumb', 'medium'})
+
+    def test_upload_schedules_processing_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with mock.patch.object(processing.worker, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/posts/', {
+                'content': 'photo', 'category': 'general', 'media': [self.jpeg_upload((500, 500))]
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        media = response.json()['post']['media'][0]
+        self.assertEqual((media['processing_status'], media['variants']), ('pending', {}))
+        submit.assert_called_once_with([media['id']])
+
+
+class AttributeSearchTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username="seller", email="seller@example.com", password="1234")
+        format_data = {
+            "title": "^.+$",
+            "price": {"pattern": "^[0-9]+$", "type": "number"},
+        }
+        CategoryFormat.objects.create(
+            category="books",
+            created_by=self.author,
+            format_file=SimpleUploadedFile("books.json", json.dumps(format_data).encode()),
+        )
+        self.cheap = Post.objects.create(author=self.author, content="a", category="books",
+                                         attributes={"title": "Calculus", "price": 90})
+        self.pricey = Post.objects.create(author=self.author, content="b", category="books",
+                                          attributes={"title": "Calendar", "price": 1200})
+        Post.objects.create(author=self.author, content="c", category="books",
+                            attributes={"title": "Physics", "price": "free"})
+
+    def search(self, criteria):
+        fields = load_category_fields("books")
+        queryset = filter_by_attributes(Post.objects.filter(category="books"), criteria, "books", fields)
+        return set(queryset.values_list('id', flat=True))
+
+    def test_only_values_matching_the_format_are_indexed(self):
+        self.assertEqual(PostAttribute.objects.filter(key="price").count(), 2)
+
+    def test_predicates(self):
+        self.assertEqual(self.search({"title": "Cal"}), {self.cheap.id, self.pricey.id})
+        self.assertEqual(self.search({"title": {"eq": "Calendar"}}), {self.pricey.id})
+        self.assertEqual(self.search({"title": {"prefix": "Calc"}}), {self.cheap.id})
+        self.assertEqual(self.search({"price": {"gte": 100}}), {self.pricey.id})
+        self.assertEqual(self.search({"title": "Cal", "price": {"lt": 100}}), {self.cheap.id})
+        self.assertEqual(self.search({"title": "[unclosed"}), set())
+        self.assertEqual(self.search({"unknown": ""}), set())
+
+    def test_index_follows_updates(self):
+        self.cheap.attributes = {"title": "Algebra", "price": 50}
+        self.cheap.save()
+        self.assertEqual(self.search({"title": "Alg"}), {self.cheap.id})
+        self.assertEqual(self.search({"title": "Calc"}), set())
+
+    def test_literal_prefix(self):
+        self.assertEqual(literal_prefix("^abc.*"), "abc")
+        self.assertEqual(literal_prefix("abcd?"), "abc")
+        self.assertEqual(literal_prefix("abc|xyz"), "")
+
+    def test_format_registry_reuses_compiled_fields(self):
+        format_registry.invalidate()
+        with mock.patch.object(FormatRegistry, '_read', wraps=FormatRegistry._read) as read:
+            first = load_category_fields("books")
+            second = load_category_fields("books")
+            self.assertIs(first, second)
+            self.assertEqual(read.call_count, 1)
+
+            format_obj = CategoryFormat.objects.get(category="books")
+            format_obj.format_file = SimpleUploadedFile("books.json", json.dumps({"title": "^[A-Z].*$"}).encode())
+            format_obj.save()
+            self.assertEqual(list(load_category_fields("books")), ["title"])
+            self.assertEqual(read.call_count, 2)
+
+
+@override_settings(FEED_FANOUT_IN_PROCESS=False)
+class HomeFeedTest(TestCase):
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", email="reader@example.com", password="1234")
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.celebrity = User.objects.create_user(username="celebrity", email="celebrity@example.com", password="1234")
+        self.stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="1234")
+        self.old_post = Post.objects.create(author=self.author, content="before follow", category="general")
+        self.reader.follow(self.author)
+        self.reader.follow(self.celebrity)
+        User.objects.filter(id=self.celebrity.id).update(followers_count=FANOUT_FOLLOWER_LIMIT + 1)
+        self.celebrity.refresh_from_db()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def create_post(self, user, content):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/posts/', {'content': content, 'category': 'general'})
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(response.status_code, 201)
+        return response.data['post']['id']
+
+    def test_feed_merges_fanout_on_write_and_read(self):
+        author_post = self.create_post(self.author, "from author")
+        celebrity_post = self.create_post(self.celebrity, "from celebrity")
+        own_post = self.create_post(self.reader, "my own")
+        self.create_post(self.stranger, "not followed")
+        Post.objects.create(author=self.author, content="reply", parent=self.old_post)
+
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post_id=author_post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(post_id=celebrity_post).exists())
+
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post['id'] for post in response.data['posts']],
+            [own_post, celebrity_post, author_post, self.old_post.id],
+        )
+
+    @override_settings(FEED_FANOUT_IN_PROCESS=True)
+    def test_fanout_is_deferred_to_worker(self):
+        self.client.force_authenticate(self.author)
+        with mock.patch.object(feed.worker, 'submit') as submit:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post('/api/posts/', {'content': "later", 'category': 'general'})
+            post_id = response.data['post']['id']
+            self.assertFalse(TimelineEntry.objects.filter(post_id=post_id).exists())
+            submit.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+            submit.assert_called_once_with(post_id)
+        self.assertEqual(feed.fanout_post_id(post_id), 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post_id=post_id).exists())
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        self.assertIn(self.old_post, home_feed_queryset(self.reader))
+
+        self.reader.unfollow(self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, author=self.author).exists())
+        self.assertNotIn(self.old_post, home_feed_queryset(self.reader))
+
+        TimelineEntry.objects.all().delete()
+        self.reader.follow(self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(list(home_feed_queryset(self.reader)), [self.old_post])
+
+
+class CursorPaginationTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="1234")
+        self.post_ids = [
+            Post.objects.create(author=self.author, content=f"post {i}", category="general").id
+            for i in range(5)
+        ][::-1]
+        self.client = APIClient()
+        self.url = '/api/posts/category/general/'
+
+    def ids(self, response):
+        return [post['id'] for post in response.data['posts']]
+
+    def test_walks_forward_and_back_with_cursors(self):
+        first = self.client.get(self.url, {'per_page': 2})
+        self.assertEqual(self.ids(first), self.post_ids[:2])
+        self.assertNotIn('total_count', first.data['pagination'])
+        self.assertFalse(first.data['pagination']['has_previous'])
+
+        second = self.client.get(self.url, {'per_page': 2, 'cursor': first.data['pagination']['next_cursor']})
+        third = self.client.get(self.url, {'per_page': 2, 'cursor': second.data['pagination']['next_cursor']})
+        self.assertEqual(self.ids(second), self.post_ids[2:4])
+        self.assertEqual(self.ids(third), self.post_ids[4:])
+        self.assertIsNone(third.data['pagination']['next_cursor'])
+
+        back = self.client.get(self.url, {'per_page': 2, 'cursor': third.data['pagination']['prev_cursor']})
+        self.assertEqual(self.ids(back), self.post_ids[2:4])
+        self.assertTrue(back.data['pagination']['has_previous'])
+
+    def test_count_and_legacy_page_mode(self):
+        counted = self.client.get(self.url, {'per_page': 2, 'with_count': 1})
+        self.assertEqual(counted.data['pagination']['total_count'], 5)
+
+        legacy = self.client.get(self.url, {'per_page': 2, 'page': 3})
+        self.assertEqual(self.ids(legacy), self.post_ids[4:])
+        self.assertEqual(legacy.data['pagination']['total_pages'], 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['success'])
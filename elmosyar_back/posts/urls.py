@@ -5,6 +5,7 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.posts_list_create, name='posts_list_create'),
+    path('feed/', views.home_feed, name='home_feed'),
     path('<int:post_id>/', views.post_detail, name='post_detail'),
     path('<int:post_id>/repost/', views.post_repost, name='post_repost'),
     path('<int:post_id>/thread/', views.post_thread, name='post_thread'),
@@ -4,20 +4,27 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
 import json
 import mimetypes
 import re
 
-import settings
-from .models import Post, PostMedia, CategoryFormat
+from .models import Post, PostMedia, CategoryFormat, PostAttribute
+from .formats import parse_format, to_number, format_registry
+from .search import load_category_fields, filter_by_attributes, reindex_category
+from .feed import home_feed_queryset, schedule_fanout
+from .processing import schedule_processing
+from uploads.files import UploadError, claim_uploads, upload_ids_from
+from uploads.models import Upload
 from .serializers import PostSerializer, PostMediaSerializer, CategoryFormatSerializer
+from .rendering import render_posts
 from notifications.models import Notification
 
 from interactions.models import Comment
 from interactions.serializers import CommentSerializer
-from accounts.serializers import UserSerializer
+from accounts.models import User
+from accounts.serializers import UserSerializer, serializer_context, user_map_payload
+from core.pagination import paginate
 
 # جایگزین کردن لاگر قدیمی
 from log_manager.log_config import log_info, log_error, log_warning, log_audit, log_api_request
@@ -33,6 +40,7 @@ MAX_MEDIA_FILE_SIZE = 10 * 1024 * 1024
 def apply_advanced_search_filter(queryset, search_json, category):
     """
     اعمال فیلترهای پیشرفته بر اساس JSON جستجو و فرمت دسته‌بندی
+    شرط‌ها روی جدول post_attribute و داخل دیتابیس اجرا می‌شوند (posts/search.py)
     """
     try:
         search_criteria = json.loads(search_json)
@@ -45,70 +53,24 @@ def apply_advanced_search_filter(queryset, search_json, category):
         if not category:
             raise ValidationError('Category is required for advanced search')
         
-        # دریافت فرمت JSON مربوط به این دسته‌بندی
-        format_obj = CategoryFormat.objects.filter(category=category).first()
-        
-        if not format_obj:
-            raise ValidationError(f'No format found for category: {category}')
-        
-        # خواندن فرمت JSON از فایل
+        # دریافت فرمت مربوط به این دسته‌بندی
         try:
-            with open(format_obj.format_file.path, 'r', encoding='utf-8') as f:
-                format_data = json.load(f)
+            fields = load_category_fields(category)
         except Exception as e:
             log_error(f"Error reading format file: {str(e)}")
             raise ValidationError('Error reading format file')
         
-        # فیلتر کردن پست‌ها بر اساس معیارهای جستجو
-        filtered_posts = []
-        for post in queryset:
-            post_attributes = post.attributes or {}
-            match_all_criteria = True
-            
-            for key, regex_pattern in search_criteria.items():
-                # بررسی وجود کلید در attributes پست
-                if key not in post_attributes:
-                    match_all_criteria = False
-                    break
-                
-                # بررسی وجود کلید در فرمت
-                if key not in format_data:
-                    match_all_criteria = False
-                    break
-                
-                # اعتبارسنجی مقدار با regex فرمت
-                value = str(post_attributes[key])
-                try:
-                    if not re.match(format_data[key], value):
-                        match_all_criteria = False
-                        break
-                except re.error:
-                    log_error(f"Invalid regex pattern in format for key {key}: {format_data[key]}")
-                    match_all_criteria = False
-                    break
-                
-                # اعمال regex جستجوی کاربر (اگر در search_criteria آمده باشد)
-                if regex_pattern:
-                    try:
-                        if not re.match(regex_pattern, value):
-                            match_all_criteria = False
-                            break
-                    except re.error:
-                        log_error(f"Invalid regex pattern in search for key {key}: {regex_pattern}")
-                        match_all_criteria = False
-                        break
-            
-            if match_all_criteria:
-                filtered_posts.append(post.id)
+        if fields is None:
+            raise ValidationError(f'No format found for category: {category}')
+        
+        filtered_posts = filter_by_attributes(queryset, search_criteria, category, fields)
         
-        log_info(f"Advanced search applied: {len(filtered_posts)} posts matched", None, {
+        log_info(f"Advanced search applied", None, {
             'category': category,
-            'search_criteria': search_criteria,
-            'matched_posts': len(filtered_posts)
+            'search_criteria': search_criteria
         })
         
-        # فیلتر کردن پست‌ها بر اساس IDهای فیلتر شده
-        return queryset.filter(id__in=filtered_posts)
+        return filtered_posts
         
     except json.JSONDecodeError:
         log_warning(f"Invalid JSON in advanced search: {search_json}")
@@ -121,6 +83,15 @@ def apply_advanced_search_filter(queryset, search_json, category):
         raise ValidationError('Error in advanced search')
 
 
+def _validate_attribute_value(field, value):
+    """بررسی یک مقدار با الگو و نوع تعریف شده در فرمت"""
+    if not field.matches(value):
+        return f'Attribute "{field.key}" does not match format pattern'
+    if field.is_number and to_number(value) is None:
+        return f'Attribute "{field.key}" must be a number'
+    return None
+
+
 def validate_post_attributes(attributes, category):
     """
     اعتبارسنجی attributes پست بر اساس فرمت دسته‌بندی
@@ -128,20 +99,18 @@ def validate_post_attributes(attributes, category):
     if not attributes or not category:
         return True, None
     
-    format_obj = CategoryFormat.objects.filter(category=category).first()
-    if not format_obj:
-        return True, None  # اگر فرمتی وجود ندارد، اعتبارسنجی نکن
-    
     try:
-        with open(format_obj.format_file.path, 'r', encoding='utf-8') as f:
-            format_data = json.load(f)
+        fields = load_category_fields(category)
+        if not fields:
+            return True, None  # اگر فرمتی وجود ندارد، اعتبارسنجی نکن
         
         for key, value in attributes.items():
-            if key in format_data:
+            if key in fields:
                 # اعتبارسنجی با regex فرمت
-                if not re.match(format_data[key], str(value)):
+                error_message = _validate_attribute_value(fields[key], value)
+                if error_message:
                     log_warning(f"Attribute validation failed: {key}={value} doesn't match pattern")
-                    return False, f'Attribute "{key}" does not match format pattern'
+                    return False, error_message
         
         return True, None
     except Exception as e:
@@ -156,13 +125,10 @@ def validate_post_update_attributes(post, attributes, category):
     if not category:
         return True, None
     
-    format_obj = CategoryFormat.objects.filter(category=category).first()
-    if not format_obj:
-        return True, None
-    
     try:
-        with open(format_obj.format_file.path, 'r', encoding='utf-8') as f:
-            format_data = json.load(f)
+        fields = load_category_fields(category)
+        if not fields:
+            return True, None
         
         # اگر attributes جدید ارسال شده
         if attributes is not None:
@@ -170,14 +136,15 @@ def validate_post_update_attributes(post, attributes, category):
             merged_attributes = {**post_attributes, **attributes}
             
             for key, value in merged_attributes.items():
-                if key in format_data:
+                if key in fields:
                     # اعتبارسنجی با regex فرمت
-                    if not re.match(format_data[key], str(value)):
+                    error_message = _validate_attribute_value(fields[key], value)
+                    if error_message:
                         log_warning(f"Update attribute validation failed: {key}={value}")
-                        return False, f'Attribute "{key}" does not match format pattern'
+                        return False, error_message
             
             # بررسی کلیدهای اجباری در فرمت
-            for key, pattern in format_data.items():
+            for key in fields:
                 if key not in merged_attributes:
                     log_warning(f"Required attribute missing: {key}")
                     return False, f'Attribute "{key}" is required and cannot be removed'
@@ -205,8 +172,6 @@ def posts_list_create(request):
         category = request.GET.get('category')
         username = request.GET.get('username')
         search_json = request.GET.get('search')
-        page = int(request.GET.get('page', 1))
-        per_page = min(int(request.GET.get('per_page', 20)), 100)
 
         # Build query
         posts = Post.objects.all()
@@ -215,7 +180,7 @@ def posts_list_create(request):
             posts = posts.filter(category=category)
         
         if username:
-            user = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
+            user = get_object_or_404(User, username=username)
             posts = posts.filter(author=user)
         
         # اگر پارامتر search وجود داشت، فیلترهای پیشرفته را اعمال کن
@@ -230,39 +195,25 @@ def posts_list_create(request):
                 }, status=status.HTTP_400_BAD_REQUEST)
         
         # Optimize queries
-        posts = posts.select_related('author').prefetch_related(
-            'media', 'mentions', 'reactions', 'saved_by'
-        ).order_by('-created_at')
+        posts = posts.for_listing(request.user)
         
-        # Pagination
-        paginator = Paginator(posts, per_page)
-        try:
-            posts_page = paginator.page(page)
-        except:
-            posts_page = paginator.page(1)
+        # Pagination (cursor روی created_at, id؛ با ?page= حالت قدیمی)
+        posts_page, pagination = paginate(request, posts)
         
         log_api_request(f"Posts list retrieved", request, {
             'category': category,
             'username': username,
             'has_search': bool(search_json),
-            'page': page,
-            'per_page': per_page,
-            'total_posts': paginator.count
+            'pagination': pagination
         })
         
-        serializer = PostSerializer(posts_page, many=True, context={'request': request})
+        context = serializer_context(request)
         
         return Response({
             'success': True,
-            'posts': serializer.data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'has_next': posts_page.has_next(),
-                'has_previous': posts_page.has_previous(),
-            }
+            'posts': render_posts(posts_page, context),
+            'pagination': pagination,
+            **user_map_payload(context)
         }, status=status.HTTP_200_OK)
     
     # POST - Create new post
@@ -274,9 +225,10 @@ def posts_list_create(request):
             parent_id = request.data.get('parent')
             category = request.data.get('category', '').strip()
             attributes = request.data.get('attributes', {})
+            upload_ids = upload_ids_from(request.data)
 
             # Validation
-            if not content and not request.FILES and not attributes:
+            if not content and not request.FILES and not upload_ids and not attributes:
                 log_warning("Post creation attempt without content, media or attributes", request)
                 return Response({
                     'success': False,
@@ -317,6 +269,19 @@ def posts_list_create(request):
                         'message': error_message
                     }, status=status.HTTP_400_BAD_REQUEST)
 
+            # فایل‌هایی که از قبل با آپلود تکه‌تکه (/api/uploads/) کامل شده‌اند
+            try:
+                uploaded_files = claim_uploads(request.user, upload_ids, Upload.PURPOSE_POST_MEDIA,
+                                               max_size=MAX_MEDIA_FILE_SIZE)
+            except UploadError as e:
+                log_warning(f"Post creation with invalid upload: {str(e)}", request, {
+                    'upload_ids': upload_ids
+                })
+                return Response({
+                    'success': False,
+                    'message': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             post = Post.objects.create(
                 author=request.user,
                 content=content,
@@ -329,7 +294,7 @@ def posts_list_create(request):
             # Handle mentions
             if mentions_raw:
                 usernames = [u.strip() for u in mentions_raw.split(',') if u.strip()]
-                mentioned_users = settings.AUTH_USER_MODEL.objects.filter(username__in=usernames)
+                mentioned_users = User.objects.filter(username__in=usernames)
                 for mu in mentioned_users:
                     post.mentions.add(mu)
                     if mu != request.user:
@@ -346,7 +311,8 @@ def posts_list_create(request):
 
             # Handle media files
             media_files = []
-            for f in request.FILES.getlist('media'):
+            pending_media = []
+            for f in request.FILES.getlist('media') + uploaded_files:
                 # Validate file type
                 ctype = f.content_type or mimetypes.guess_type(f.name)[0] or ''
                 if ctype.startswith('image/'):
@@ -358,7 +324,7 @@ def posts_list_create(request):
                 else:
                     mtype = 'file'
                 
-                # Validate file size
+                # Validate file size (آپلودهای تکه‌تکه بزرگ‌تر از سقف در claim_uploads با 400 رد شده‌اند)
                 if f.size > MAX_MEDIA_FILE_SIZE:
                     log_warning(f"Media file too large: {f.size} bytes, skipping", request, {
                         'filename': f.name,
@@ -366,13 +332,21 @@ def posts_list_create(request):
                     })
                     continue  # Skip large files
                     
-                PostMedia.objects.create(post=post, file=f, media_type=mtype)
+                media = PostMedia.objects.create(post=post, file=f, media_type=mtype)
+                if media.processing_status == PostMedia.PROCESSING_PENDING:
+                    pending_media.append(media.id)
                 media_files.append({
                     'filename': f.name,
                     'size': f.size,
                     'type': mtype
                 })
 
+            # ساخت thumbnail و نسخه‌های کوچک‌تر بعد از commit، خارج از مسیر درخواست
+            schedule_processing(pending_media)
+
+            # نوشتن در تایم‌لاین دنبال‌کننده‌ها (fan-out-on-write) بعد از commit، خارج از مسیر درخواست
+            schedule_fanout(post)
+
             log_audit(f"Post created successfully", request, {
                 'post_id': post.id,
                 'category': category,
@@ -406,11 +380,7 @@ def posts_list_create(request):
 def post_detail(request, post_id):
     """Get single post details with comments and replies"""
     try:
-        post = get_object_or_404(
-            Post.objects.select_related('author')
-            .prefetch_related('media', 'mentions', 'reactions', 'saved_by'),
-            id=post_id
-        )
+        post = get_object_or_404(Post.objects.for_listing(request.user), id=post_id)
         
         log_info(f"Post details viewed", request, {
             'post_id': post_id,
@@ -419,24 +389,24 @@ def post_detail(request, post_id):
         })
         
         # Get post data
-        post_serializer = PostSerializer(post, context={'request': request})
+        context = serializer_context(request)
+        post_serializer = PostSerializer(post, context=context)
         data = post_serializer.data
         
         # Get comments with optimization
         comments = Comment.objects.filter(post=post).select_related('user').prefetch_related('likes').order_by('created_at')
-        comment_serializer = CommentSerializer(comments, many=True, context={'request': request})
+        comment_serializer = CommentSerializer(comments, many=True, context=context)
         data['comments'] = comment_serializer.data
         
         # Get replies with optimization
-        replies = Post.objects.filter(parent=post).select_related('author').prefetch_related(
-            'media', 'mentions', 'reactions'
-        ).order_by('created_at')
-        reply_serializer = PostSerializer(replies, many=True, context={'request': request})
+        replies = Post.objects.filter(parent=post).for_listing(request.user).order_by('created_at')
+        reply_serializer = PostSerializer(replies, many=True, context=context)
         data['replies'] = reply_serializer.data
         
         return Response({
             'success': True,
-            'post': data
+            'post': data,
+            **user_map_payload(context)
         }, status=status.HTTP_200_OK)
     except Exception as e:
         log_error(f"Post detail retrieval failed: {str(e)}", request, {'post_id': post_id})
@@ -626,6 +596,8 @@ def post_repost(request, post_id):
                 post=original_post,
                 message=f'{request.user.username} reposted your post'
             )
+
+            schedule_fanout(new_post)
             
             log_audit(f"Post reposted", request, {
                 'original_post_id': post_id,
@@ -648,47 +620,51 @@ def post_repost(request, post_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def home_feed(request):
+    """Home timeline: posts of followed users and own posts"""
+    posts = home_feed_queryset(request.user).for_listing(request.user)
+    posts_page, pagination = paginate(request, posts)
+
+    log_api_request(f"Home feed viewed", request, {
+        'pagination': pagination
+    })
+
+    context = serializer_context(request)
+
+    return Response({
+        'success': True,
+        'posts': render_posts(posts_page, context),
+        'pagination': pagination,
+        **user_map_payload(context)
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def posts_by_category(request, category_id):
     """Get posts by category/room with pagination"""
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 20)), 100)
-    
     posts = Post.objects.filter(
         category=category_id,
         parent=None
-    ).select_related('author').prefetch_related(
-        'media', 'mentions', 'reactions'
-    ).order_by('-created_at')
+    ).for_listing(request.user)
     
-    paginator = Paginator(posts, per_page)
-    try:
-        posts_page = paginator.page(page)
-    except:
-        posts_page = paginator.page(1)
+    posts_page, pagination = paginate(request, posts)
     
     log_api_request(f"Posts by category viewed", request, {
         'category': category_id,
-        'page': page,
-        'per_page': per_page,
-        'total_posts': paginator.count
+        'pagination': pagination
     })
     
-    serializer = PostSerializer(posts_page, many=True, context={'request': request})
+    context = serializer_context(request)
     
     return Response({
         'success': True,
-        'posts': serializer.data,
+        'posts': render_posts(posts_page, context),
         'category': category_id,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': posts_page.has_next(),
-            'has_previous': posts_page.has_previous(),
-        }
+        'pagination': pagination,
+        **user_map_payload(context)
     }, status=status.HTTP_200_OK)
 
 
@@ -696,47 +672,30 @@ def posts_by_category(request, category_id):
 @permission_classes([AllowAny])
 def user_posts(request, username):
     """Get posts by specific user with pagination"""
-    user = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
-    
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 20)), 100)
+    user = get_object_or_404(User, username=username)
     
     posts = Post.objects.filter(
         author=user,
         parent=None
-    ).select_related('author').prefetch_related(
-        'media', 'mentions', 'reactions'
-    ).order_by('-created_at')
+    ).for_listing(request.user)
     
-    paginator = Paginator(posts, per_page)
-    try:
-        posts_page = paginator.page(page)
-    except:
-        posts_page = paginator.page(1)
+    posts_page, pagination = paginate(request, posts)
     
     log_api_request(f"User posts viewed", request, {
         'target_user': username,
-        'page': page,
-        'per_page': per_page,
-        'total_posts': paginator.count
+        'pagination': pagination
     })
     
     user_serializer = UserSerializer(user, context={'request': request})
-    posts_serializer = PostSerializer(posts_page, many=True, context={'request': request})
+    context = serializer_context(request)
     
     return Response({
         'success': True,
-        'posts': posts_serializer.data,
+        'posts': render_posts(posts_page, context),
         'username': username,
         'user': user_serializer.data,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': posts_page.has_next(),
-            'has_previous': posts_page.has_previous(),
-        }
+        'pagination': pagination,
+        **user_map_payload(context)
     }, status=status.HTTP_200_OK)
 
 
@@ -745,10 +704,7 @@ def user_posts(request, username):
 def post_thread(request, post_id):
     """Get post thread (post with all its replies)"""
     try:
-        post = get_object_or_404(
-            Post.objects.select_related('author').prefetch_related('media', 'mentions'),
-            id=post_id
-        )
+        post = get_object_or_404(Post.objects.for_listing(request.user), id=post_id)
         
         log_api_request(f"Post thread viewed", request, {
             'post_id': post_id,
@@ -757,19 +713,19 @@ def post_thread(request, post_id):
         })
         
         # Get post data
-        post_serializer = PostSerializer(post, context={'request': request})
+        context = serializer_context(request)
+        post_serializer = PostSerializer(post, context=context)
         data = post_serializer.data
         
         # Get replies with optimization
-        replies = post.replies.select_related('author').prefetch_related(
-            'media', 'mentions', 'reactions'
-        ).order_by('created_at')
-        replies_serializer = PostSerializer(replies, many=True, context={'request': request})
+        replies = post.replies.for_listing(request.user).order_by('created_at')
+        replies_serializer = PostSerializer(replies, many=True, context=context)
         data['replies'] = replies_serializer.data
         
         return Response({
             'success': True,
-            'thread': data
+            'thread': data,
+            **user_map_payload(context)
         }, status=status.HTTP_200_OK)
     except Exception as e:
         log_error(f"Post thread retrieval failed: {str(e)}", request, {'post_id': post_id})
@@ -853,38 +809,21 @@ def unsave_post(request, post_id):
 @permission_classes([IsAuthenticated])
 def saved_posts(request):
     """Get user's saved posts with pagination"""
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 20)), 100)
-    
-    saved_posts = request.user.saved_posts.filter(parent=None).select_related('author').prefetch_related(
-        'media', 'mentions', 'reactions'
-    ).order_by('-created_at')
+    saved_posts = request.user.saved_posts.filter(parent=None).for_listing(request.user)
     
-    paginator = Paginator(saved_posts, per_page)
-    try:
-        saved_posts_page = paginator.page(page)
-    except:
-        saved_posts_page = paginator.page(1)
+    saved_posts_page, pagination = paginate(request, saved_posts)
     
     log_info(f"Saved posts viewed", request, {
-        'page': page,
-        'per_page': per_page,
-        'total_saved': paginator.count
+        'pagination': pagination
     })
     
-    serializer = PostSerializer(saved_posts_page, many=True, context={'request': request})
+    context = serializer_context(request)
     
     return Response({
         'success': True,
-        'posts': serializer.data,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': saved_posts_page.has_next(),
-            'has_previous': saved_posts_page.has_previous(),
-        }
+        'posts': render_posts(saved_posts_page, context),
+        'pagination': pagination,
+        **user_map_payload(context)
     }, status=status.HTTP_200_OK)
 
 
@@ -941,6 +880,16 @@ def upload_category_format(request):
                 'message': 'Invalid JSON file'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # بررسی ساختار فرمت (الگو یا {"pattern", "type"} برای هر کلید)
+        try:
+            fields = parse_format(format_data)
+        except ValueError as e:
+            log_warning(f"Invalid format structure: {str(e)}", request)
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         # ایجاد یا آپدیت فرمت
         format_obj, created = CategoryFormat.objects.update_or_create(
             category=category,
@@ -950,12 +899,18 @@ def upload_category_format(request):
             }
         )
 
+        format_registry.invalidate(category)
+
+        # بازسازی ایندکس جستجوی attributes با فرمت جدید
+        indexed_count = reindex_category(category, fields)
+
         log_audit(f"Category format uploaded/updated", request, {
             'category': category,
             'created': created,
             'format_id': format_obj.id,
             'file_size': format_file.size,
-            'keys_count': len(format_data.keys()) if format_data else 0
+            'keys_count': len(format_data.keys()) if format_data else 0,
+            'indexed_attributes': indexed_count
         })
 
         serializer = CategoryFormatSerializer(format_obj, context={'request': request})
@@ -996,6 +951,8 @@ def delete_category_format(request, cat):
             }, status=status.HTTP_404_NOT_FOUND)
 
         format_obj.delete()
+        format_registry.invalidate(cat)
+        PostAttribute.objects.filter(category=cat).delete()
         
         log_audit(f"Category format deleted", request, {'category': cat})
         
@@ -1017,19 +974,9 @@ def delete_category_format(request, cat):
 def get_format(request, cat):
     """دریافت فایل فرمت برای یک دسته‌بندی (برای همه کاربران)"""
     try:
-        format_obj = CategoryFormat.objects.filter(category=cat).first()
-        
-        if not format_obj or not format_obj.format_file:
-            log_warning(f"Format requested for non-existent category", request, {'category': cat})
-            return Response({
-                'success': False,
-                'message': f'No format found for category: {cat}'
-            }, status=status.HTTP_404_NOT_FOUND)
-
-        # خواندن محتوای فایل JSON
+        # خواندن محتوای فایل JSON (از کش فرمت‌ها)
         try:
-            with open(format_obj.format_file.path, 'r', encoding='utf-8') as f:
-                format_data = json.load(f)
+            compiled = format_registry.get(cat)
         except Exception as e:
             log_error(f"Error reading format file: {str(e)}", request, {'category': cat})
             return Response({
@@ -1037,17 +984,26 @@ def get_format(request, cat):
                 'message': 'Error reading format file'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        if compiled is None:
+            log_warning(f"Format requested for non-existent category", request, {'category': cat})
+            return Response({
+                'success': False,
+                'message': f'No format found for category: {cat}'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        format_data = compiled.data
+
         log_info(f"Format file retrieved", request, {
             'category': cat,
             'keys_count': len(format_data.keys()) if format_data else 0,
-            'last_updated': format_obj.updated_at
+            'last_updated': compiled.updated_at
         })
 
         return Response({
             'success': True,
             'category': cat,
             'format': format_data,
-            'last_updated': format_obj.updated_at
+            'last_updated': compiled.updated_at
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -1061,11 +1017,7 @@ def get_format(request, cat):
 def get_format_data(cat):
     """تابع کمکی برای دریافت داده‌های فرمت از هر جای برنامه"""
     try:
-        format_obj = CategoryFormat.objects.filter(category=cat).first()
-        if format_obj and format_obj.format_file:
-            with open(format_obj.format_file.path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
+        return format_registry.data(cat)
     except Exception as e:
         log_error(f"Error in get_format_data for {cat}: {str(e)}")
         return None
\ No newline at end of file
@@ -14,6 +14,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 
+# نوشتن لاگ‌ها در thread پس‌زمینه (log_manager/pipeline.py)
+LOG_ASYNC = config('LOG_ASYNC', default=True, cast=bool)
+LOG_ASYNC_QUEUE_SIZE = config('LOG_ASYNC_QUEUE_SIZE', default=10000, cast=int)
+LOG_ASYNC_BATCH_SIZE = config('LOG_ASYNC_BATCH_SIZE', default=500, cast=int)
+LOG_ASYNC_FLUSH_INTERVAL = config('LOG_ASYNC_FLUSH_INTERVAL', default=0.5, cast=float)
+# 'text' یا 'json' (JSON-lines + ایندکس کناری برای خواندن سریع در log_manager)
+LOG_FORMAT = config('LOG_FORMAT', default='text')
+# ایندکس فعالیت کاربران برای my-activity (log_manager/activity.py)؛ نوشتن زیر قفل فایل لاگ است و با
+# چند worker هم درست می‌ماند. با False، my-activity به اسکن فایل برمی‌گردد
+LOG_ACTIVITY_INDEX = config('LOG_ACTIVITY_INDEX', default=True, cast=bool)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -89,6 +100,7 @@ INSTALLED_APPS = [
     "messaging",
     "wallet",
     "log_manager",
+    "uploads",
 
     "django.contrib.admin",
     "django.contrib.auth",
@@ -167,6 +179,35 @@ STATIC_ROOT = "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "media"
 
+# سرو مدیا (uploads/serving.py): 'nginx' → X-Accel-Redirect، 'apache' → X-Sendfile، خالی → خود Django با Range
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default='')
+# location داخلی nginx که به MEDIA_ROOT اشاره می‌کند
+MEDIA_SENDFILE_URL_PREFIX = config('MEDIA_SENDFILE_URL_PREFIX', default='/protected-media/')
+
+# فایل‌های آپلودی با sha256 محتوا ذخیره می‌شوند (تکراری‌ها یک بار، آدرس‌های immutable)
+STORAGES = {
+    "default": {"BACKEND": "uploads.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# fan-out پست‌های تازه به تایم‌لاین دنبال‌کننده‌ها در thread پس‌زمینه‌ی همین پروسه (posts/feed.py)؛
+# با False بلافاصله بعد از commit در همان درخواست انجام می‌شود
+FEED_FANOUT_IN_PROCESS = config('FEED_FANOUT_IN_PROCESS', default=True, cast=bool)
+
+# ساخت نسخه‌های کوچک‌تر تصاویر در thread پس‌زمینه‌ی همین پروسه (posts/processing.py)؛
+# با False فقط دستور process_media (مثلا با --loop به عنوان worker جدا) آن‌ها را پردازش می‌کند
+MEDIA_PROCESSING_IN_PROCESS = config('MEDIA_PROCESSING_IN_PROCESS', default=True, cast=bool)
+
+# فایل‌های نیمه‌کاره‌ی آپلود تکه‌تکه (uploads)؛ بیرون از MEDIA_ROOT تا عمومی سرو نشوند
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'uploads_partial'))
+
+# WebSocket پیام‌رسانی (messaging/realtime.py)؛ LocalBroker فقط اتصال‌های همان پروسه را دارد
+MESSAGING_BROKER = config('MESSAGING_BROKER', default='messaging.realtime.LocalBroker')
+# بیشترین رویداد ارسال نشده برای یک اتصال؛ کلاینت کندتر از این قطع می‌شود
+MESSAGING_WS_MAX_QUEUE = config('MESSAGING_WS_MAX_QUEUE', default=256, cast=int)
+# نگهداری ردپای پیام‌های حذف شده برای sync؛ توکن‌های قدیمی‌تر 410 می‌گیرند (prune_message_tombstones)
+MESSAGE_TOMBSTONE_DAYS = config('MESSAGE_TOMBSTONE_DAYS', default=30, cast=int)
+
 # Default primary key
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -181,11 +222,12 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    # orjson در صورت نصب بودن، با خروجی یکسان با JSONRenderer/JSONParser (core/renderers.py)
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "core.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "core.renderers.FastJSONParser",
         "rest_framework.parsers.MultiPartParser",
         "rest_framework.parsers.FormParser",
     ],
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['follower', 'created_at', 'id'], name='user_follow_followe_afac16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['following', 'created_at', 'id'], name='user_follow_followi_df2aa0_idx'),
+        ),
+    ]
@@ -9,6 +9,11 @@ class UserFollow(models.Model):
 
     class Meta:
         unique_together = ('follower', 'following')
+        indexes = [
+            # صفحه‌بندی cursor لیست دنبال‌کننده‌ها/دنبال‌شده‌ها
+            models.Index(fields=['follower', 'created_at', 'id']),
+            models.Index(fields=['following', 'created_at', 'id']),
+        ]
         db_table = 'user_followers'
 
     def __str__(self):
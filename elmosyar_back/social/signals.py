@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+
+from core.counters import adjust_counter
+from .models import UserFollow
+
+
+@receiver(post_save, sender=UserFollow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        User = get_user_model()
+        adjust_counter(User, instance.follower_id, 'following_count', 1)
+        adjust_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=UserFollow)
+def follow_deleted(sender, instance, **kwargs):
+    User = get_user_model()
+    adjust_counter(User, instance.follower_id, 'following_count', -1)
+    adjust_counter(User, instance.following_id, 'followers_count', -1)
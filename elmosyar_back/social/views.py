@@ -4,15 +4,13 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.db.models import F
-from django.core.paginator import Paginator
 
+from accounts.models import User
 from accounts.serializers import UserSerializer
+from core.pagination import paginate
 from .models import UserFollow
 from notifications.models import Notification
 
-import settings
-
 # جایگزین کردن لاگر قدیمی
 from log_manager.log_config import log_info, log_error, log_warning, log_audit
 
@@ -26,7 +24,7 @@ def follow_user(request, username):
     """Follow a user"""
     try:
         with transaction.atomic():
-            user_to_follow = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
+            user_to_follow = get_object_or_404(User, username=username)
             
             if user_to_follow == request.user:
                 log_warning(f"User attempted to follow themselves", request)
@@ -42,17 +40,9 @@ def follow_user(request, username):
                     'message': f'You are already following {username}'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Create follow relationship
+            # Create follow relationship (counts are updated atomically by social/signals.py)
             UserFollow.objects.create(follower=request.user, following=user_to_follow)
             
-            # Update counts using F() to prevent race condition
-            settings.AUTH_USER_MODEL.objects.filter(id=request.user.id).update(
-                following_count=F('following_count') + 1
-            )
-            settings.AUTH_USER_MODEL.objects.filter(id=user_to_follow.id).update(
-                followers_count=F('followers_count') + 1
-            )
-            
             # Create notification
             Notification.objects.create(
                 recipient=user_to_follow,
@@ -89,7 +79,7 @@ def unfollow_user(request, username):
     """Unfollow a user"""
     try:
         with transaction.atomic():
-            user_to_unfollow = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
+            user_to_unfollow = get_object_or_404(User, username=username)
             
             follow_relation = UserFollow.objects.filter(
                 follower=request.user, 
@@ -103,16 +93,9 @@ def unfollow_user(request, username):
                     'message': f'You are not following {username}'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Counts are updated atomically by social/signals.py
             follow_relation.delete()
             
-            # Update counts using F() to prevent race condition
-            settings.AUTH_USER_MODEL.objects.filter(id=request.user.id).update(
-                following_count=F('following_count') - 1
-            )
-            settings.AUTH_USER_MODEL.objects.filter(id=user_to_unfollow.id).update(
-                followers_count=F('followers_count') - 1
-            )
-            
             # Refresh user to get updated counts
             user_to_unfollow.refresh_from_db()
             
@@ -139,23 +122,15 @@ def unfollow_user(request, username):
 @permission_classes([AllowAny])
 def user_followers(request, username):
     """Get user's followers with pagination"""
-    user = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
+    user = get_object_or_404(User, username=username)
     
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 50)), 100)
+    followers = UserFollow.objects.filter(following=user).select_related('follower')
+    followers_page, pagination = paginate(request, followers, default_per_page=50)
     
-    followers = user.followers.select_related('follower')
-    paginator = Paginator(followers, per_page)
-    
-    try:
-        followers_page = paginator.page(page)
-    except:
-        followers_page = paginator.page(1)
-    
-    log_info(f"Followers list viewed for {username} page {page}", request, {
+    log_info(f"Followers list viewed for {username}", request, {
         'target_user': username,
-        'total_followers': paginator.count,
-        'page': page
+        'total_followers': user.followers_count,
+        'pagination': pagination
     })
     
     # Extract user objects from follow relationships
@@ -165,14 +140,7 @@ def user_followers(request, username):
     return Response({
         'success': True,
         'followers': serializer.data,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': followers_page.has_next(),
-            'has_previous': followers_page.has_previous(),
-        }
+        'pagination': pagination
     }, status=status.HTTP_200_OK)
 
 
@@ -180,23 +148,15 @@ def user_followers(request, username):
 @permission_classes([AllowAny])
 def user_following(request, username):
     """Get users that this user is following with pagination"""
-    user = get_object_or_404(settings.AUTH_USER_MODEL, username=username)
+    user = get_object_or_404(User, username=username)
     
-    page = int(request.GET.get('page', 1))
-    per_page = min(int(request.GET.get('per_page', 50)), 100)
-    
-    following = user.following.select_related('following')
-    paginator = Paginator(following, per_page)
-    
-    try:
-        following_page = paginator.page(page)
-    except:
-        following_page = paginator.page(1)
+    following = UserFollow.objects.filter(follower=user).select_related('following')
+    following_page, pagination = paginate(request, following, default_per_page=50)
     
-    log_info(f"Following list viewed for {username} page {page}", request, {
+    log_info(f"Following list viewed for {username}", request, {
         'target_user': username,
-        'total_following': paginator.count,
-        'page': page
+        'total_following': user.following_count,
+        'pagination': pagination
     })
     
     # Extract user objects from follow relationships
@@ -206,12 +166,5 @@ def user_following(request, username):
     return Response({
         'success': True,
         'following': serializer.data,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': paginator.num_pages,
-            'total_count': paginator.count,
-            'has_next': following_page.has_next(),
-            'has_previous': following_page.has_previous(),
-        }
+        'pagination': pagination
     }, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import Upload
+
+# =====================================================
+# Upload Admin
+# =====================================================
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'purpose', 'filename', 'offset', 'size', 'status', 'created_at']
+    list_filter = ['purpose', 'status', 'created_at']
+    search_fields = ['user__username', 'filename']
+    readonly_fields = ['id', 'offset', 'checksum', 'created_at', 'updated_at']
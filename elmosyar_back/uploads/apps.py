@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class UploadsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'uploads'
+
+    def ready(self):
+        from uploads.blobs import connect_signals
+        connect_signals()
@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db.models import F, Value
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.utils import timezone
+
+from .models import Blob
+from .storage import is_blob_name
+
+
+# فیلدهای فایلی که به blobها ارجاع می‌دهند: (مدل، فیلد)
+BLOB_FIELDS = (
+    ('posts.PostMedia', 'file'),
+    ('posts.CategoryFormat', 'format_file'),
+    ('messaging.Message', 'image'),
+    ('messaging.Message', 'file'),
+    ('accounts.User', 'profile_picture'),
+)
+
+_STATE_ATTR = '_blob_names'
+
+
+def _adjust(names, delta):
+    names = [name for name in names if is_blob_name(name)]
+    if names:
+        Blob.objects.filter(name__in=names).update(
+            ref_count=Greatest(F('ref_count') + delta, Value(0)), updated_at=timezone.now()
+        )
+
+
+def retain(*names):
+    """افزودن یک ارجاع به هر نام (نام‌های غیر blob نادیده گرفته می‌شوند)"""
+    _adjust(names, 1)
+
+
+def release(*names):
+    """
+    کم کردن یک ارجاع؛ فایل همین‌جا حذف نمی‌شود تا rollback تراکنش آن را از دست ندهد
+    (gc_blobs blobهای بی‌ارجاع را بعد از مهلت پاک می‌کند)
+    فایل‌های قدیمی بیرون از blobs/ مثل قبل بلافاصله حذف می‌شوند.
+    """
+    _adjust(names, -1)
+    for name in names:
+        if name and not is_blob_name(name):
+            default_storage.delete(name)
+
+
+def blob_fields_by_model():
+    fields = {}
+    for label, field in BLOB_FIELDS:
+        fields.setdefault(apps.get_model(label), []).append(field)
+    return fields
+
+
+def _stored_name(instance, field):
+    """نامی که در دیتابیس است یا بعد از save خواهد بود؛ فایل تازه‌ی هنوز ذخیره نشده '' است"""
+    value = instance.__dict__.get(field)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, FieldFile) and value._committed:
+        return value.name or ''
+    return ''
+
+
+def _remember(instance, fields):
+    # فیلد defer شده (only/defer) هنوز معلوم نیست: None
+    setattr(instance, _STATE_ATTR, {
+        field: _stored_name(instance, field) if field in instance.__dict__ else None for field in fields
+    })
+
+
+def connect_signals():
+    """نگه داشتن نام فعلی هر فیلد از لحظه‌ی ساخت نمونه و به‌روزرسانی ارجاع‌ها بعد از save/delete"""
+    for model, fields in blob_fields_by_model().items():
+
+        def initialized(sender, instance, fields=fields, **kwargs):
+            _remember(instance, fields)
+
+        def saving(sender, instance, fields=fields, **kwargs):
+            previous = getattr(instance, _STATE_ATTR, {})
+            unknown = [field for field in fields if previous.get(field, '') is None]
+            if unknown and instance.pk is not None:
+                row = sender._default_manager.filter(pk=instance.pk).values(*unknown).first() or {}
+                previous.update({field: row.get(field) or '' for field in unknown})
+
+        def saved(sender, instance, fields=fields, **kwargs):
+            previous = getattr(instance, _STATE_ATTR, {})
+            for field in fields:
+                old, new = previous.get(field) or '', _stored_name(instance, field)
+                if old != new:
+                    retain(new)
+                    release(old)
+            _remember(instance, fields)
+
+        def deleted(sender, instance, fields=fields, **kwargs):
+            previous = getattr(instance, _STATE_ATTR, {})
+            release(*(previous.get(field) or _stored_name(instance, field) for field in fields))
+
+        uid = f'blob-refs-{model._meta.label_lower}'
+        post_init.connect(initialized, sender=model, weak=False, dispatch_uid=uid)
+        pre_save.connect(saving, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.core.files import locks
+from django.core.files.uploadedfile import UploadedFile
+
+from .models import Upload
+
+
+READ_BLOCK_SIZE = 64 * 1024
+# تعداد hasherهای نیمه‌کاره که در حافظه‌ی پروسه نگه داشته می‌شوند
+HASHER_CACHE_SIZE = 256
+
+
+class UploadError(Exception):
+    """آپلود وجود ندارد، کامل نشده یا برای این کاربر/هدف نیست"""
+
+
+class _HasherCache:
+    """
+    sha256 نیمه‌کاره‌ی هر آپلود تا هر تکه فقط یک بار هش شود
+    وضعیت hashlib قابل ذخیره در دیتابیس نیست؛ اگر تکه‌ی بعدی به پروسه‌ی دیگری برسد
+    (یا پروسه ری‌استارت شده باشد) بخش نوشته شده یک بار از روی دیسک دوباره هش می‌شود.
+    """
+
+    def __init__(self, size=HASHER_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, upload_id, offset):
+        with self._lock:
+            item = self._items.pop(upload_id, None)
+        if item is not None and item[0] == offset:
+            return item[1]
+        return None
+
+    def put(self, upload_id, offset, hasher):
+        with self._lock:
+            self._items[upload_id] = (offset, hasher)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def discard(self, upload_id):
+        with self._lock:
+            self._items.pop(upload_id, None)
+
+
+hashers = _HasherCache()
+
+
+def _hash_prefix(f, length):
+    hasher = hashlib.sha256()
+    f.seek(0)
+    remaining = length
+    while remaining > 0:
+        block = f.read(min(READ_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        hasher.update(block)
+        remaining -= len(block)
+    return hasher
+
+
+def create_part_file(upload):
+    os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+    open(upload.part_path, 'wb').close()
+
+
+def write_chunk(upload, stream, length):
+    """
+    نوشتن یک تکه از stream درخواست از upload.offset؛ حافظه‌ی مصرفی یک بلاک ۶۴ کیلوبایتی است
+    خروجی: offset جدید یا None اگر همزمان درخواست دیگری همین بازه را نوشته باشد
+
+    اگر اتصال وسط تکه قطع شود بایت‌های رسیده نگه داشته می‌شوند و کلاینت از offset جدید ادامه می‌دهد.
+    """
+    start = upload.offset
+    with open(upload.part_path, 'r+b') as f:
+        # قفل فایل تا دو درخواست همزمان روی یک آپلود داده‌ی هم را خراب نکنند
+        locks.lock(f, locks.LOCK_EX)
+        try:
+            if Upload.objects.filter(id=upload.id).values_list('offset', flat=True).first() != start:
+                return None
+
+            hasher = hashers.take(upload.id, start) or _hash_prefix(f, start)
+            f.seek(start)
+            received = 0
+            while received < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                received += len(block)
+            f.truncate()
+            f.flush()
+
+            offset = start + received
+            fields = {'offset': offset}
+            if offset == upload.size:
+                fields.update(status=Upload.STATUS_COMPLETE, checksum=hasher.hexdigest())
+                hashers.discard(upload.id)
+            else:
+                hashers.put(upload.id, offset, hasher)
+            Upload.objects.filter(id=upload.id, offset=start).update(**fields)
+        finally:
+            locks.unlock(f)
+
+    for field, value in fields.items():
+        setattr(upload, field, value)
+    return offset
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """
+    فایل یک آپلود کامل شده برای FileField؛ چون temporary_file_path دارد
+    FileSystemStorage آن را با rename جابه‌جا می‌کند (بدون کپی یا خواندن در حافظه)
+    checksum همان sha256 محاسبه شده هنگام آپلود است.
+    """
+
+    def __init__(self, upload):
+        super().__init__(open(upload.part_path, 'rb'), upload.filename, upload.content_type, upload.size, None)
+        self.path = upload.part_path
+        self.checksum = upload.checksum
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # فایل به storage منتقل شده است
+            pass
+
+
+def upload_ids_from(data, key='upload_ids'):
+    """idهای آپلود از بدنه‌ی JSON (لیست) یا multipart (چند مقدار یا جدا شده با کاما)"""
+    values = data.getlist(key) if hasattr(data, 'getlist') else data.get(key)
+    if values is None:
+        return []
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    ids = []
+    for value in values:
+        ids.extend(part.strip() for part in str(value).split(',') if part.strip())
+    return ids
+
+
+def claim_uploads(user, upload_ids, purpose, max_size=None):
+    """
+    آپلودهای کامل شده‌ی کاربر برای این هدف به صورت فایل‌های قابل ذخیره در FileField
+    اول همه بررسی می‌شوند (از جمله سقف حجم max_size) و بعد ردیف‌های Upload حذف می‌شوند؛
+    پس UploadError چیزی را مصرف نمی‌کند و فایلی باز نمی‌ماند
+    (حذف داخل تراکنش view است و با rollback برمی‌گردد)
+    """
+    uploads = []
+    for upload_id in upload_ids:
+        try:
+            upload_id = uuid.UUID(str(upload_id))
+        except ValueError:
+            raise UploadError('Upload not found')
+        upload = Upload.objects.filter(id=upload_id, user=user, purpose=purpose).first()
+        if upload is None:
+            raise UploadError('Upload not found')
+        if not upload.is_complete:
+            raise UploadError('Upload is not complete')
+        if not os.path.isfile(upload.part_path):
+            raise UploadError('Upload data is missing')
+        if max_size is not None and upload.size > max_size:
+            raise UploadError(f'Upload is too large (max {max_size // (1024 * 1024)}MB)')
+        uploads.append(upload)
+
+    Upload.objects.filter(id__in=[upload.id for upload in uploads]).delete()
+    return [ChunkedUploadedFile(upload) for upload in uploads]
@@ -0,0 +1,41 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that were never finished or never attached, and orphaned partial files (suitable for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=24,
+            help='Remove uploads not touched for this many hours'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = Upload.objects.filter(updated_at__lt=cutoff)
+        removed = 0
+        for upload in stale.iterator():
+            upload.delete()
+            removed += 1
+
+        # فایل‌هایی که ردیفشان دیگر وجود ندارد (مثلا rollback بعد از وصل شدن آپلود)
+        orphaned = 0
+        directory = settings.CHUNKED_UPLOAD_DIR
+        if os.path.isdir(directory):
+            known = {f'{upload_id}.part' for upload_id in Upload.objects.values_list('id', flat=True)}
+            for file_name in os.listdir(directory):
+                path = os.path.join(directory, file_name)
+                if file_name not in known and os.path.getmtime(path) < cutoff.timestamp():
+                    os.remove(path)
+                    orphaned += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{removed} stale upload(s) and {orphaned} orphaned file(s) removed"
+        ))
@@ -0,0 +1,90 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import PostMedia
+from uploads.blobs import blob_fields_by_model
+from uploads.models import Blob
+from uploads.storage import BLOB_PREFIX, is_blob_name
+
+
+def actual_references():
+    """شمارش ارجاع واقعی هر blob از روی ستون‌های فایل و نسخه‌های PostMedia"""
+    references = Counter()
+    for model, fields in blob_fields_by_model().items():
+        for field in fields:
+            names = model._default_manager.filter(**{f'{field}__startswith': BLOB_PREFIX}).values_list(field, flat=True)
+            references.update(names.iterator())
+    for variants in PostMedia.objects.exclude(variants={}).values_list('variants', flat=True).iterator():
+        references.update({variant['name'] for variant in variants.values() if is_blob_name(variant['name'])})
+    return references
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed blobs that no file field references any more (suitable for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Only collect blobs unreferenced for at least this long (uploads in flight keep ref_count 0 briefly)'
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recompute ref_count from the file columns before collecting (fixes drift from bulk updates)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        if options['recount']:
+            references = actual_references()
+            fixed = 0
+            with transaction.atomic():
+                for blob in Blob.objects.select_for_update().only('id', 'name', 'ref_count').iterator():
+                    actual = references.get(blob.name, 0)
+                    if blob.ref_count != actual:
+                        fixed += 1
+                        if not dry_run:
+                            Blob.objects.filter(id=blob.id).update(ref_count=actual, updated_at=timezone.now())
+            self.stdout.write(f"{fixed} blob ref_count value(s) {'drifted' if dry_run else 'fixed'}")
+
+        removed = freed = 0
+        storage = default_storage
+        for blob in Blob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff).iterator():
+            removed += 1
+            freed += blob.size
+            if dry_run:
+                continue
+            with transaction.atomic():
+                # ممکن است همین حالا دوباره آپلود (updated_at تازه) و ارجاع داده شده باشد
+                if Blob.objects.filter(id=blob.id, ref_count__lte=0, updated_at__lt=cutoff).delete()[0]:
+                    storage.purge(blob.name)
+
+        # فایل‌هایی که ردیف Blob ندارند (تراکنش آپلود rollback شده)
+        orphaned = 0
+        root = storage.path(BLOB_PREFIX)
+        if os.path.isdir(root):
+            known = set(Blob.objects.values_list('name', flat=True))
+            for directory, _, file_names in os.walk(root):
+                for file_name in file_names:
+                    path = os.path.join(directory, file_name)
+                    name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                    if name not in known and os.path.getmtime(path) < cutoff.timestamp():
+                        orphaned += 1
+                        if not dry_run:
+                            os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{removed} unreferenced blob(s) ({freed} bytes) and {orphaned} orphaned file(s) "
+            f"{'would be removed' if dry_run else 'removed'}"
+        ))
@@ -0,0 +1,87 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class Upload(models.Model):
+    """
+    آپلود تکه‌تکه و قابل ادامه (uploads/views.py)
+
+    داده‌ها در فایل <CHUNKED_UPLOAD_DIR>/<id>.part نوشته می‌شوند و offset تعداد بایت‌های
+    دریافت شده است. آپلود کامل شده با id به پست، پیام یا عکس پروفایل وصل می‌شود
+    و فایل بدون کپی به storage منتقل می‌شود.
+    """
+    PURPOSE_POST_MEDIA = 'post_media'
+    PURPOSE_MESSAGE = 'message'
+    PURPOSE_PROFILE_PICTURE = 'profile_picture'
+    PURPOSE_CHOICES = [
+        (PURPOSE_POST_MEDIA, "Post media"),
+        (PURPOSE_MESSAGE, "Message attachment"),
+        (PURPOSE_PROFILE_PICTURE, "Profile picture"),
+    ]
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, "Uploading"),
+        (STATUS_COMPLETE, "Complete"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()  # حجم کل اعلام شده؛ هیچ تکه‌ای از آن عبور نمی‌کند
+    offset = models.PositiveBigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)  # sha256، بعد از کامل شدن
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'upload'
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.purpose}, {self.offset}/{self.size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.id}.part')
+
+    @property
+    def is_complete(self):
+        return self.status == self.STATUS_COMPLETE
+
+    def delete(self, *args, **kwargs):
+        """حذف فایل نیمه‌کاره همراه ردیف"""
+        if os.path.isfile(self.part_path):
+            os.remove(self.part_path)
+        super().delete(*args, **kwargs)
+
+
+class Blob(models.Model):
+    """
+    یک فایل در storage محتوا-محور (uploads/storage.py): blobs/<sha[:2]>/<sha256><ext>
+
+    ref_count تعداد فیلدهای فایل (و نسخه‌های PostMedia) است که به این نام اشاره می‌کنند
+    و داخل همان تراکنش save/delete مدل‌ها تغییر می‌کند (uploads/blobs.py).
+    blobهای بدون ارجاع را دستور gc_blobs بعد از یک مهلت پاک می‌کند.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'blob'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),  # پیدا کردن blobهای بی‌ارجاع در gc
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
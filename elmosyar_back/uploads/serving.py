@@ -0,0 +1,158 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import BLOB_PREFIX, is_blob_name
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# فایل‌های قبل از storage محتوا-محور ممکن است حذف شوند؛ کش کوتاه‌تر
+MUTABLE_CACHE_CONTROL = 'public, max-age=86400'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_BLOB_SHA_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def stored_checksum(name):
+    """sha256 ذخیره شده‌ی یک فایل مدیا (از نام blob یا ستون checksum مدیای پست)؛ None اگر معلوم نباشد"""
+    if is_blob_name(name):
+        sha256 = os.path.splitext(os.path.basename(name))[0]
+        return sha256 if _BLOB_SHA_RE.match(sha256) else None
+    from posts.models import PostMedia
+
+    return PostMedia.objects.filter(file=name).exclude(checksum='').values_list('checksum', flat=True).first()
+
+
+def parse_range(header, size):
+    """
+    یک بازه‌ی bytes=start-end → (start, end) شامل end
+    None: هدر نامعتبر یا چند بازه (کل فایل فرستاده می‌شود)، False: بازه خارج از فایل (416)
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N یعنی N بایت آخر
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+class _RangeFile:
+    """فقط length بایت از فایل باز شده از start به بعد (برای FileResponse بدون خواندن کل فایل)"""
+
+    def __init__(self, f, start, length):
+        f.seek(start)
+        self.file = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class MediaFileResponse(FileResponse):
+    block_size = STREAM_BLOCK_SIZE
+
+
+def _offload_response(name, path):
+    """پاسخ خالی با هدر X-Accel-Redirect (nginx) یا X-Sendfile (apache/lighttpd)"""
+    response = HttpResponse()
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend == 'nginx':
+        response['X-Accel-Redirect'] = settings.MEDIA_SENDFILE_URL_PREFIX.rstrip('/') + '/' + name
+    else:
+        response['X-Sendfile'] = path
+    # Content-Type را وب‌سرور از روی فایل تعیین کند
+    del response['Content-Type']
+    return response
+
+
+def file_response(request, path, name, etag=None, immutable=False, content_type=None):
+    """
+    پاسخ فایل با Range، درخواست‌های شرطی (ETag / Last-Modified) و هدرهای کش
+    با MEDIA_SENDFILE_BACKEND خود بایت‌ها را وب‌سرور جلویی می‌فرستد (Range را هم خودش پاسخ می‌دهد)
+    """
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('File not found')
+    if not os.path.isfile(path):
+        raise Http404('File not found')
+
+    etag = quote_etag(etag) if etag else f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        conditional['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL
+        return conditional
+
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    size = stat.st_size
+
+    if settings.MEDIA_SENDFILE_BACKEND:
+        response = _offload_response(name, path)
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        # Range ساده همیشه؛ با If-Range فقط اگر همان ETag قوی باشد، وگرنه کل فایل (RFC 9110)
+        if range_header and (if_range is None or (if_range == etag and not etag.startswith('W/'))):
+            byte_range = parse_range(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        f = open(path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            response = MediaFileResponse(_RangeFile(f, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = MediaFileResponse(f, content_type=content_type)
+            response['Content-Length'] = str(size)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """سرو فایل‌های MEDIA_ROOT (جایگزین django.conf.urls.static که فقط در DEBUG فعال بود)"""
+    name = path.replace('\\', '/').lstrip('/')
+    if not name or name.startswith(f'{BLOB_PREFIX}tmp/'):
+        raise Http404('File not found')
+    try:
+        full_path = safe_join(default_storage.location, name)
+    except Exception:
+        raise Http404('File not found')
+    return file_response(request, full_path, name, etag=stored_checksum(name), immutable=is_blob_name(name))
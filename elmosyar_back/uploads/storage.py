@@ -0,0 +1,80 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+
+BLOB_PREFIX = 'blobs/'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(sha256, original_name):
+    extension = os.path.splitext(original_name or '')[1].lower()[:10]
+    return f'{BLOB_PREFIX}{sha256[:2]}/{sha256}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage که هر فایل جدید را با sha256 محتوایش ذخیره می‌کند:
+    blobs/ab/ab12...ef.jpg
+
+    - فایل تکراری دوباره نوشته نمی‌شود و همان نام قبلی برمی‌گردد
+    - محتوای یک نام هیچ‌وقت عوض نمی‌شود، پس آدرس‌ها برای کش دائمی (immutable) مناسب‌اند
+    - delete روی blobها کاری نمی‌کند؛ ارجاع‌ها با سیگنال‌ها شمرده می‌شوند (uploads/blobs.py)
+      و فایل را فقط gc_blobs با purge پاک می‌کند
+    - فایل‌های قدیمی با نام‌های upload_to مثل قبل خوانده و حذف می‌شوند
+    """
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        sha256 = getattr(content, 'checksum', None) or self._hash(content)
+        name = blob_name(sha256, name)
+
+        # اول ردیف Blob لمس می‌شود: updated_at تازه نمی‌گذارد gc_blobs تا retain همین آپلود
+        # (در post_save) این blob بی‌ارجاع را پاک کند؛ اگر gc همین حالا در حال حذفش باشد این UPDATE
+        # تا پایان تراکنش آن صبر می‌کند و 0 برمی‌گرداند و فایل دوباره نوشته می‌شود
+        known = Blob.objects.filter(name=name).update(updated_at=timezone.now())
+        if not known or not self.exists(name):
+            # نوشتن با نام موقت و rename اتمیک؛ دو آپلود همزمان یک محتوا فقط همدیگر را جایگزین می‌کنند
+            temp_name = super()._save(f'{BLOB_PREFIX}tmp/{uuid.uuid4().hex}', content)
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            os.replace(self.path(temp_name), self.path(name))
+        elif hasattr(content, 'temporary_file_path'):
+            # فایل موقت آپلود (یا آپلود تکه‌تکه) لازم نیست؛ نسخه‌ی موجود استفاده می‌شود
+            try:
+                os.remove(content.temporary_file_path())
+            except FileNotFoundError:
+                pass
+
+        if not known:
+            Blob.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': self.size(name)})
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        if is_blob_name(name) and not name.startswith(f'{BLOB_PREFIX}tmp/'):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def delete(self, name):
+        if is_blob_name(name):
+            return
+        super().delete(name)
+
+    def purge(self, name):
+        """حذف واقعی فایل یک blob (فقط از gc_blobs)"""
+        super().delete(name)
+
+    def _hash(self, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()
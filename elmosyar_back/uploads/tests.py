@@ -0,0 +1,349 @@
+import hashlib
+import os
+import tracemalloc
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PIL import Image
+
+from core.testing import TempMediaRootMixin
+from messaging.models import Conversation, Message
+from posts.models import Post, PostMedia
+from . import files as upload_files
+from .models import Blob, Upload
+
+
+User = get_user_model()
+
+class ChunkedUploadTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="uploader", email="uploader@example.com", password="1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, data, purpose='post_media', filename='clip.mp4', content_type='video/mp4'):
+        return self.client.post('/api/uploads/', {
+            'filename': filename, 'size': len(data), 'content_type': content_type, 'purpose': purpose
+        }, format='json')
+
+    def send(self, upload_id, chunk, offset):
+        return self.client.generic('PATCH', f'/api/uploads/{upload_id}/', chunk,
+                                   content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def upload(self, data, chunk_size=1000, **kwargs):
+        upload_id = self.start(data, **kwargs).json()['upload']['id']
+        for offset in range(0, len(data), chunk_size):
+            response = self.send(upload_id, data[offset:offset + chunk_size], offset)
+            self.assertEqual(response.status_code, 200)
+        return upload_id, response.json()['upload']
+
+    def test_chunks_resume_and_attach_to_post(self):
+        data = os.urandom(2500)
+        upload_id = self.start(data).json()['upload']['id']
+        self.assertEqual(self.send(upload_id, data[:1000], 0).json()['upload']['offset'], 1000)
+
+        # تکه‌ی تکراری یا با offset اشتباه پذیرفته نمی‌شود؛ کلاینت با GET ادامه را پیدا می‌کند
+        self.assertEqual(self.send(upload_id, data[:1000], 0).status_code, 409)
+        offset = self.client.get(f'/api/uploads/{upload_id}/').json()['upload']['offset']
+        # hasher در حافظه نیست (پروسه‌ی دیگر یا ری‌استارت): بخش قبلی از دیسک هش می‌شود
+        upload_files.hashers.discard(uuid.UUID(upload_id))
+        upload = self.send(upload_id, data[offset:], offset).json()['upload']
+        self.assertEqual(upload['status'], 'complete')
+
+        response = self.client.post('/api/posts/', {
+            'content': 'clip', 'category': 'general', 'upload_ids': [upload_id]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        media = PostMedia.objects.get(post_id=response.json()['post']['id'])
+        self.assertEqual(media.media_type, 'video')
+        self.assertEqual(media.checksum, hashlib.sha256(data).hexdigest())
+        with media.file.open('rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_DIR), [])
+
+        # یک آپلود فقط یک بار وصل می‌شود
+        response = self.client.post('/api/posts/', {
+            'content': 'again', 'category': 'general', 'upload_ids': [upload_id]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_uploads_rejected_early(self):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'big.bin', 'size': 20 * 1024 * 1024, 'purpose': 'post_media'
+        }, format='json')
+        self.assertEqual(response.status_code, 413)
+
+        upload_id = self.start(b'x' * 100).json()['upload']['id']
+        self.assertEqual(self.send(upload_id, b'x' * 101, 0).status_code, 413)
+        self.assertFalse(Upload.objects.exists())
+
+    def test_claimed_upload_over_the_post_limit_is_rejected(self):
+        upload_id, _ = self.upload(os.urandom(2500))
+        # سقف حجم بعد از شروع آپلود کم شده است
+        with mock.patch('posts.views.MAX_MEDIA_FILE_SIZE', 2000):
+            response = self.client.post('/api/posts/', {
+                'content': 'clip', 'category': 'general', 'upload_ids': [upload_id]
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+        # آپلود مصرف نشده و می‌شود با سقف درست دوباره فرستاد
+        upload = Upload.objects.get(id=upload_id)
+        self.assertTrue(os.path.isfile(upload.part_path))
+
+    def test_incomplete_or_foreign_upload_cannot_be_attached(self):
+        upload_id = self.start(b'x' * 100).json()['upload']['id']
+        self.send(upload_id, b'x' * 50, 0)
+        response = self.client.post('/api/posts/', {
+            'content': 'clip', 'category': 'general', 'upload_ids': [upload_id]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="1234")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').status_code, 404)
+
+    def test_message_attachment_and_profile_picture(self):
+        friend = User.objects.create_user(username="friend", email="friend@example.com", password="1234")
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, friend)
+
+        upload_id, _ = self.upload(b'%PDF-1.4 ' * 300, purpose='message', filename='doc.pdf',
+                                   content_type='application/pdf')
+        response = self.client.post(f'/api/conversations/{conversation.id}/send/', {'upload_id': upload_id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get()
+        self.assertTrue(message.file.name.endswith('.pdf'))
+        self.assertFalse(message.image)
+
+        image = BytesIO()
+        Image.new('RGB', (10, 10)).save(image, format='PNG')
+        upload_id, _ = self.upload(image.getvalue(), purpose='profile_picture', filename='me.png',
+                                   content_type='image/png')
+        response = self.client.post('/api/profile/update-picture/', {'upload_id': upload_id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        with self.user.profile_picture.open('rb') as f:
+            self.assertEqual(f.read(), image.getvalue())
+
+    def test_chunk_streaming_memory_is_flat(self):
+        size = 8 * 1024 * 1024
+        upload = Upload.objects.create(user=self.user, purpose='post_media', filename='big.bin', size=size)
+        upload_files.create_part_file(upload)
+
+        class Stream:
+            remaining = size
+
+            def read(self, n):
+                n = min(n, self.remaining)
+                self.remaining -= n
+                return b'\0' * n
+
+        tracemalloc.start()
+        try:
+            upload_files.write_chunk(upload, Stream(), size)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(upload.status, Upload.STATUS_COMPLETE)
+        self.assertLess(peak, 1024 * 1024)
+
+
+@override_settings(MEDIA_PROCESSING_IN_PROCESS=False)
+class BlobStorageTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        image = BytesIO()
+        Image.new('RGB', (8, 8), 'green').save(image, format='PNG')
+        self.image = image.getvalue()
+
+    def upload_post(self, name='meme.png'):
+        response = self.client.post('/api/posts/', {
+            'content': 'meme', 'category': 'general', 'media': [SimpleUploadedFile(name, self.image, content_type='image/png')]
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Post.objects.get(id=response.json()['post']['id'])
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_blobs', '--grace-minutes', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_uploads_share_one_blob(self):
+        first, second = self.upload_post('a.png'), self.upload_post('b.png')
+        name = first.media.get().file.name
+        self.assertEqual(second.media.get().file.name, name)
+        self.assertTrue(name.startswith('blobs/') and name.endswith('.png'))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 2)
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(settings.MEDIA_ROOT)), 1)
+
+        # حذف پست (cascade روی PostMedia) فقط ارجاع را کم می‌کند
+        first.delete()
+        self.gc()
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        second.delete()
+        self.assertIn('1 unreferenced blob(s)', self.gc())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_profile_picture_replacement_keeps_shared_file(self):
+        post = self.upload_post()
+        name = post.media.get().file.name
+
+        response = self.client.post('/api/profile/update-picture/', {
+            'profile_picture': SimpleUploadedFile('me.png', self.image, content_type='image/png')
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 2)
+
+        self.assertEqual(self.client.delete('/api/profile/delete-picture/').status_code, 200)
+        self.gc()
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_chunked_upload_of_existing_content_is_not_stored_twice(self):
+        name = self.upload_post().media.get().file.name
+        upload_id = self.client.post('/api/uploads/', {
+            'filename': 'again.png', 'size': len(self.image), 'content_type': 'image/png', 'purpose': 'post_media'
+        }, format='json').json()['upload']['id']
+        self.client.generic('PATCH', f'/api/uploads/{upload_id}/', self.image,
+                            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0')
+        response = self.client.post('/api/posts/', {
+            'content': 'again', 'category': 'general', 'upload_ids': [upload_id]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 2)
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_DIR), [])
+
+    def test_recount_repairs_drift(self):
+        name = self.upload_post().media.get().file.name
+        Blob.objects.update(ref_count=0)
+        self.assertIn('1 blob ref_count value(s) fixed', self.gc('--recount'))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_reupload_of_unreferenced_blob_survives_gc(self):
+        name = default_storage.save('a.png', ContentFile(self.image))
+        Blob.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        # آپلود دوباره قبل از retain (post_save)؛ gc در همین فاصله نباید blob را پاک کند
+        self.assertEqual(default_storage.save('b.png', ContentFile(self.image)), name)
+        self.gc('--grace-minutes', '60')
+        self.assertTrue(Blob.objects.filter(name=name).exists())
+        self.assertTrue(default_storage.exists(name))
+
+        # gc ردیف و فایل را برده: فایل دوباره نوشته و ردیف دوباره ساخته می‌شود
+        Blob.objects.all().delete()
+        default_storage.purge(name)
+        self.assertEqual(default_storage.save('c.png', ContentFile(self.image)), name)
+        self.assertTrue(Blob.objects.filter(name=name).exists())
+        with default_storage.open(name, 'rb') as f:
+            self.assertEqual(f.read(), self.image)
+
+
+@override_settings(MEDIA_PROCESSING_IN_PROCESS=False)
+class MediaServingTest(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 40
+        self.name = default_storage.save('clip.mp4', SimpleUploadedFile('clip.mp4', self.content))
+        self.url = f'/media/{self.name}'
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()}"'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_blob_is_served_with_strong_etag_and_immutable_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.body(response), self.content[100:200])
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(self.body(suffix), self.content[-10:])
+
+        open_ended = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content) - 5}-')
+        self.assertEqual(self.body(open_ended), self.content[-5:])
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.content)}')
+
+        # If-Range با ETag قدیمی: کل فایل
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(len(self.body(stale)), len(self.content))
+
+    def test_range_on_file_with_weak_etag(self):
+        name = FileSystemStorage().save('posts/media/plain.bin', ContentFile(self.content))
+        url = f'/media/{name}'
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[:10])
+
+        # ETag ضعیف برای If-Range کافی نیست
+        weak = self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(weak.status_code, 200)
+        self.assertEqual(len(self.body(weak)), len(self.content))
+
+    def test_legacy_file_uses_stored_checksum(self):
+        post = Post.objects.create(author=User.objects.create_user(username="legacy", password="1234"),
+                                   content='old', category='general')
+        name = FileSystemStorage().save('posts/media/old.png', SimpleUploadedFile('old.png', self.content))
+        PostMedia.objects.create(post=post, file=name, media_type='video', checksum=self.etag.strip('"'))
+
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+    def test_sendfile_offload(self):
+        with override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_SENDFILE_URL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], self.etag)
+
+        with override_settings(MEDIA_SENDFILE_BACKEND='apache'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], default_storage.path(self.name))
+
+    def test_missing_and_unsafe_paths(self):
+        self.assertEqual(self.client.get('/media/blobs/00/missing.png').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
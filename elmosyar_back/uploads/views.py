@@ -0,0 +1,215 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from django.shortcuts import get_object_or_404
+
+from .models import Upload
+from .files import create_part_file, write_chunk
+
+from accounts.views import MAX_PROFILE_PICTURE_SIZE
+from messaging.views import MAX_MESSAGE_ATTACHMENT_SIZE
+from posts.views import MAX_MEDIA_FILE_SIZE
+from log_manager.log_config import log_info, log_error, log_warning
+
+# حجم پیشنهادی هر تکه برای کلاینت؛ سرور تکه‌ی بزرگ‌تر را هم به صورت stream می‌پذیرد
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# همان سقف‌های مسیر multipart
+PURPOSE_MAX_SIZES = {
+    Upload.PURPOSE_POST_MEDIA: MAX_MEDIA_FILE_SIZE,
+    Upload.PURPOSE_MESSAGE: MAX_MESSAGE_ATTACHMENT_SIZE,
+    Upload.PURPOSE_PROFILE_PICTURE: MAX_PROFILE_PICTURE_SIZE,
+}
+
+
+def _upload_payload(upload):
+    return {
+        'id': str(upload.id),
+        'purpose': upload.purpose,
+        'filename': upload.filename,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+    }
+
+
+# ════════════════════════════════════════════════════════════
+# 📤 Chunked Upload Endpoints
+# ════════════════════════════════════════════════════════════
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_create(request):
+    """
+    Start a resumable upload: {filename, size, content_type, purpose}
+    The declared size is checked against the purpose limit before any byte is sent.
+    """
+    try:
+        purpose = request.data.get('purpose', '')
+        filename = str(request.data.get('filename', '')).strip()
+        content_type = str(request.data.get('content_type', '')).strip()
+
+        if purpose not in PURPOSE_MAX_SIZES:
+            return Response({
+                'success': False,
+                'message': f"purpose must be one of: {', '.join(PURPOSE_MAX_SIZES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not filename:
+            return Response({
+                'success': False,
+                'message': 'filename is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+        if size <= 0:
+            return Response({
+                'success': False,
+                'message': 'size must be a positive integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = PURPOSE_MAX_SIZES[purpose]
+        if size > max_size:
+            log_warning(f"Upload rejected before start: {size} bytes", request, {
+                'purpose': purpose,
+                'max_allowed': max_size
+            })
+            return Response({
+                'success': False,
+                'message': f'File is too large (max {max_size // (1024 * 1024)}MB)'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if purpose == Upload.PURPOSE_PROFILE_PICTURE and not content_type.startswith('image/'):
+            return Response({
+                'success': False,
+                'message': 'Only image files are allowed'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = Upload.objects.create(
+            user=request.user,
+            purpose=purpose,
+            filename=filename[:255],
+            content_type=content_type[:100],
+            size=size
+        )
+        create_part_file(upload)
+
+        log_info(f"Upload started", request, {
+            'upload_id': str(upload.id),
+            'purpose': purpose,
+            'size': size
+        })
+
+        return Response({
+            'success': True,
+            'upload': _upload_payload(upload)
+        }, status=status.HTTP_201_CREATED)
+
+    except Exception as e:
+        log_error(f"Upload create failed: {str(e)}", request)
+        return Response({
+            'success': False,
+            'message': 'Failed to start upload'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, upload_id):
+    """
+    GET: current offset (to resume)
+    PATCH: append a chunk; raw body, Upload-Offset header must equal the current offset
+    DELETE: cancel the upload
+    """
+    upload = get_object_or_404(Upload, id=upload_id, user=request.user)
+
+    if request.method == 'GET':
+        return Response({
+            'success': True,
+            'upload': _upload_payload(upload)
+        }, status=status.HTTP_200_OK)
+
+    if request.method == 'DELETE':
+        upload.delete()
+        log_info(f"Upload cancelled", request, {'upload_id': str(upload_id)})
+        return Response({
+            'success': True,
+            'message': 'Upload cancelled'
+        }, status=status.HTTP_200_OK)
+
+    try:
+        if upload.is_complete:
+            return Response({
+                'success': False,
+                'message': 'Upload is already complete',
+                'upload': _upload_payload(upload)
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            offset = None
+        if offset != upload.offset:
+            return Response({
+                'success': False,
+                'message': 'Upload-Offset does not match the received size',
+                'upload': _upload_payload(upload)
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return Response({
+                'success': False,
+                'message': 'Content-Length is required'
+            }, status=status.HTTP_411_LENGTH_REQUIRED)
+
+        # رد کردن تکه‌ای که از حجم اعلام شده (و در نتیجه سقف) رد می‌شود، قبل از خواندن حتی یک بایت
+        if upload.offset + length > upload.size:
+            log_warning(f"Upload chunk past declared size, upload discarded", request, {
+                'upload_id': str(upload.id),
+                'offset': upload.offset,
+                'chunk': length,
+                'size': upload.size
+            })
+            upload.delete()
+            return Response({
+                'success': False,
+                'message': 'Chunk exceeds the declared upload size'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # بدنه مستقیماً از stream خوانده می‌شود (بدون parser و بدون بافر کردن کل تکه)
+        if write_chunk(upload, request.stream, length) is None:
+            upload.refresh_from_db()
+            return Response({
+                'success': False,
+                'message': 'Upload-Offset does not match the received size',
+                'upload': _upload_payload(upload)
+            }, status=status.HTTP_409_CONFLICT)
+
+        if upload.is_complete:
+            log_info(f"Upload completed", request, {
+                'upload_id': str(upload.id),
+                'purpose': upload.purpose,
+                'size': upload.size
+            })
+
+        return Response({
+            'success': True,
+            'upload': _upload_payload(upload)
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        log_error(f"Upload chunk failed: {str(e)}", request, {'upload_id': str(upload_id)})
+        return Response({
+            'success': False,
+            'message': 'Failed to store upload chunk'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -10,6 +10,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 
+from uploads.serving import serve_media
+
 def api_root(request):
     return JsonResponse({
         'message': 'Welcome to Elmosyar API',
@@ -29,8 +31,11 @@ urlpatterns = [
     path('api/', include('messaging.urls')),
     path('api/wallet/', include('wallet.urls')),
     path('api/logs/', include('log_manager.urls')),
+    path('api/uploads/', include('uploads.urls')),
+
+    # مدیا با Range / ETag / کش immutable (در production با MEDIA_SENDFILE_BACKEND به nginx سپرده می‌شود)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name='serve_media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)